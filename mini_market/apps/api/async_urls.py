@@ -0,0 +1,51 @@
+from django.urls import path
+
+from apps.api.async_views import (CategoryProductsView, ProductDetailView,
+                                  ProductInfoView, ProductListView,
+                                  ToCartView)
+from apps.api.views import ProductViewSet
+
+# Асинхронные маршруты горячего чтения каталога и корзины.
+# Подключаются перед маршрутами роутера и повторяют их адреса и имена,
+# остальные методы тех же адресов обслуживает ProductViewSet.
+urlpatterns = [
+    path(
+        'products/',
+        ProductListView.as_view(
+            fallback=ProductViewSet.as_view(
+                {'post': 'create'}, basename='product', detail=False,
+            ),
+        ),
+        name='product-list',
+    ),
+    path(
+        'products/get_info/',
+        ProductInfoView.as_view(),
+        name='product-get-info',
+    ),
+    path(
+        'products/<int:pk>/',
+        ProductDetailView.as_view(
+            fallback=ProductViewSet.as_view(
+                {
+                    'put': 'update',
+                    'patch': 'partial_update',
+                    'delete': 'destroy',
+                },
+                basename='product',
+                detail=True,
+            ),
+        ),
+        name='product-detail',
+    ),
+    path(
+        'products/<int:pk>/to_cart/',
+        ToCartView.as_view(),
+        name='product-to-cart',
+    ),
+    path(
+        'categories/<slug:slug>/products/',
+        CategoryProductsView.as_view(),
+        name='category-products',
+    ),
+]
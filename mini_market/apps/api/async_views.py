@@ -0,0 +1,198 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404, HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.views import exception_handler
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from apps.api.decorators import (async_anonymous_cache,
+                                 async_catalog_conditional)
+from apps.api.fast_serializers import (FastProductDetailSerializer,
+                                       FastProductListSerializer)
+from apps.api.filters import ProductFilterBackend
+from apps.api.pagination import KeysetPagination, ProductPagination
+from apps.api.renderers import FastJSONRenderer
+from apps.api.serializers import CartAmountSerializer, InfoProductsSerializer
+from apps.products import stock
+from apps.products.cache import category_tree
+from apps.products.models import Product
+
+
+class AsyncAPIView(View):
+    """
+    Асинхронное представление с ответами как у DRF: JWT, ошибки, JSON.
+    Запросы с методами без асинхронного обработчика передаются в
+    синхронное представление fallback, например изменение товара.
+    """
+
+    fallback = None
+    authentication = JWTAuthentication()
+    renderer = FastJSONRenderer()
+    parsers = (JSONParser(),)
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Как и в DRF, аутентификация по JWT, а не по сессии
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        method = request.method.lower()
+        handler = getattr(self, method, None)
+        if method == 'options' or method not in self.http_method_names:
+            handler = None
+        if handler is None and self.fallback is not None:
+            return await sync_to_async(self.fallback)(
+                request, *args, **kwargs
+            )
+
+        request = Request(request, parsers=self.parsers, authenticators=())
+        try:
+            if handler is None:
+                raise exceptions.MethodNotAllowed(request.method)
+            request.user = await self.authenticate(request)
+            return await handler(request, *args, **kwargs)
+        except Exception as exc:
+            return self.handle_exception(exc, request)
+
+    async def authenticate(self, request):
+        """ Проверка JWT без обращения к БД, пользователь - через ORM """
+        header = self.authentication.get_header(request)
+        if header is None:
+            return AnonymousUser()
+        raw_token = self.authentication.get_raw_token(header)
+        if raw_token is None:
+            return AnonymousUser()
+        token = self.authentication.get_validated_token(raw_token)
+        return await sync_to_async(self.authentication.get_user)(token)
+
+    def handle_exception(self, exc, request):
+        if isinstance(exc, (
+                exceptions.NotAuthenticated,
+                exceptions.AuthenticationFailed,
+        )):
+            exc.auth_header = self.authentication.authenticate_header(request)
+        response = exception_handler(exc, {'view': self, 'request': request})
+        if response is None:
+            raise exc
+        rendered = self.render(response.data, response.status_code)
+        # Заголовки ошибки: WWW-Authenticate, Retry-After
+        for name, value in response.items():
+            if name != 'Content-Type':
+                rendered[name] = value
+        return rendered
+
+    def render(self, data, status=200):
+        response = HttpResponse(
+            self.renderer.render(data),
+            status=status,
+            content_type='application/json',
+        )
+        # Данные нужны кешу ответов, чтобы пометить страницу id товаров
+        response.data = data
+        return response
+
+    async def paginate(self, request, queryset, serializer, paginator):
+        page = await paginator.apaginate_queryset(queryset, request, self)
+        if page is None:
+            return self.render(
+                serializer.many([row async for row in queryset]),
+            )
+        return self.render(
+            paginator.get_paginated_response(serializer.many(page)).data,
+        )
+
+
+class ProductListView(AsyncAPIView):
+    """ Асинхронная выдача списка товаров """
+
+    @async_catalog_conditional
+    @async_anonymous_cache(is_list=True)
+    async def get(self, request):
+        serializer = FastProductListSerializer()
+        queryset = ProductFilterBackend().filter_queryset(
+            request, Product.objects.select_related('category'), self,
+        )
+        return await self.paginate(
+            request,
+            serializer.get_queryset(queryset),
+            serializer,
+            ProductPagination(),
+        )
+
+
+class ProductDetailView(AsyncAPIView):
+    """ Асинхронная детальная выдача товара """
+
+    @async_catalog_conditional
+    @async_anonymous_cache(is_list=False)
+    async def get(self, request, pk):
+        serializer = FastProductDetailSerializer()
+        queryset = ProductFilterBackend().filter_queryset(
+            request, Product.objects.all(), self,
+        )
+        try:
+            row = await serializer.get_queryset(queryset).aget(pk=pk)
+        except (
+                Product.DoesNotExist,
+                TypeError,
+                ValueError,
+                DjangoValidationError,
+        ):
+            raise Http404('No Product matches the given query.')
+        return self.render(serializer.to_representation(row))
+
+
+class ProductInfoView(AsyncAPIView):
+    """ Асинхронная выдача минимальной, максимальной цены и остатка """
+
+    @async_catalog_conditional
+    async def get(self, request):
+        data = await Product.aget_statistic()
+        return self.render(InfoProductsSerializer(data).data)
+
+
+class CategoryProductsView(AsyncAPIView):
+    """ Асинхронная выдача товаров категории с подкатегориями """
+
+    @async_catalog_conditional
+    @async_anonymous_cache(is_list=True)
+    async def get(self, request, slug):
+        tree = await sync_to_async(category_tree.get)()
+        categories = tree.descendants(slug)
+        if categories is None:
+            raise Http404
+        serializer = FastProductListSerializer()
+        queryset = Product.objects.filter(category__in=categories)
+        return await self.paginate(
+            request,
+            serializer.get_queryset(queryset),
+            serializer,
+            KeysetPagination(),
+        )
+
+
+class ToCartView(AsyncAPIView):
+    """ Асинхронное добавление товара в корзину """
+
+    async def post(self, request, pk):
+        if not request.user.is_authenticated:
+            raise exceptions.NotAuthenticated
+        serializer = CartAmountSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # Резерв и вставка с проверкой остатка - запрос на сыром SQL,
+        # у асинхронного ORM для него нет аналога
+        added = await sync_to_async(stock.add_to_cart)(
+            request.user, {pk: serializer.validated_data['amount']},
+        )
+        if not added:
+            if not await Product.objects.filter(pk=pk).aexists():
+                raise Http404
+            raise exceptions.ValidationError('Not enough amount')
+
+        return self.render(None)
@@ -0,0 +1,165 @@
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from apps.products.cache import (catalog_version, category_statistic,
+                                 category_tree)
+from apps.products.models import (Category, CategoryStatistic, Product,
+                                  ProductStatistic, ShippingCart)
+
+User = get_user_model()
+
+
+class Fixtures:
+    """
+    Наполнение БД для замеров API заданного размера: дерево категорий
+    (у каждой до трех подкатегорий), товары по категориям, покупатели
+    с корзинами по carts позиций. Товары создаются bulk_create, поэтому
+    статистика и кеши каталога обновляются после вставки.
+    """
+
+    def __init__(
+            self,
+            categories=20,
+            products=1000,
+            users=50,
+            carts=5,
+            prefix='bench-api',
+    ):
+        self.prefix = prefix
+        self.sizes = {
+            'categories': categories,
+            'products': products,
+            'users': users,
+            'carts': carts,
+        }
+
+    def create(self):
+        self.categories = []
+        for index in range(self.sizes['categories']):
+            self.categories.append(Category.objects.create(
+                title=f'{self.prefix} {index}',
+                slug=f'{self.prefix}-{index}',
+                parent=self.categories[(index - 1) // 3] if index else None,
+            ))
+        self.products = Product.objects.bulk_create(
+            Product(
+                title=f'{self.prefix} product {index}',
+                price=10 + index % 100,
+                discount_price=10 + index % 100 - index % 3,
+                balance=self.sizes['users'] * self.sizes['carts'],
+                short_description=f'product {index}',
+                description=f'description of product {index}',
+                category=self.categories[index % len(self.categories)],
+            )
+            for index in range(self.sizes['products'])
+        )
+        self.users = User.objects.bulk_create(
+            User(username=f'{self.prefix}-{index}')
+            for index in range(self.sizes['users'])
+        )
+        ShippingCart.objects.bulk_create(
+            ShippingCart(
+                user=user,
+                product=self.products[
+                    (user_index * self.sizes['carts'] + index) %
+                    len(self.products)
+                ],
+                amount=1,
+            )
+            for user_index, user in enumerate(self.users)
+            for index in range(self.sizes['carts'])
+        )
+        ProductStatistic.recalculate()
+        CategoryStatistic.recalculate()
+        category_tree.invalidate()
+        category_statistic.invalidate()
+        catalog_version.bump()
+        return self
+
+    @property
+    def context(self):
+        """ Значения для подстановки в адреса эндпоинтов """
+        return {
+            'category': self.categories[0].slug,
+            'leaf': self.categories[-1].slug,
+            'product': self.products[len(self.products) // 2].id,
+        }
+
+
+class Endpoint:
+    """
+    Эндпоинт под контролем регрессий.
+    max_queries - предел запросов к БД при пустом кеше, per_cart_line -
+    добавка на каждую позицию корзины. role - guest для анонима или buyer
+    для покупателя. Покупатели перебираются по кругу, чтобы запросы на
+    запись не повторялись для одной корзины.
+    """
+
+    def __init__(
+            self,
+            name,
+            path,
+            max_queries,
+            per_cart_line=0,
+            method='get',
+            role='guest',
+    ):
+        self.name = name
+        self.path = path
+        self.max_queries = max_queries
+        self.per_cart_line = per_cart_line
+        self.method = method
+        self.role = role
+
+    def get_max_queries(self, fixtures):
+        return self.max_queries + self.per_cart_line * fixtures.sizes['carts']
+
+    def request(self, clients, fixtures, iteration=0, role=None):
+        """
+        clients - словарь клиентов по ролям, см. get_clients.
+        role заменяет роль эндпоинта, например чтение покупателем
+        в обход кеша ответов для анонимов.
+        """
+        role = role or self.role
+        client = clients[role]
+        if role == 'buyer':
+            client.force_authenticate(
+                user=fixtures.users[iteration % len(fixtures.users)],
+            )
+        return getattr(client, self.method)(
+            self.path.format(**fixtures.context),
+        )
+
+
+def get_clients():
+    return {'guest': APIClient(), 'buyer': APIClient()}
+
+
+ENDPOINTS = (
+    # Снимки дерева категорий и их статистики
+    Endpoint('categories', '/api/v1/categories/', 2),
+    Endpoint('category', '/api/v1/categories/{category}/', 2),
+    Endpoint(
+        'category_products', '/api/v1/categories/{category}/products/', 2,
+    ),
+    Endpoint('leaf_products', '/api/v1/categories/{leaf}/products/', 2),
+    Endpoint('products', '/api/v1/products/', 2),
+    Endpoint('products_cursor', '/api/v1/products/?pagination=cursor', 1),
+    Endpoint(
+        'products_filtered',
+        '/api/v1/products/?in_stock=true&ordering=-price&price_min=20',
+        2,
+    ),
+    Endpoint('product', '/api/v1/products/{product}/', 1),
+    Endpoint('product_info', '/api/v1/products/get_info/', 1),
+    Endpoint('search', '/api/v1/products/search/?q=product', 2),
+    # Остаток списывается условным UPDATE на каждую позицию корзины
+    Endpoint(
+        'create_order',
+        '/api/v1/orders/create_order/',
+        13,
+        per_cart_line=1,
+        method='post',
+        role='buyer',
+    ),
+)
@@ -0,0 +1,106 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.api.pagination import KeysetPagination, ProductPagination
+from apps.api.serializers import ProductFilterSerializer
+
+
+class ResponseCache:
+    """
+    Кеш готовых ответов на анонимное чтение каталога.
+
+    Ключ строится по пути и нормализованным параметрам запроса, от которых
+    зависит ответ: прочие параметры не плодят копии одной страницы. Каждая
+    сохраненная страница помечается id вошедших в нее товаров, поэтому
+    изменение товара сбрасывает только страницы с ним. Списки дополнительно
+    привязаны к поколению: его смена сбрасывает все списки сразу, например
+    при добавлении товара, когда сдвигаются границы страниц.
+    Метка хранит срок жизни каждой страницы: истекшие страницы из нее
+    удаляются, а сверх RESPONSE_CACHE_MAX_TAGGED вытесняются старые.
+    Метки обновляются без блокировок, так что в редкой гонке страница
+    может прожить до истечения RESPONSE_CACHE_TIMEOUT.
+    """
+
+    lists_key = 'response:lists'
+    query_params = frozenset((
+        *ProductFilterSerializer().fields,
+        ProductPagination.page_query_param,
+        KeysetPagination.mode_query_param,
+        KeysetPagination.cursor_query_param,
+    ))
+
+    def get_key(self, request, is_list):
+        query = urlencode(
+            sorted(
+                (name, value)
+                for name, values in request.query_params.lists()
+                if name in self.query_params
+                for value in values
+            )
+        )
+        digest = hashlib.md5(f'{request.path}?{query}'.encode()).hexdigest()
+        if is_list:
+            return f'response:list:{self._get_generation()}:{digest}'
+        return f'response:detail:{digest}'
+
+    def get(self, key):
+        return cache.get(key)
+
+    def set(self, key, content, product_ids):
+        timeout = settings.RESPONSE_CACHE_TIMEOUT
+        now = time.time()
+        tag_keys = [self._tag_key(product_id) for product_id in product_ids]
+        tags = cache.get_many(tag_keys)
+        evicted = set()
+        for tag_key in tag_keys:
+            pages = {
+                page_key: expires
+                for page_key, expires in tags.get(tag_key, {}).items()
+                if expires > now
+            }
+            pages[key] = now + timeout
+            if len(pages) > settings.RESPONSE_CACHE_MAX_TAGGED:
+                oldest = sorted(pages, key=pages.get)[
+                    :len(pages) - settings.RESPONSE_CACHE_MAX_TAGGED
+                ]
+                for page_key in oldest:
+                    del pages[page_key]
+                evicted.update(oldest)
+            tags[tag_key] = pages
+        # Страница без метки не сбросилась бы при изменении товара
+        cache.delete_many(evicted)
+        cache.set_many(tags, timeout)
+        cache.set(key, content, timeout)
+
+    def purge_products(self, product_ids):
+        """ Сброс страниц, в которые вошли переданные товары """
+        tag_keys = [self._tag_key(product_id) for product_id in product_ids]
+        keys = set(tag_keys)
+        for page_keys in cache.get_many(tag_keys).values():
+            keys.update(page_keys)
+        cache.delete_many(keys)
+
+    def purge_lists(self):
+        """ Сброс всех закешированных списков """
+        try:
+            cache.incr(self.lists_key)
+        except ValueError:
+            cache.add(self.lists_key, time.time_ns(), None)
+
+    def _get_generation(self):
+        generation = cache.get(self.lists_key)
+        if generation is None:
+            cache.add(self.lists_key, time.time_ns(), None)
+            generation = cache.get(self.lists_key)
+        return generation
+
+    @staticmethod
+    def _tag_key(product_id):
+        return f'response:tags:{product_id}'
+
+
+response_cache = ResponseCache()
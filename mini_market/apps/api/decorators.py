@@ -0,0 +1,161 @@
+import hashlib
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from apps.api.cache import response_cache
+from apps.products.cache import catalog_version
+from mini_market.replicas import replica_reads
+
+
+def _get_catalog_version(request):
+    if not hasattr(request, '_catalog_version'):
+        request._catalog_version = catalog_version.get()
+    return request._catalog_version
+
+
+def catalog_etag(request, *args, **kwargs):
+    version, _ = _get_catalog_version(request)
+    key = (
+        f'{version}:{request.get_full_path()}:'
+        f'{request.META.get("HTTP_ACCEPT", "")}'
+    )
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def catalog_last_modified(request, *args, **kwargs):
+    _, modified = _get_catalog_version(request)
+    return modified
+
+
+_catalog_condition = condition(
+    etag_func=catalog_etag,
+    last_modified_func=catalog_last_modified,
+)
+
+
+def catalog_conditional(method):
+    """
+    Условные запросы для чтения каталога.
+    Ответ получает ETag и Last-Modified по глобальной версии каталога,
+    при совпадении If-None-Match отдается 304 без выполнения метода.
+    Метод читает с основной БД: страница отставшей реплики получила бы
+    ETag новой версии, и клиент не запросил бы ее снова до следующего
+    изменения каталога.
+    """
+
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        with replica_reads(False):
+            response = _catalog_condition(partial(method, self))(
+                request, *args, **kwargs
+            )
+        return _patch_catalog_headers(response)
+
+    return wrapper
+
+
+def async_catalog_conditional(method):
+    """ catalog_conditional для асинхронных представлений """
+
+    @wraps(method)
+    async def wrapper(self, request, *args, **kwargs):
+        # Версия читается заранее, чтобы condition не ходил в кеш из цикла
+        request._catalog_version = await sync_to_async(catalog_version.get)()
+        with replica_reads(False):
+            response = await _catalog_condition(partial(method, self))(
+                request, *args, **kwargs
+            )
+        return _patch_catalog_headers(response)
+
+    return wrapper
+
+
+def _patch_catalog_headers(response):
+    patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+def _get_product_ids(data):
+    if isinstance(data, dict) and 'results' in data:
+        data = data['results']
+    if isinstance(data, dict):
+        data = (data,)
+    return [item['id'] for item in data]
+
+
+def anonymous_cache(is_list):
+    """
+    Кеширование готового JSON для анонимных пользователей.
+    is_list - ответ является списком товаров, а не отдельным товаром.
+    Ответ для кеша читается с основной БД: страница отставшей реплики
+    сохранилась бы после сброса и отдавалась бы всем клиентам до
+    истечения RESPONSE_CACHE_TIMEOUT.
+    """
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if (
+                    request.user.is_authenticated or
+                    request.accepted_renderer.format != 'json'
+            ):
+                return method(self, request, *args, **kwargs)
+
+            key = response_cache.get_key(request, is_list)
+            content = response_cache.get(key)
+            if content is not None:
+                return HttpResponse(content, content_type='application/json')
+
+            with replica_reads(False):
+                response = method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                product_ids = _get_product_ids(response.data)
+                response.add_post_render_callback(
+                    lambda rendered: response_cache.set(
+                        key, rendered.content, product_ids,
+                    )
+                )
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def async_anonymous_cache(is_list):
+    """
+    anonymous_cache для асинхронных представлений.
+    Они отдают только JSON, поэтому формат ответа не проверяется.
+    """
+
+    def decorator(method):
+        @wraps(method)
+        async def wrapper(self, request, *args, **kwargs):
+            if request.user.is_authenticated:
+                return await method(self, request, *args, **kwargs)
+
+            key, content = await sync_to_async(_get_cached)(request, is_list)
+            if content is not None:
+                return HttpResponse(content, content_type='application/json')
+
+            with replica_reads(False):
+                response = await method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                await sync_to_async(response_cache.set)(
+                    key, response.content, _get_product_ids(response.data),
+                )
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def _get_cached(request, is_list):
+    key = response_cache.get_key(request, is_list)
+    return key, response_cache.get(key)
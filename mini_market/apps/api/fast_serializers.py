@@ -0,0 +1,122 @@
+from decimal import Decimal
+
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+
+PRICE_EXPONENT = Decimal('0.01')
+
+
+def decimal_to_string(value):
+    """ Формат DecimalField(decimal_places=2) без создания полей DRF """
+    if value is None:
+        return None
+    if value.as_tuple().exponent != -2:
+        value = value.quantize(PRICE_EXPONENT)
+    return f'{value:f}'
+
+
+class FastSerializer:
+    """
+    Сериализатор только для чтения.
+    Выбирает нужные колонки через .values() и собирает словари напрямую,
+    вывод совпадает с соответствующим ModelSerializer.
+    """
+
+    fields = ()
+
+    def get_queryset(self, queryset):
+        """ Поля сортировки тоже выбираются, по ним строится курсор """
+        ordering = (
+            field.lstrip('-') for field in queryset.query.order_by
+            if isinstance(field, str)
+        )
+        return queryset.values(*dict.fromkeys((*self.fields, *ordering)))
+
+    def to_representation(self, row):
+        raise NotImplementedError
+
+    def many(self, rows):
+        to_representation = self.to_representation
+        return [to_representation(row) for row in rows]
+
+
+class FastProductListSerializer(FastSerializer):
+    """ Аналог ProductListSerializer """
+
+    fields = (
+        'id',
+        'title',
+        'price',
+        'discount_price',
+        'short_description',
+        'category__title',
+    )
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'title': row['title'],
+            'price': decimal_to_string(row['price']),
+            'discount_price': decimal_to_string(row['discount_price']),
+            'short_description': row['short_description'],
+            'category': row['category__title'],
+        }
+
+
+class FastProductDetailSerializer(FastSerializer):
+    """ Аналог ProductDetailSerializer """
+
+    fields = (
+        'id',
+        'title',
+        'price',
+        'discount_price',
+        'description',
+        'short_description',
+        'balance',
+        'category_id',
+        'category__title',
+        'category__slug',
+    )
+
+    def to_representation(self, row):
+        category = None
+        if row['category_id'] is not None:
+            category = {
+                'id': row['category_id'],
+                'title': row['category__title'],
+                'slug': row['category__slug'],
+            }
+        return {
+            'id': row['id'],
+            'title': row['title'],
+            'price': decimal_to_string(row['price']),
+            'discount_price': decimal_to_string(row['discount_price']),
+            'description': row['description'],
+            'short_description': row['short_description'],
+            'balance': row['balance'],
+            'category': category,
+        }
+
+
+class FastReadMixin:
+    """ Выдача списков и карточек через быстрые сериализаторы """
+
+    def fast_list(self, serializer):
+        queryset = serializer.get_queryset(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.many(page))
+        return Response(serializer.many(queryset))
+
+    def fast_retrieve(self, serializer):
+        queryset = serializer.get_queryset(
+            self.filter_queryset(self.get_queryset())
+        )
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(
+            queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        return Response(serializer.to_representation(row))
@@ -0,0 +1,91 @@
+from django.db.models import F
+from rest_framework.filters import BaseFilterBackend
+
+from apps.api.serializers import ProductFilterSerializer
+
+
+class ProductFilterBackend(BaseFilterBackend):
+    """
+    Фильтры и сортировка списка товаров.
+    Каждая сортировка заканчивается на id и совпадает с индексом Product,
+    поэтому подходит для пагинации по ключу.
+    """
+
+    orderings = {
+        'title': ('title', 'id'),
+        'price': ('price', 'id'),
+        '-price': ('-price', '-id'),
+        'discount': ('-discount', '-id'),
+        'newest': ('-id',),
+    }
+
+    def filter_queryset(self, request, queryset, view):
+        # Обычный словарь, чтобы отсутствующий флаг не считался False
+        serializer = ProductFilterSerializer(
+            data=request.query_params.dict(),
+        )
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        if 'price_min' in data:
+            queryset = queryset.filter(price__gte=data['price_min'])
+        if 'price_max' in data:
+            queryset = queryset.filter(price__lte=data['price_max'])
+
+        match data.get('in_stock'):
+            case True:
+                queryset = queryset.filter(balance__gt=0)
+            case False:
+                queryset = queryset.filter(balance=0)
+
+        match data.get('on_sale'):
+            case True:
+                queryset = queryset.filter(discount_price__lt=F('price'))
+            case False:
+                queryset = queryset.filter(discount_price__gte=F('price'))
+
+        if 'ordering' in data:
+            queryset = queryset.order_by(*self.orderings[data['ordering']])
+        return queryset
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': 'price_min',
+                'required': False,
+                'in': 'query',
+                'description': 'Минимальная цена',
+                'schema': {'type': 'number'},
+            },
+            {
+                'name': 'price_max',
+                'required': False,
+                'in': 'query',
+                'description': 'Максимальная цена',
+                'schema': {'type': 'number'},
+            },
+            {
+                'name': 'in_stock',
+                'required': False,
+                'in': 'query',
+                'description': 'Только товары в наличии',
+                'schema': {'type': 'boolean'},
+            },
+            {
+                'name': 'on_sale',
+                'required': False,
+                'in': 'query',
+                'description': 'Только товары со скидкой',
+                'schema': {'type': 'boolean'},
+            },
+            {
+                'name': 'ordering',
+                'required': False,
+                'in': 'query',
+                'description': 'Сортировка',
+                'schema': {
+                    'type': 'string',
+                    'enum': list(self.orderings),
+                },
+            },
+        ]
@@ -0,0 +1,174 @@
+import json
+import statistics
+from pathlib import Path
+
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.api.benchmarks import ENDPOINTS, Fixtures, get_clients
+from apps.products.management.commands._base import BenchmarkCommand
+
+BASELINE = Path(__file__).resolve().parents[2] / 'benchmarks.json'
+
+
+class Command(BenchmarkCommand):
+    help = (
+        'Регрессии API: число запросов к БД и p50/p95 по эндпоинтам '
+        'на наполнении заданного размера, сравнение с сохраненной базой. '
+        'Работает на настроенной БД: SQLite при ON_DEV=True или локальный '
+        'PostgreSQL через DATABASE_HOST и POSTGRES_*. База хранится '
+        'отдельно для каждой СУБД.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--carts', type=int, default=5)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument(
+            '--endpoint',
+            nargs='+',
+            choices=[endpoint.name for endpoint in ENDPOINTS],
+            help='Замерить только эти эндпоинты',
+        )
+        parser.add_argument(
+            '--guest',
+            action='store_true',
+            help='Чтение анонимом, с кешем ответов, а не покупателем',
+        )
+        parser.add_argument('--baseline', type=Path, default=BASELINE)
+        parser.add_argument(
+            '--save-baseline',
+            action='store_true',
+            help='Записать результаты как новую базу',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=50,
+            help='Допустимый рост p95 относительно базы, %%',
+        )
+
+    def benchmark(self, *args, **options):
+        fixtures = Fixtures(
+            categories=options['categories'],
+            products=options['products'],
+            users=options['users'],
+            carts=options['carts'],
+        ).create()
+        endpoints = [
+            endpoint for endpoint in ENDPOINTS
+            if not options['endpoint'] or endpoint.name in options['endpoint']
+        ]
+        sizes = ', '.join(
+            f'{key} {value}' for key, value in fixtures.sizes.items()
+        )
+        self.stdout.write(f'{connection.vendor}, {sizes}')
+
+        results = {}
+        for endpoint in endpoints:
+            results[endpoint.name] = self.measure_endpoint(
+                endpoint, fixtures, options,
+            )
+
+        baseline = self.load_baseline(options['baseline'])
+        current = {'sizes': fixtures.sizes, 'endpoints': results}
+        errors = self.compare(
+            endpoints, fixtures, current, baseline.get(connection.vendor),
+            options['tolerance'],
+        )
+        if options['save_baseline']:
+            baseline[connection.vendor] = current
+            options['baseline'].write_text(
+                json.dumps(baseline, indent=2, sort_keys=True) + '\n',
+            )
+            self.stdout.write(f'Baseline saved to {options["baseline"]}')
+        elif errors:
+            raise CommandError('\n'.join(errors))
+
+    def measure_endpoint(self, endpoint, fixtures, options):
+        clients = get_clients()
+        role = None if options['guest'] else 'buyer'
+        repeat = options['repeat']
+        if endpoint.method != 'get':
+            # Запись выполняется один раз на корзину покупателя
+            repeat = min(repeat, len(fixtures.users) - 1)
+
+        # Прогрев: снимки дерева и статистики, соединение с БД
+        endpoint.request(clients, fixtures, role=role)
+        timings = []
+        queries = 0
+        for iteration in range(1, repeat + 1):
+            with CaptureQueriesContext(connection) as captured:
+                response, timing = self.measure(
+                    endpoint.request, clients, fixtures, iteration, role=role,
+                )
+            if response.status_code >= 300:
+                raise CommandError(
+                    f'{endpoint.name}: {response.status_code} '
+                    f'{response.content[:200]!r}'
+                )
+            timings.extend(timing)
+            queries = max(queries, len(captured))
+
+        result = {
+            'p50': round(statistics.median(timings), 3),
+            'p95': round(self.percentile(timings, 95), 3),
+            'queries': queries,
+        }
+        self.stdout.write(
+            f'{endpoint.name:<40} '
+            f'p50 {result["p50"]:10.3f} ms   '
+            f'p95 {result["p95"]:10.3f} ms   '
+            f'queries {queries:>3}   n={len(timings)}'
+        )
+        return result
+
+    @staticmethod
+    def load_baseline(path):
+        if not path.exists():
+            return {}
+        return json.loads(path.read_text())
+
+    def compare(self, endpoints, fixtures, current, baseline, tolerance):
+        """ Список регрессий: превышение бюджета запросов и рост p95 """
+        errors = []
+        for endpoint in endpoints:
+            result = current['endpoints'][endpoint.name]
+            max_queries = endpoint.get_max_queries(fixtures)
+            if result['queries'] > max_queries:
+                errors.append(
+                    f'{endpoint.name}: {result["queries"]} queries, '
+                    f'budget {max_queries}'
+                )
+        if baseline is None:
+            self.stdout.write('No baseline for this database')
+            return errors
+        if baseline['sizes'] != current['sizes']:
+            self.stdout.write(
+                f'Baseline was recorded for {baseline["sizes"]}, '
+                'timings are not compared'
+            )
+            return errors
+
+        for endpoint in endpoints:
+            result = current['endpoints'][endpoint.name]
+            base = baseline['endpoints'].get(endpoint.name)
+            if base is None:
+                continue
+            if result['queries'] > base['queries']:
+                errors.append(
+                    f'{endpoint.name}: {result["queries"]} queries, '
+                    f'baseline {base["queries"]}'
+                )
+            limit = base['p95'] * (1 + tolerance / 100)
+            if result['p95'] > limit:
+                errors.append(
+                    f'{endpoint.name}: p95 {result["p95"]:.3f} ms, '
+                    f'baseline {base["p95"]:.3f} ms (+{tolerance:g}%)'
+                )
+        if not errors:
+            self.stdout.write('No regressions against baseline')
+        return errors
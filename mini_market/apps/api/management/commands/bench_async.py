@@ -0,0 +1,157 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from django.contrib.auth import get_user_model
+from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+from django.db.backends.signals import connection_created
+from django.test import override_settings
+from django.urls import include, path
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.products.management.commands._base import BenchmarkCommand
+from apps.products.models import Category, Product
+from mini_market.urls import urlpatterns as root_urlpatterns
+
+User = get_user_model()
+
+PRODUCTS_URL = 'http://testserver/api/v1/products/'
+
+# Маршруты с асинхронными представлениями, как при ASYNC_VIEWS=True
+urlpatterns = [
+    path('api/v1/', include('apps.api.async_urls')),
+    *root_urlpatterns,
+]
+
+
+class Command(BenchmarkCommand):
+    help = 'Задержка списка товаров под конкурентной нагрузкой: WSGI и ASGI'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=4,
+            help='Потоки WSGI воркера (gthread)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=32,
+            help='Одновременные запросы клиентов',
+        )
+        parser.add_argument('--products', type=int, default=100)
+        parser.add_argument(
+            '--db-delay',
+            type=float,
+            default=0,
+            help='Добавочная задержка каждого запроса к БД (мс), '
+                 'как у удаленного PostgreSQL',
+        )
+
+    def handle(self, *args, **options):
+        # Запросы выполняются в других потоках и видят только
+        # зафиксированные данные, поэтому они удаляются после замера
+        category = Category.objects.create(title='bench', slug='bench-async')
+        user = User.objects.create_user(username='bench-async')
+        try:
+            Product.objects.bulk_create(
+                Product(
+                    title=f'bench {index}',
+                    price=10,
+                    discount_price=9,
+                    balance=1,
+                    category=category,
+                )
+                for index in range(options['products'])
+            )
+            options['token'] = str(AccessToken.for_user(user))
+            self.benchmark(**options)
+        finally:
+            Product.objects.filter(category=category).delete()
+            category.delete()
+            user.delete()
+
+    def benchmark(self, *args, **options):
+        delay = options['db_delay'] / 1000
+
+        def slow_execute(execute, sql, params, many, context):
+            time.sleep(delay)
+            return execute(sql, params, many, context)
+
+        def add_delay(sender, connection, **kwargs):
+            if slow_execute not in connection.execute_wrappers:
+                connection.execute_wrappers.append(slow_execute)
+
+        if delay:
+            connection_created.connect(add_delay)
+        headers = {'Authorization': f'Bearer {options["token"]}'}
+        try:
+            self.report_load(
+                f'WSGI {options["threads"]} threads, '
+                f'{options["concurrency"]} concurrent',
+                *self.measure(self.load_wsgi, headers, options),
+            )
+            self.report_load(
+                f'ASGI sync views, {options["concurrency"]} concurrent',
+                *self.measure(self.load_asgi, headers, options),
+            )
+            with override_settings(ROOT_URLCONF=__name__):
+                self.report_load(
+                    f'ASGI async views, {options["concurrency"]} concurrent',
+                    *self.measure(self.load_asgi, headers, options),
+                )
+        finally:
+            connection_created.disconnect(add_delay)
+
+    def load_wsgi(self, headers, options):
+        client = httpx.Client(
+            transport=httpx.WSGITransport(app=get_wsgi_application()),
+            headers=headers,
+        )
+
+        workers = ThreadPoolExecutor(options['threads'])
+
+        def get(_):
+            # Клиенты ждут свободный поток воркера, как в очереди gunicorn
+            response, timings = self.measure(
+                lambda: workers.submit(client.get, PRODUCTS_URL).result(),
+            )
+            response.raise_for_status()
+            return timings[0]
+
+        with client, workers, ThreadPoolExecutor(
+                options['concurrency'],
+        ) as clients:
+            return list(clients.map(get, range(options['requests'])))
+
+    def load_asgi(self, headers, options):
+        return asyncio.run(self.aload_asgi(headers, options))
+
+    async def aload_asgi(self, headers, options):
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=get_asgi_application()),
+            headers=headers,
+        )
+        semaphore = asyncio.Semaphore(options['concurrency'])
+
+        async def get():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(PRODUCTS_URL)
+                response.raise_for_status()
+                return (time.perf_counter() - start) * 1000
+
+        async with client:
+            return await asyncio.gather(
+                *(get() for _ in range(options['requests']))
+            )
+
+    def report_load(self, title, timings, elapsed):
+        self.report(title, timings)
+        self.stdout.write(
+            f'{"":<40} {len(timings) * 1000 / elapsed[0]:.1f} req/s'
+        )
@@ -0,0 +1,55 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from apps.products.management.commands._base import BenchmarkCommand
+from apps.products.models import Order, Product, ShippingCart
+
+User = get_user_model()
+
+
+class Command(BenchmarkCommand):
+    help = 'Пропускная способность оформления заказов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=500)
+        parser.add_argument('--items', type=int, default=5)
+
+    def benchmark(self, *args, **options):
+        products = Product.objects.bulk_create(
+            Product(
+                title=f'bench {index}',
+                price=10,
+                discount_price=9,
+                balance=options['orders'],
+            )
+            for index in range(options['items'])
+        )
+        users = User.objects.bulk_create(
+            User(username=f'bench_buyer_{index}')
+            for index in range(options['orders'])
+        )
+        ShippingCart.objects.bulk_create(
+            ShippingCart(user=user, product=product, amount=1)
+            for user in users
+            for product in products
+        )
+
+        client = APIClient()
+        timings = []
+        # Фоновая публикация outbox в брокер не входит в замер
+        with mock.patch('apps.products.outbox.outbox_relay'):
+            start = time.perf_counter()
+            for user in users:
+                client.force_authenticate(user=user)
+                _, timing = self.measure(
+                    client.post, '/api/v1/orders/create_order/',
+                )
+                timings.extend(timing)
+            elapsed = time.perf_counter() - start
+
+        assert Order.objects.filter(user__in=users).count() == len(users)
+        self.report(f'create_order ({options["items"]} items)', timings)
+        self.stdout.write(f'{len(users) / elapsed:.1f} orders/s')
@@ -0,0 +1,52 @@
+from rest_framework.renderers import JSONRenderer
+
+from apps.api.fast_serializers import FastProductListSerializer
+from apps.api.renderers import FastJSONRenderer
+from apps.api.serializers import ProductListSerializer
+from apps.products.management.commands._base import BenchmarkCommand
+from apps.products.models import Category, Product
+
+
+class Command(BenchmarkCommand):
+    help = 'Стоимость сериализации строки списка товаров'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def benchmark(self, *args, **options):
+        rows = options['rows']
+        category = Category.objects.create(title='bench', slug='bench-rows')
+        Product.objects.bulk_create(
+            (
+                Product(
+                    title=f'bench {index}',
+                    price=index % 1000 + 1,
+                    discount_price=index % 1000 + 0.5,
+                    balance=index,
+                    short_description='short description',
+                    category=category,
+                )
+                for index in range(rows)
+            ),
+            batch_size=5000,
+        )
+        queryset = Product.objects.select_related('category')[:rows]
+
+        def model_serializer():
+            data = ProductListSerializer(queryset.all(), many=True).data
+            return JSONRenderer().render(data)
+
+        def fast_serializer():
+            serializer = FastProductListSerializer()
+            data = serializer.many(serializer.get_queryset(queryset.all()))
+            return FastJSONRenderer().render(data)
+
+        for title, func in (
+                ('ModelSerializer + JSONRenderer', model_serializer),
+                ('FastSerializer + FastJSONRenderer', fast_serializer),
+        ):
+            _, timings = self.measure(func, repeat=options['repeat'])
+            self.report(title, timings)
+            per_row = min(timings) * 1000 / rows
+            self.stdout.write(f'{"":<40} {per_row:.2f} us/row')
@@ -0,0 +1,251 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Пагинация по ключу сортировки (по умолчанию title, id).
+    Не выполняет COUNT(*) и OFFSET, время выдачи не зависит от глубины.
+    Включается параметром ?pagination=cursor или наличием cursor.
+    """
+
+    mode_query_param = 'pagination'
+    mode = 'cursor'
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    invalid_cursor_message = 'Invalid cursor'
+
+    def is_requested(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == self.mode or
+            self.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+        return self.get_page(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """ То же, что paginate_queryset, с асинхронным чтением строк """
+        if not self.is_requested(request):
+            return None
+        queryset = self.get_page_queryset(queryset, request)
+        return self.get_page([item async for item in queryset])
+
+    def get_page_queryset(self, queryset, request):
+        """ Запрос страницы с одной лишней строкой для признака next """
+        self.request = request
+        self.ordering = self.get_ordering(queryset)
+        queryset = queryset.order_by(*self.ordering)
+
+        position = self.decode_cursor(request, queryset)
+        if position is not None:
+            queryset = queryset.filter(self.after(self.ordering, position))
+        return queryset[:self.page_size + 1]
+
+    def get_page(self, results):
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+        self.position = (
+            self.get_position(results[-1]) if self.has_next else None
+        )
+        return results
+
+    @staticmethod
+    def get_ordering(queryset):
+        """ Сортировка запроса, дополненная id для уникальности ключа """
+        ordering = list(
+            queryset.query.order_by or queryset.model._meta.ordering
+        )
+        names = {field.lstrip('-') for field in ordering}
+        if 'id' not in names and 'pk' not in names:
+            direction = '-' if ordering and ordering[-1][0] == '-' else ''
+            ordering.append(f'{direction}id')
+        return tuple(ordering)
+
+    @staticmethod
+    def after(ordering, position):
+        """
+        Условие "строго после" позиции для составного ключа.
+        Дублирующее условие на первое поле - граница обхода индекса:
+        по одному OR PostgreSQL читал бы индекс с начала.
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        first = ordering[0]
+        lookup = 'lte' if first.startswith('-') else 'gte'
+        return Q(**{f'{first.lstrip("-")}__{lookup}': position[0]}) & condition
+
+    def get_position(self, item):
+        position = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            value = item[name] if isinstance(item, dict) else getattr(
+                item, name,
+            )
+            position.append(value)
+        return position
+
+    @staticmethod
+    def get_field(queryset, name):
+        """ Поле сортировки: поле модели или аннотация, например rank """
+        annotation = queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        field = queryset.model._meta.get_field(name)
+        # Для GeneratedField тип значения задает output_field
+        return getattr(field, 'output_field', field)
+
+    def decode_cursor(self, request, queryset):
+        """
+        Позиция из курсора, приведенная к типам полей сортировки.
+        Курсор другой сортировки или с неверными значениями отклоняется.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            ordering = cursor['ordering']
+            position = cursor['position']
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if (
+                ordering != list(self.ordering) or
+                not isinstance(position, list) or
+                len(position) != len(self.ordering)
+        ):
+            raise NotFound(self.invalid_cursor_message)
+
+        values = []
+        for field, value in zip(self.ordering, position):
+            if not isinstance(value, (str, int, float)):
+                raise NotFound(self.invalid_cursor_message)
+            field = self.get_field(queryset, field.lstrip('-'))
+            try:
+                values.append(field.to_python(value))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def encode_cursor(self, position):
+        cursor = {'ordering': self.ordering, 'position': position}
+        return urlsafe_b64encode(
+            json.dumps(cursor, default=str).encode(),
+        ).decode('ascii')
+
+    def get_next_link(self):
+        if self.position is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.position),
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                },
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.mode_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Режим пагинации по ключу',
+                'schema': {'type': 'string', 'enum': [self.mode]},
+            },
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Курсор следующей страницы',
+                'schema': {'type': 'string'},
+            },
+        ]
+
+
+class ProductPagination(PageNumberPagination):
+    """
+    Постраничная пагинация с возможностью перейти на пагинацию по ключу.
+    """
+
+    keyset_class = KeysetPagination
+
+    def __init__(self):
+        self.keyset = self.keyset_class()
+        self.use_keyset = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_keyset = self.keyset.is_requested(request)
+        if self.use_keyset:
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """ Асинхронный вариант: COUNT(*) и строки страницы через acount """
+        self.use_keyset = self.keyset.is_requested(request)
+        if self.use_keyset:
+            return await self.keyset.apaginate_queryset(
+                queryset, request, view,
+            )
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Paginator берет count из кеша свойства и не считает его повторно
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc),
+            ))
+        self.page.object_list = [
+            item async for item in self.page.object_list
+        ]
+        return list(self.page)
+
+    def get_paginated_response(self, data):
+        if self.use_keyset:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            *super().get_schema_operation_parameters(view),
+            *self.keyset.get_schema_operation_parameters(view),
+        ]
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
-from apps.products.models import Category, Order, Product
+from apps.products.exchange import EXCHANGE_TYPES
+from apps.products.models import Category, Order, Product, ShippingCart
 
 
 class CategoryBaseSerializer(serializers.ModelSerializer):
@@ -26,7 +27,26 @@ class SubCategoryCreateSerializer(CategoryBaseSerializer):
 
 
 class CategorySerializer(CategoryBaseSerializer):
-    pass
+    """
+    Категория со сводкой по товарам, включая подкатегории.
+    Сводка берется из снимка статистики категорий без запросов к БД.
+    """
+
+    product_count = serializers.IntegerField(read_only=True)
+    min_price = serializers.DecimalField(
+        max_digits=8, decimal_places=2, read_only=True,
+    )
+    max_price = serializers.DecimalField(
+        max_digits=8, decimal_places=2, read_only=True,
+    )
+
+    class Meta(CategoryBaseSerializer.Meta):
+        fields = (
+            *CategoryBaseSerializer.Meta.fields,
+            'product_count',
+            'min_price',
+            'max_price',
+        )
 
 
 class ProductBaseSerializer(serializers.ModelSerializer):
@@ -71,6 +91,9 @@ class ProductCreateSerializer(ProductBaseSerializer):
         slug_field='slug',
     )
 
+    class Meta(ProductBaseSerializer.Meta):
+        fields = (*ProductBaseSerializer.Meta.fields, 'vendor_code')
+
 
 class InfoProductsSerializer(serializers.Serializer):
 
@@ -79,6 +102,103 @@ class InfoProductsSerializer(serializers.Serializer):
     total_count = serializers.IntegerField(min_value=0)
 
 
+class ProductSearchSerializer(serializers.Serializer):
+
+    q = serializers.CharField(max_length=200)
+    category = serializers.SlugField(max_length=50, required=False)
+
+
+class ProductFilterSerializer(serializers.Serializer):
+
+    ORDERING_CHOICES = ('title', 'price', '-price', 'discount', 'newest')
+
+    price_min = serializers.DecimalField(
+        max_digits=8, decimal_places=2, min_value=0, required=False,
+    )
+    price_max = serializers.DecimalField(
+        max_digits=8, decimal_places=2, min_value=0, required=False,
+    )
+    in_stock = serializers.BooleanField(required=False)
+    on_sale = serializers.BooleanField(required=False)
+    ordering = serializers.ChoiceField(
+        choices=ORDERING_CHOICES, required=False,
+    )
+
+    def validate(self, attrs):
+        price_min = attrs.get('price_min')
+        price_max = attrs.get('price_max')
+        if (
+                price_min is not None and
+                price_max is not None and
+                price_min > price_max
+        ):
+            raise serializers.ValidationError(
+                {'price_max': 'Must be greater than or equal to price_min'}
+            )
+        return attrs
+
+
+class ExchangeTypeSerializer(serializers.Serializer):
+
+    type = serializers.ChoiceField(choices=EXCHANGE_TYPES, default='csv')
+
+
+class OrderExportSerializer(ExchangeTypeSerializer):
+
+    created_from = serializers.DateTimeField(required=False)
+    created_to = serializers.DateTimeField(required=False)
+    is_payed = serializers.BooleanField(required=False)
+
+
+class PaymentWebhookSerializer(serializers.Serializer):
+
+    orderId = serializers.CharField(max_length=100)
+    status = serializers.CharField(max_length=32)
+
+
+class ProductImportSerializer(serializers.Serializer):
+
+    file = serializers.FileField()
+
+
+class CartAmountSerializer(serializers.Serializer):
+
+    amount = serializers.IntegerField(
+        min_value=1, max_value=ShippingCart.MAX_AMOUNT, default=1,
+    )
+
+
+class CartItemListSerializer(serializers.ListSerializer):
+
+    def validate(self, attrs):
+        """ Повторы одного товара объединяются в одну позицию """
+        items = {}
+        for item in attrs:
+            product_id = item['product_id']
+            items[product_id] = items.get(product_id, 0) + item['amount']
+        too_many = sorted(
+            product_id
+            for product_id, amount in items.items()
+            if amount > ShippingCart.MAX_AMOUNT
+        )
+        if too_many:
+            raise serializers.ValidationError(
+                f'Max amount {ShippingCart.MAX_AMOUNT} exceeded: {too_many}'
+            )
+        return [
+            {'product_id': product_id, 'amount': amount}
+            for product_id, amount in items.items()
+        ]
+
+
+class CartItemSerializer(CartAmountSerializer):
+
+    product_id = serializers.IntegerField(min_value=1)
+
+    class Meta:
+        list_serializer_class = CartItemListSerializer
+
+
 class OrderSerializer(serializers.ModelSerializer):
 
     class Meta:
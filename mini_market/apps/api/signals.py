@@ -0,0 +1,96 @@
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.api.cache import response_cache
+from apps.products.exchange import products_imported
+from apps.products.models import Category, Product
+
+# Поля товара, от которых зависят состав и порядок списков
+LIST_FIELDS = ('title', 'category_id', 'price', 'discount_price')
+
+
+def _in_stock(balance):
+    return balance is not None and balance > 0
+
+
+def _purge(product_ids=(), lists=False):
+    """
+    Сброс сразу и повторно после фиксации транзакции: иначе параллельный
+    анонимный запрос закешировал бы данные до фиксации, и они отдавались
+    бы с новой версией каталога
+    """
+    product_ids = list(product_ids)
+    if not product_ids and not lists:
+        return
+
+    def purge():
+        if lists:
+            response_cache.purge_lists()
+        if product_ids:
+            response_cache.purge_products(product_ids)
+
+    purge()
+    transaction.on_commit(purge)
+
+
+@receiver(post_save, sender=Product)
+def purge_product_on_save(instance, created, **kwargs):
+    previous = instance.previous_values
+    _purge(
+        () if created else (instance.pk,),
+        lists=created or any(
+            previous.get(field) != getattr(instance, field)
+            for field in LIST_FIELDS
+        ) or (
+            _in_stock(previous.get('balance')) != _in_stock(instance.balance)
+        ),
+    )
+
+
+@receiver(post_delete, sender=Product)
+def purge_product_on_delete(instance, **kwargs):
+    _purge((instance.pk,), lists=True)
+
+
+@receiver(products_imported, sender=Product)
+def purge_products_on_import(product_ids, **kwargs):
+    _purge(product_ids, lists=True)
+
+
+@receiver(post_save, sender=Category)
+def purge_category_on_save(instance, created, **kwargs):
+    if created:
+        return
+    previous = instance.previous_values
+    _purge(
+        instance.products.values_list('id', flat=True)
+        if previous.get('title') != instance.title else (),
+        lists=previous.get('parent_id') != instance.parent_id,
+    )
+
+
+@receiver(pre_delete, sender=Category)
+def purge_category_on_delete(instance, origin=None, **kwargs):
+    """
+    Каскад отправляет сигнал для каждой подкатегории, поэтому товары всех
+    удаляемых веток сбрасываются одним запросом на вызов delete()
+    """
+    if origin is None:
+        paths = (instance.path,)
+    elif getattr(origin, '_response_cache_purged', False):
+        return
+    else:
+        origin._response_cache_purged = True
+        paths = (
+            (origin.path,) if isinstance(origin, Category)
+            else origin.values_list('path', flat=True)
+        )
+    branches = Q()
+    for path in paths:
+        branches |= Q(category__path__startswith=path)
+    _purge(
+        Product.objects.filter(branches).values_list('id', flat=True),
+        lists=True,
+    )
@@ -0,0 +1,121 @@
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import include, path
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.products.models import Category, Product, ShippingCart
+from mini_market.urls import urlpatterns as root_urlpatterns
+
+User = get_user_model()
+
+# Асинхронные маршруты поверх обычных, как при ASYNC_VIEWS=True
+urlpatterns = [
+    path('api/v1/', include('apps.api.async_urls')),
+    *root_urlpatterns,
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncViewsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='buyer')
+        cls.category = Category.objects.create(title='phones', slug='phones')
+        cls.products = Product.objects.bulk_create(
+            Product(
+                title=f'phone {index}',
+                price=10 + index,
+                discount_price=9,
+                balance=index,
+                category=cls.category,
+            )
+            for index in range(12)
+        )
+        cls.product = cls.products[5]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_reads_match_sync_views(self):
+        """ Асинхронные представления отдают то же, что и ViewSet """
+        sync_client = APIClient()
+        urls = (
+            '/api/v1/products/',
+            '/api/v1/products/?page=2',
+            '/api/v1/products/?ordering=-price&in_stock=true',
+            '/api/v1/products/?pagination=cursor',
+            f'/api/v1/products/{self.product.id}/',
+            '/api/v1/products/0/',
+            '/api/v1/products/get_info/',
+            f'/api/v1/categories/{self.category.slug}/products/',
+            '/api/v1/categories/unknown/products/',
+            '/api/v1/products/?price_min=abc',
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                with override_settings(ROOT_URLCONF='mini_market.urls'):
+                    expected = sync_client.get(url)
+                cache.clear()
+                response = async_to_sync(self.async_client.get)(url)
+                cache.clear()
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.json(), expected.json())
+
+    def test_read_is_cached_and_conditional(self):
+        url = '/api/v1/products/'
+        get = async_to_sync(self.async_client.get)
+        response = get(url)
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertNumQueries(0):
+            cached = get(url)
+            not_modified = get(
+                url, headers={'If-None-Match': response['ETag']},
+            )
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(not_modified.status_code, 304)
+
+    async def test_to_cart(self):
+        url = f'/api/v1/products/{self.product.id}/to_cart/'
+        token = AccessToken.for_user(self.user)
+        headers = {'Authorization': f'Bearer {token}'}
+
+        response = await self.async_client.post(url, {'amount': 2})
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('WWW-Authenticate', response)
+
+        response = await self.async_client.post(
+            url, {'amount': 2}, content_type='application/json',
+            headers=headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        cart = await ShippingCart.objects.aget(user=self.user)
+        self.assertEqual(cart.amount, 2)
+
+        response = await self.async_client.post(
+            url, {'amount': 10}, content_type='application/json',
+            headers=headers,
+        )
+        self.assertEqual(response.status_code, 400)
+
+        response = await self.async_client.post(
+            '/api/v1/products/0/to_cart/', content_type='application/json',
+            headers=headers,
+        )
+        self.assertEqual(response.status_code, 404)
+
+    async def test_other_methods_use_viewset(self):
+        """ Изменение товара обслуживает синхронный ProductViewSet """
+        url = f'/api/v1/products/{self.product.id}/'
+        response = await self.async_client.delete(url)
+        self.assertEqual(response.status_code, 401)
+        self.assertTrue(
+            await Product.objects.filter(pk=self.product.id).aexists()
+        )
+
+        response = await self.async_client.put('/api/v1/products/get_info/')
+        self.assertEqual(response.status_code, 405)
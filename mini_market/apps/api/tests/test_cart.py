@@ -0,0 +1,213 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
+
+from apps.products import stock
+from apps.products.models import Order, Product, ShippingCart
+from apps.products.tasks import release_stock_holds
+
+User = get_user_model()
+
+
+class CartTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='buyer')
+        cls.product_1 = Product.objects.create(
+            title='first', price=10, discount_price=9, balance=3,
+        )
+        cls.product_2 = Product.objects.create(
+            title='second', price=10, discount_price=9, balance=1,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def amount(self, product):
+        return ShippingCart.objects.get(user=self.user, product=product).amount
+
+    def test_to_cart_single_statement(self):
+        """
+        Добавление в корзину выполняется одним запросом,
+        первое - еще одним на загрузку счетчика остатка
+        """
+        url = f'/api/v1/products/{self.product_1.id}/to_cart/'
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.post(url).status_code, 200)
+        with self.assertNumQueries(1):
+            response = self.client.post(url, {'amount': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.amount(self.product_1), 3)
+
+    def test_to_cart_not_enough(self):
+        """ Количество в корзине не превышает остаток """
+        url = f'/api/v1/products/{self.product_1.id}/to_cart/'
+        self.client.post(url, {'amount': 2})
+
+        response = self.client.post(url, {'amount': 2})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.amount(self.product_1), 2)
+
+    def test_to_cart_not_found(self):
+        """ Несуществующий товар """
+        response = self.client.post('/api/v1/products/0/to_cart/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_bulk_to_cart(self):
+        """ Пакетное добавление товаров """
+        response = self.client.post(
+            '/api/v1/products/bulk_to_cart/',
+            [
+                {'product_id': self.product_1.id, 'amount': 2},
+                {'product_id': self.product_2.id},
+                {'product_id': self.product_1.id},
+            ],
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.amount(self.product_1), 3)
+        self.assertEqual(self.amount(self.product_2), 1)
+
+    def test_bulk_to_cart_all_or_nothing(self):
+        """ При нехватке одного товара корзина не меняется """
+        response = self.client.post(
+            '/api/v1/products/bulk_to_cart/',
+            [
+                {'product_id': self.product_1.id},
+                {'product_id': self.product_2.id, 'amount': 2},
+            ],
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ShippingCart.objects.exists())
+
+        # Резервы откатившейся транзакции возвращены
+        self.assertEqual(
+            stock.stock_counter.reserve({self.product_1.id: 3}),
+            {self.product_1.id: 3},
+        )
+
+    def test_amount_limit(self):
+        """
+        Количество позиции не выходит за предел smallint даже при
+        достаточном остатке: ошибка валидации, а не ошибка БД
+        """
+        Product.objects.update(balance=50000)
+        url = f'/api/v1/products/{self.product_1.id}/to_cart/'
+        self.client.post(url, {'amount': 30000})
+
+        response = self.client.post(url, {'amount': 30000})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.amount(self.product_1), 30000)
+
+        response = self.client.post(
+            '/api/v1/products/bulk_to_cart/',
+            [
+                {'product_id': self.product_2.id, 'amount': 20000},
+                {'product_id': self.product_2.id, 'amount': 20000},
+            ],
+            format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Max amount', str(response.json()))
+        self.assertFalse(
+            ShippingCart.objects.filter(product=self.product_2).exists(),
+        )
+
+
+class StockHoldTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(username=f'buyer {index}')
+            for index in range(3)
+        ]
+        cls.product = Product.objects.create(
+            title='hit', price=10, discount_price=9, balance=2,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.url = f'/api/v1/products/{self.product.id}/to_cart/'
+
+    def to_cart(self, user, amount=1):
+        self.client.force_authenticate(user=user)
+        return self.client.post(self.url, {'amount': amount})
+
+    def test_reserved_stock(self):
+        """ Товар в чужих корзинах недоступен, отказ без запросов к БД """
+        self.assertEqual(self.to_cart(self.users[0]).status_code, 200)
+        self.assertEqual(self.to_cart(self.users[1]).status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                stock.add_to_cart(self.users[2], {self.product.id: 1}),
+                set(),
+            )
+        response = self.to_cart(self.users[2])
+        self.assertEqual(response.status_code, 400)
+        cart = ShippingCart.objects.get(user=self.users[0])
+        self.assertGreater(cart.expires_at, timezone.now())
+
+    def test_expired_holds_released(self):
+        """
+        Истекший резерв снимается, позиция остается в корзине без резерва,
+        товар снова доступен
+        """
+        self.to_cart(self.users[0], amount=2)
+        ShippingCart.objects.update(
+            expires_at=timezone.now() - timedelta(seconds=1),
+        )
+        self.assertEqual(self.to_cart(self.users[1]).status_code, 400)
+
+        release_stock_holds.apply()
+
+        cart = ShippingCart.objects.get(user=self.users[0])
+        self.assertEqual(cart.amount, 2)
+        self.assertIsNone(cart.expires_at)
+        self.assertEqual(self.to_cart(self.users[1]).status_code, 200)
+
+    def test_counter_sync(self):
+        """ Сверка восстанавливает разошедшийся счетчик, новые не создает """
+        self.to_cart(self.users[0])
+        key = stock.stock_counter.key(self.product.id)
+        cache.set(key, 100)
+        other = Product.objects.create(
+            title='other', price=10, discount_price=9, balance=2,
+        )
+
+        release_stock_holds.apply()
+
+        self.assertEqual(cache.get(key), 1)
+        self.assertIsNone(cache.get(stock.stock_counter.key(other.id)))
+        self.assertIsNone(stock.stock_counter.change(other.id, -1))
+
+    def test_checkout_converts_hold(self):
+        """ Оформление заказа списывает остаток, счетчик не меняется """
+        self.to_cart(self.users[0])
+        self.client.force_authenticate(user=self.users[0])
+        response = self.client.post('/api/v1/orders/create_order/')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Order.objects.filter(user=self.users[0]).exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.balance, 1)
+
+        self.assertEqual(self.to_cart(self.users[1]).status_code, 200)
+        self.assertEqual(self.to_cart(self.users[2]).status_code, 400)
+
+    def test_restock(self):
+        """ Изменение остатка сверяет счетчик с БД """
+        self.to_cart(self.users[0], amount=2)
+        self.assertEqual(self.to_cart(self.users[1]).status_code, 400)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.balance = 3
+            self.product.save()
+        self.assertEqual(self.to_cart(self.users[1]).status_code, 200)
@@ -0,0 +1,62 @@
+from django.core.cache import cache
+from rest_framework.test import APIClient, APITestCase
+
+from apps.products.models import Category, Product
+
+
+class ConditionalRequestTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(title='test', slug='test')
+        cls.product = Product.objects.create(
+            title='test',
+            price=10,
+            discount_price=9,
+            balance=1,
+            category=cls.category,
+        )
+        cls.urls = (
+            '/api/v1/categories/',
+            f'/api/v1/categories/{cls.category.slug}/',
+            f'/api/v1/categories/{cls.category.slug}/products/',
+            '/api/v1/products/',
+            f'/api/v1/products/{cls.product.id}/',
+            '/api/v1/products/get_info/',
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def test_not_modified(self):
+        """ Совпадающий ETag дает 304 без обращения к БД """
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('Last-Modified', response)
+                etag = response['ETag']
+
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+
+    def test_etag_changes_with_catalog(self):
+        """ Изменение товара меняет ETag """
+        url = f'/api/v1/products/{self.product.id}/'
+        etag = self.client.get(url)['ETag']
+
+        self.product.title = 'changed'
+        self.product.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['title'], 'changed')
+
+    def test_etag_differs_by_query(self):
+        """ Разные страницы получают разные ETag """
+        first = self.client.get('/api/v1/products/')['ETag']
+        second = self.client.get('/api/v1/products/?page=1')['ETag']
+        self.assertNotEqual(first, second)
@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.test import APIClient, APITestCase
+
+from apps.products.models import Category, Product
+
+User = get_user_model()
+
+
+class ProductExchangeTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='admin')
+        Category.objects.create(title='phones', slug='phones')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+        cache.clear()
+
+    def upload(self, content, exchange_type='csv'):
+        return self.client.post(
+            f'/api/v1/products/import/?type={exchange_type}',
+            {'file': SimpleUploadedFile('products', content.encode())},
+            format='multipart',
+        )
+
+    def test_import(self):
+        response = self.upload(
+            'vendor_code,title,price,discount_price,balance,category\n'
+            'A1,First,10,9,3,phones\n'
+            'A2,Second,10,9,3,unknown\n'
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['saved'], 1)
+        self.assertEqual(data['errors'][0]['line'], 3)
+        self.assertTrue(Product.objects.filter(vendor_code='A1').exists())
+
+    def test_import_purges_cache(self):
+        """ Импорт сбрасывает закешированные списки """
+        anonymous = APIClient()
+        self.assertEqual(anonymous.get('/api/v1/products/').json()['count'], 0)
+        self.upload('{"vendor_code": "A1", "title": "x", "price": 1, '
+                    '"discount_price": 1, "balance": 1}\n', 'jsonl')
+        self.assertEqual(anonymous.get('/api/v1/products/').json()['count'], 1)
+
+    def test_export(self):
+        Product.objects.create(
+            vendor_code='A1', title='First', price=10, discount_price=9,
+            balance=3,
+        )
+        response = self.client.get('/api/v1/products/export/?type=csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            b''.join(response.streaming_content).decode().splitlines(),
+            [
+                'vendor_code,title,price,discount_price,balance,'
+                'short_description,description,category',
+                'A1,First,10.00,9.00,3,,,',
+            ],
+        )
+
+    def test_admin_only(self):
+        self.client.force_authenticate(user=None)
+        self.assertEqual(
+            self.client.get('/api/v1/products/export/').status_code, 401,
+        )
+        self.assertEqual(self.upload('').status_code, 401)
@@ -0,0 +1,89 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APITestCase
+
+from apps.api.fast_serializers import (FastProductDetailSerializer,
+                                       FastProductListSerializer)
+from apps.api.serializers import (ProductDetailSerializer,
+                                  ProductListSerializer)
+from apps.products.models import Category, Product
+
+
+class FastSerializerGoldenTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(
+            title='Категория "тест"', slug='test',
+        )
+        values = (
+            ('Телефон', Decimal('10'), Decimal('9.5'), category),
+            ('line\u2028separator', Decimal('0.01'), Decimal('0.01'), None),
+            ('quote " and \\ slash', Decimal('999999.99'), Decimal('1.1'),
+             category),
+            ('tab\tnew\nline', Decimal('12.34'), Decimal('12.30'), None),
+        )
+        Product.objects.bulk_create(
+            Product(
+                title=title,
+                price=price,
+                discount_price=discount_price,
+                balance=index,
+                description=f'описание {index}',
+                short_description=f'кратко {index}',
+                category=category,
+            )
+            for index, (title, price, discount_price, category)
+            in enumerate(values)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def test_rows_match_model_serializers(self):
+        """ Быстрые сериализаторы совпадают с ModelSerializer """
+        queryset = Product.objects.select_related('category')
+        pairs = (
+            (ProductListSerializer, FastProductListSerializer()),
+            (ProductDetailSerializer, FastProductDetailSerializer()),
+        )
+        for serializer_class, fast_serializer in pairs:
+            with self.subTest(serializer=serializer_class.__name__):
+                expected = serializer_class(queryset, many=True).data
+                fast = fast_serializer.many(
+                    fast_serializer.get_queryset(queryset)
+                )
+                self.assertEqual(
+                    JSONRenderer().render(fast),
+                    JSONRenderer().render(expected),
+                )
+
+    def check_responses(self):
+        queryset = Product.objects.select_related('category')
+        response = self.client.get('/api/v1/products/')
+        expected = {
+            'count': queryset.count(),
+            'next': None,
+            'previous': None,
+            'results': ProductListSerializer(queryset, many=True).data,
+        }
+        self.assertEqual(response.content, JSONRenderer().render(expected))
+
+        for product in queryset:
+            response = self.client.get(f'/api/v1/products/{product.id}/')
+            self.assertEqual(
+                response.content,
+                JSONRenderer().render(ProductDetailSerializer(product).data),
+            )
+
+    def test_responses_match(self):
+        """ Ответы API побайтно совпадают с прежними """
+        self.check_responses()
+
+    def test_responses_match_without_orjson(self):
+        """ Без orjson используется стандартный рендерер """
+        with mock.patch('apps.api.renderers.orjson', None):
+            self.check_responses()
@@ -0,0 +1,159 @@
+from decimal import Decimal
+from itertools import product as combinations
+
+from django.core.cache import cache
+from django.db import connection
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase
+
+from apps.api.filters import ProductFilterBackend
+from apps.products.models import Category, Product
+
+
+class ProductFilterTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(title='test', slug='test')
+        Product.objects.bulk_create(
+            Product(
+                title=f'product {index % 5}',
+                price=10 + index,
+                discount_price=10 + index - index % 4,
+                balance=index % 3,
+                category=category,
+            )
+            for index in range(30)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def get_ids(self, query):
+        ids = []
+        url = f'/api/v1/products/?pagination=cursor&{query}'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(item['id'] for item in response.json()['results'])
+            url = response.json()['next']
+        return ids
+
+    def test_filters(self):
+        products = Product.objects.all()
+        cases = (
+            ('price_min=15&price_max=20', products.filter(
+                price__gte=15, price__lte=20,
+            )),
+            ('in_stock=true', products.filter(balance__gt=0)),
+            ('in_stock=false', products.filter(balance=0)),
+            ('on_sale=true', products.filter(discount__gt=0)),
+            ('on_sale=1&in_stock=1', products.filter(
+                discount__gt=0, balance__gt=0,
+            )),
+        )
+        for query, expected in cases:
+            with self.subTest(query=query):
+                self.assertEqual(
+                    sorted(self.get_ids(query)),
+                    sorted(expected.values_list('id', flat=True)),
+                )
+
+    def test_ordering(self):
+        """ Обход по курсору для каждой сортировки без пропусков и повторов """
+        cases = (
+            ('ordering=price', ('price', 'id')),
+            ('ordering=-price', ('-price', '-id')),
+            ('ordering=discount', ('-discount', '-id')),
+            ('ordering=newest', ('-id',)),
+            ('ordering=discount&in_stock=true', ('-discount', '-id')),
+        )
+        for query, ordering in cases:
+            with self.subTest(query=query):
+                queryset = Product.objects.order_by(*ordering)
+                if 'in_stock' in query:
+                    queryset = queryset.filter(balance__gt=0)
+                self.assertEqual(
+                    self.get_ids(query),
+                    list(queryset.values_list('id', flat=True)),
+                )
+
+    def test_discount(self):
+        product = Product.objects.create(
+            title='discount', price=3, discount_price=2, balance=1,
+        )
+        product.refresh_from_db()
+        self.assertEqual(product.discount, Decimal('33.33'))
+
+    def test_invalid(self):
+        for query in (
+                'price_min=-1',
+                'price_min=20&price_max=10',
+                'in_stock=maybe',
+                'ordering=balance',
+        ):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/v1/products/?{query}')
+                self.assertEqual(response.status_code, 400)
+
+    def test_query_count(self):
+        with self.assertNumQueries(1):
+            self.client.get(
+                '/api/v1/products/'
+                '?pagination=cursor&in_stock=1&on_sale=1&ordering=price',
+            )
+
+
+class ProductFilterIndexTest(APITestCase):
+    """ Ни одна комбинация фильтров не должна читать всю таблицу """
+
+    @classmethod
+    def setUpTestData(cls):
+        Product.objects.bulk_create(
+            Product(
+                title=f'product {index}',
+                price=10 + index,
+                discount_price=10 + index - index % 4,
+                balance=index % 3,
+            )
+            for index in range(100)
+        )
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # На маленькой таблице планировщик выбрал бы полный проход
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsesIndex(self, plan):
+        if connection.vendor == 'postgresql':
+            self.assertNotIn('Seq Scan', plan)
+            return
+        # В SQLite целочисленный первичный ключ и есть таблица:
+        # SCAN без сортировки - это обход по id, плохо только вместе с
+        # сортировкой всей таблицы
+        full_scan = any(
+            line.endswith('SCAN products_product')
+            for line in plan.splitlines()
+        )
+        self.assertFalse(full_scan and 'TEMP B-TREE' in plan, plan)
+
+    def test_plans(self):
+        filters = (
+            ('', 'price_min=10', 'price_min=10&price_max=50'),
+            ('', 'in_stock=true'),
+            ('', 'on_sale=true'),
+            ('', *(
+                f'ordering={ordering}'
+                for ordering in ProductFilterBackend.orderings
+            )),
+        )
+        factory = APIRequestFactory()
+        for parts in combinations(*filters):
+            query = '&'.join(part for part in parts if part)
+            with self.subTest(query=query):
+                request = Request(factory.get(f'/?{query}'))
+                queryset = ProductFilterBackend().filter_queryset(
+                    request, Product.objects.all(), None,
+                )
+                self.assertUsesIndex(queryset[:20].explain())
@@ -0,0 +1,77 @@
+import json
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient, APITestCase
+
+from apps.products.models import Order
+
+User = get_user_model()
+
+
+class OrderExportTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='admin')
+        cls.buyer = User.objects.create_user(
+            username='buyer', email='buyer@example.com',
+        )
+        cls.orders = Order.objects.bulk_create(
+            Order(
+                user=cls.buyer,
+                quantity=index + 1,
+                total_cost=10,
+                is_payed=index % 2 == 0,
+            )
+            for index in range(4)
+        )
+        for day, order in enumerate(cls.orders, start=1):
+            order.data_created = datetime(2024, 1, day, tzinfo=timezone.utc)
+        Order.objects.bulk_update(cls.orders, ('data_created',))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def export(self, query):
+        response = self.client.get(f'/api/v1/orders/export/?{query}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_filters(self):
+        content = self.export(
+            'type=jsonl&created_from=2024-01-02T00:00:00Z'
+            '&created_to=2024-01-04T00:00:00Z',
+        )
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(
+            [row['id'] for row in rows],
+            [self.orders[1].id, self.orders[2].id],
+        )
+        self.assertEqual(rows[0]['email'], 'buyer@example.com')
+        self.assertEqual(rows[0]['total_cost'], '10.00')
+
+        content = self.export('type=jsonl&is_payed=false')
+        self.assertEqual(
+            [json.loads(line)['id'] for line in content.splitlines()],
+            [self.orders[1].id, self.orders[3].id],
+        )
+
+    def test_csv(self):
+        lines = self.export('is_payed=true').splitlines()
+        self.assertEqual(
+            lines[0],
+            'id,data_created,username,email,quantity,total_cost,is_payed,'
+            'order_id',
+        )
+        self.assertEqual(len(lines), 3)
+
+    def test_admin_only(self):
+        self.client.force_authenticate(user=self.buyer)
+        response = self.client.get('/api/v1/orders/export/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_invalid(self):
+        response = self.client.get('/api/v1/orders/export/?created_from=x')
+        self.assertEqual(response.status_code, 400)
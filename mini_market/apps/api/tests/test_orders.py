@@ -0,0 +1,288 @@
+import hashlib
+import hmac
+import json
+import threading
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient, APITestCase
+
+from apps.products.models import (NotEnoughProducts, Order, OrderItem,
+                                  OutboxMessage, Product, ShippingCart)
+from apps.products.tasks import payment
+
+User = get_user_model()
+
+
+@mock.patch('apps.products.outbox.outbox_relay')
+class CreateOrderTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='buyer')
+        cls.product_1 = Product.objects.create(
+            title='first', price='10.50', discount_price=9, balance=5,
+        )
+        cls.product_2 = Product.objects.create(
+            title='second', price=3, discount_price=2, balance=1,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_create_order(self, relay):
+        """ Заказ считается в БД, остатки списываются, корзина очищается """
+        ShippingCart.objects.create(
+            user=self.user, product=self.product_1, amount=2,
+        )
+        ShippingCart.objects.create(
+            user=self.user, product=self.product_2, amount=1,
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/v1/orders/create_order/')
+
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(user=self.user)
+        self.assertEqual(order.quantity, 3)
+        self.assertEqual(order.total_cost, Decimal('24.00'))
+        self.product_1.refresh_from_db()
+        self.product_2.refresh_from_db()
+        self.assertEqual(self.product_1.balance, 3)
+        self.assertEqual(self.product_2.balance, 0)
+        self.assertFalse(ShippingCart.objects.filter(user=self.user).exists())
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.task, payment.name)
+        self.assertEqual(message.args, [order.id])
+        relay.wake.assert_called_once_with()
+
+    def test_order_items(self, relay):
+        """ Позиции заказа хранят цену и название на момент покупки """
+        ShippingCart.objects.create(
+            user=self.user, product=self.product_1, amount=2,
+        )
+        ShippingCart.objects.create(
+            user=self.user, product=self.product_2, amount=1,
+        )
+        self.client.post('/api/v1/orders/create_order/')
+        Product.objects.filter(pk=self.product_1.pk).update(
+            title='renamed', price=99,
+        )
+
+        order = Order.objects.get(user=self.user)
+        self.assertEqual(
+            sorted(order.items.values_list(
+                'product_id', 'title', 'price', 'amount',
+            )),
+            [
+                (self.product_1.id, 'first', Decimal('10.50'), 2),
+                (self.product_2.id, 'second', Decimal('3.00'), 1),
+            ],
+        )
+
+    def test_cart_changed_during_checkout(self, relay):
+        """
+        Позиция, добавленная в корзину во время оформления, не попадает
+        в заказ и не удаляется из корзины
+        """
+        ShippingCart.objects.create(
+            user=self.user, product=self.product_1, amount=2,
+        )
+        write_off = ShippingCart.write_off
+
+        def add_to_cart(items):
+            ShippingCart.objects.create(
+                user=self.user, product=self.product_2, amount=1,
+            )
+            return write_off(items)
+
+        with mock.patch.object(ShippingCart, 'write_off', add_to_cart):
+            response = self.client.post('/api/v1/orders/create_order/')
+
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(user=self.user)
+        self.assertEqual(order.quantity, 2)
+        self.assertEqual(order.total_cost, Decimal('21.00'))
+        self.assertEqual(
+            list(order.items.values_list('product_id', 'amount')),
+            [(self.product_1.id, 2)],
+        )
+        self.assertEqual(
+            list(self.user.carts.values_list('product_id', flat=True)),
+            [self.product_2.id],
+        )
+        self.product_2.refresh_from_db()
+        self.assertEqual(self.product_2.balance, 1)
+
+    def test_not_enough(self, relay):
+        """ При нехватке товара ничего не списывается """
+        ShippingCart.objects.create(
+            user=self.user, product=self.product_1, amount=1,
+        )
+        ShippingCart.objects.create(
+            user=self.user, product=self.product_2, amount=2,
+        )
+
+        response = self.client.post('/api/v1/orders/create_order/')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+        self.product_1.refresh_from_db()
+        self.assertEqual(self.product_1.balance, 5)
+        self.assertEqual(
+            ShippingCart.objects.filter(user=self.user).count(), 2,
+        )
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_empty_cart(self, relay):
+        """ Пустую корзину оформить нельзя """
+        response = self.client.post('/api/v1/orders/create_order/')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+
+class WriteOffTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(
+            title='hot', price=1, discount_price=1, balance=1,
+        )
+        cls.users = [
+            User.objects.create_user(username=f'buyer{index}')
+            for index in range(2)
+        ]
+        ShippingCart.objects.bulk_create(
+            ShippingCart(user=user, product=cls.product, amount=1)
+            for user in cls.users
+        )
+
+    def test_conditional_update(self):
+        """
+        Остаток проверяется в самом UPDATE: корзина, прочитанная до
+        чужого списания, не уводит остаток в минус
+        """
+        with transaction.atomic():
+            items = [ShippingCart.get_for_order(user) for user in self.users]
+
+        self.assertEqual(
+            ShippingCart.write_off(items[0]), [self.product.id],
+        )
+        with self.assertRaises(NotEnoughProducts):
+            ShippingCart.write_off(items[1])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.balance, 0)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Только для PostgreSQL')
+@mock.patch('apps.products.outbox.outbox_relay')
+class ConcurrentOrderTest(TransactionTestCase):
+    buyers = 20
+    balance = 5
+
+    def setUp(self):
+        self.product = Product.objects.create(
+            title='hot', price=1, discount_price=1, balance=self.balance,
+        )
+        self.users = [
+            User.objects.create_user(username=f'buyer{index}')
+            for index in range(self.buyers)
+        ]
+        ShippingCart.objects.bulk_create(
+            ShippingCart(user=user, product=self.product, amount=1)
+            for user in self.users
+        )
+
+    def checkout(self, user, barrier, results):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        barrier.wait()
+        try:
+            response = client.post('/api/v1/orders/create_order/')
+            results.append(response.status_code)
+        finally:
+            connection.close()
+
+    def test_no_overselling(self, relay):
+        """ Параллельные покупатели не продают больше остатка """
+        barrier = threading.Barrier(self.buyers)
+        results = []
+        threads = [
+            threading.Thread(
+                target=self.checkout, args=(user, barrier, results),
+            )
+            for user in self.users
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.product.refresh_from_db()
+        sold = Order.objects.aggregate(sold=Sum('quantity'))['sold']
+        self.assertEqual(len(results), self.buyers)
+        self.assertEqual(self.product.balance, 0)
+        self.assertEqual(sold, self.balance)
+        self.assertEqual(Order.objects.count(), self.balance)
+        self.assertEqual(OutboxMessage.objects.count(), self.balance)
+        self.assertEqual(
+            ShippingCart.objects.count(), self.buyers - self.balance,
+        )
+
+
+@override_settings(PAYMENT_WEBHOOK_SECRET='secret')
+class PaymentWebhookTest(APITestCase):
+    url = '/api/v1/orders/payment_webhook/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='buyer')
+        cls.order = Order.objects.create(
+            user=cls.user, quantity=1, total_cost=10, order_id='stub-1',
+        )
+
+    def notify(self, data, secret='secret'):
+        body = json.dumps(data).encode()
+        signature = hmac.new(secret.encode(), body, hashlib.sha256)
+        return self.client.post(
+            self.url,
+            body,
+            content_type='application/json',
+            headers={'X-Signature': signature.hexdigest()},
+        )
+
+    def test_paid(self):
+        """ Уведомление обновляет заказ одним запросом, повтор безвреден """
+        data = {'orderId': 'stub-1', 'status': 'paid'}
+        with self.assertNumQueries(1):
+            response = self.notify(data)
+        self.assertEqual(response.status_code, 200)
+        self.order.refresh_from_db()
+        self.assertTrue(self.order.is_payed)
+
+        response = self.notify(data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Order.objects.filter(is_payed=True).count(), 1)
+
+    def test_not_paid(self):
+        for data in (
+                {'orderId': 'stub-1', 'status': 'pending'},
+                {'orderId': 'unknown', 'status': 'paid'},
+        ):
+            with self.subTest(data=data):
+                self.assertEqual(self.notify(data).status_code, 200)
+        self.assertFalse(Order.objects.filter(is_payed=True).exists())
+
+    def test_signature(self):
+        data = {'orderId': 'stub-1', 'status': 'paid'}
+        self.assertEqual(self.notify(data, secret='other').status_code, 403)
+        with override_settings(PAYMENT_WEBHOOK_SECRET=''):
+            self.assertEqual(self.notify(data, secret='').status_code, 403)
+        self.assertEqual(self.notify({'status': 'paid'}).status_code, 400)
+        self.order.refresh_from_db()
+        self.assertFalse(self.order.is_payed)
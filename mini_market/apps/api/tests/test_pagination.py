@@ -0,0 +1,119 @@
+import json
+from base64 import urlsafe_b64encode
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APITestCase
+
+from apps.api.pagination import KeysetPagination
+from apps.products.models import Category, Product
+
+
+class KeysetPaginationTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(title='test', slug='test')
+        Product.objects.bulk_create(
+            Product(
+                title=f'product {index % 7}',
+                price=10,
+                discount_price=9,
+                balance=1,
+                category=cls.category,
+            )
+            for index in range(25)
+        )
+        cls.expected = list(
+            Product.objects.order_by('title', 'id').values_list(
+                'id', flat=True,
+            )
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def walk(self, url):
+        ids = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(
+                any('COUNT(' in query['sql'] for query in queries),
+                'Пагинация по ключу не должна считать строки',
+            )
+            data = response.json()
+            ids.extend(product['id'] for product in data['results'])
+            url = data['next']
+        return ids
+
+    def test_products_cursor(self):
+        """ Обход всех товаров по курсору без пропусков и повторов """
+        ids = self.walk('/api/v1/products/?pagination=cursor')
+        self.assertEqual(ids, self.expected)
+
+    def test_category_products_cursor(self):
+        """ Обход товаров категории по курсору """
+        ids = self.walk(
+            f'/api/v1/categories/{self.category.slug}/products/'
+            f'?pagination=cursor'
+        )
+        self.assertEqual(ids, self.expected)
+
+    def test_page_number_by_default(self):
+        """ Без параметра сохраняется постраничная пагинация """
+        response = self.client.get('/api/v1/products/')
+        self.assertEqual(response.json()['count'], 25)
+
+    def test_invalid_cursor(self):
+        """ Испорченный курсор """
+        response = self.client.get('/api/v1/products/?cursor=broken')
+        self.assertEqual(response.status_code, 404)
+
+    def test_tampered_cursor(self):
+        """ Подделанный или чужой курсор - 404, а не ошибка сервера """
+        ordering = ['title', 'id']
+        for cursor in (
+                ['product 1', 1],
+                {'ordering': ordering, 'position': ['a', {'x': 1}]},
+                {'ordering': ordering, 'position': [None, None]},
+                {'ordering': ordering, 'position': ['a', 'b']},
+                {'ordering': ordering, 'position': ['a']},
+                {'ordering': ['price', 'id'], 'position': ['a', 1]},
+        ):
+            with self.subTest(cursor=cursor):
+                encoded = urlsafe_b64encode(json.dumps(cursor).encode())
+                response = self.client.get(
+                    f'/api/v1/products/?cursor={encoded.decode()}',
+                )
+                self.assertEqual(response.status_code, 404)
+
+    def test_cursor_of_other_ordering(self):
+        """ Курсор сортировки по названию не подходит к сортировке по цене """
+        response = self.client.get('/api/v1/products/?pagination=cursor')
+        url = response.json()['next'] + '&ordering=price'
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_leading_column_bound(self):
+        """
+        Условие следующей страницы ограничивает обход индекса первым полем
+        ключа, а не только фильтрует строки с начала индекса
+        """
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        for ordering, position, bound in (
+                (('title', 'id'), ['product 3', 1], r"title\)?(::text)? >="),
+                (('-price', '-id'), [10, 1], r'price <='),
+        ):
+            with self.subTest(ordering=ordering):
+                plan = Product.objects.order_by(*ordering).filter(
+                    KeysetPagination.after(ordering, position),
+                )[:10].explain()
+                if connection.vendor == 'postgresql':
+                    self.assertRegex(plan, rf'Index Cond: .*{bound}')
+                else:
+                    name = ordering[0].lstrip('-')
+                    self.assertRegex(plan, rf'USING INDEX \w+ \({name}[<>]')
@@ -0,0 +1,50 @@
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from apps.api.benchmarks import ENDPOINTS, Fixtures, get_clients
+from apps.products.cache import category_statistic, category_tree
+
+
+class QueryCountTest(TestCase):
+    """ Число запросов к БД на эндпоинт при пустом кеше """
+
+    def count_queries(self, **sizes):
+        """ Наполнение откатывается, чтобы замеры не влияли друг на друга """
+        counts = {}
+        with transaction.atomic():
+            fixtures = Fixtures(**sizes).create()
+            clients = get_clients()
+            for endpoint in ENDPOINTS:
+                cache.clear()
+                category_tree.invalidate()
+                category_statistic.invalidate()
+                with CaptureQueriesContext(connection) as queries:
+                    response = endpoint.request(clients, fixtures)
+                self.assertLess(
+                    response.status_code, 300, f'{endpoint.name}: {response}',
+                )
+                counts[endpoint.name] = len(queries)
+            transaction.set_rollback(True)
+        return fixtures, counts
+
+    def test_query_budget(self):
+        fixtures, counts = self.count_queries(
+            categories=7, products=30, users=2, carts=3,
+        )
+        for endpoint in ENDPOINTS:
+            with self.subTest(endpoint=endpoint.name):
+                self.assertLessEqual(
+                    counts[endpoint.name], endpoint.get_max_queries(fixtures),
+                )
+
+    def test_no_growth_with_data(self):
+        """ Число запросов не зависит от объема каталога (нет N+1) """
+        _, small = self.count_queries(
+            categories=4, products=40, users=2, carts=2,
+        )
+        _, large = self.count_queries(
+            categories=40, products=300, users=20, carts=2,
+        )
+        self.assertEqual(small, large)
@@ -0,0 +1,95 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.products.models import Product, ShippingCart
+from mini_market.replicas import ReplicaMiddleware, ReplicaRouter
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=('replica',))
+class ReplicaRoutingTest(TestCase):
+    """ Второй файл SQLite играет роль реплики с другими данными """
+
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='buyer')
+        cls.product = Product.objects.create(
+            title='primary', price=10, discount_price=9, balance=5,
+        )
+        Product.objects.using('replica').create(
+            id=cls.product.id, title='replica', price=10, discount_price=9,
+            balance=5,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def get_titles(self):
+        response = self.client.get('/api/v1/products/')
+        self.assertEqual(response.status_code, 200)
+        return [product['title'] for product in response.json()['results']]
+
+    def test_etag_reads_from_primary(self):
+        """
+        Ответ с ETag по версии каталога не берется с отставшей реплики,
+        иначе клиент хранил бы старые данные под новым ETag
+        """
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/v1/products/')
+        self.assertIn('ETag', response)
+        self.assertEqual(response.json()['results'][0]['title'], 'primary')
+
+    def test_response_cache_filled_from_primary(self):
+        """ Кешируемый ответ анониму не берется с отставшей реплики """
+        self.assertEqual(self.get_titles(), ['primary'])
+        response = self.client.get(f'/api/v1/products/{self.product.id}/')
+        self.assertEqual(response.json()['title'], 'primary')
+
+    def test_write_sticks_to_primary(self):
+        """ После записи клиент читает с основной БД до истечения cookie """
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            f'/api/v1/products/{self.product.id}/to_cart/', {'amount': 1},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(ShippingCart.objects.filter(user=self.user).exists())
+        self.assertFalse(
+            ShippingCart.objects.using('replica').exists()
+        )
+
+        cookie = response.cookies[ReplicaMiddleware.cookie_name]
+        self.assertEqual(cookie['max-age'], 5)
+        self.assertEqual(self.get_titles(), ['primary'])
+
+    @override_settings(DATABASE_REPLICAS=())
+    def test_without_replicas(self):
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.get_titles(), ['primary'])
+
+    def test_routing(self):
+        """ Вне запросов и для админки чтение идет с основной БД """
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Product), DEFAULT_DB_ALIAS)
+
+        routed = []
+        middleware = ReplicaMiddleware(
+            lambda request: routed.append(router.db_for_read(Product)) or
+            HttpResponse()
+        )
+        factory = RequestFactory()
+        for request in (
+                factory.get('/api/v1/products/'),
+                factory.get('/admin/products/product/'),
+                factory.post('/api/v1/orders/create_order/'),
+        ):
+            middleware(request)
+        self.assertEqual(routed, ['replica', 'default', 'default'])
+        self.assertEqual(router.db_for_read(Product), DEFAULT_DB_ALIAS)
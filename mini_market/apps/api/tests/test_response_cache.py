@@ -0,0 +1,193 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APITestCase
+
+from apps.products.models import Category, Product
+
+User = get_user_model()
+
+
+class ResponseCacheTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(title='test', slug='test')
+        cls.product_1 = Product.objects.create(
+            title='first',
+            price=10,
+            discount_price=9,
+            balance=1,
+            category=cls.category,
+        )
+        cls.product_2 = Product.objects.create(
+            title='second', price=10, discount_price=9, balance=1,
+        )
+        cls.user = User.objects.create_user(username='user')
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def assertCached(self, url, cached=True):
+        if cached:
+            with self.assertNumQueries(0):
+                response = self.client.get(url)
+        else:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assertNotCached(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertTrue(queries, f'{url} отдан из кеша')
+
+    def test_anonymous_cached(self):
+        """ Повторный анонимный запрос отдается из кеша """
+        urls = (
+            '/api/v1/products/',
+            '/api/v1/products/?page=1',
+            f'/api/v1/products/{self.product_1.id}/',
+            f'/api/v1/categories/{self.category.slug}/products/',
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                expected = self.client.get(url).json()
+                self.assertEqual(self.assertCached(url).json(), expected)
+
+    def test_query_normalized(self):
+        """ Порядок параметров не влияет на ключ """
+        self.client.get('/api/v1/products/?page=1&pagination=cursor')
+        self.assertCached('/api/v1/products/?pagination=cursor&page=1')
+
+    def test_unknown_params_ignored(self):
+        """ Посторонние параметры не создают новых записей в кеше """
+        self.client.get('/api/v1/products/?page=1&x=1')
+        self.assertCached('/api/v1/products/?x=2&page=1')
+        self.assertCached('/api/v1/products/?page=1')
+
+    def test_tagged_pages_limited(self):
+        """ Метка товара помнит ограниченное число страниц """
+        urls = (
+            '/api/v1/products/',
+            '/api/v1/products/?ordering=price',
+            '/api/v1/products/?ordering=-price',
+        )
+        with override_settings(RESPONSE_CACHE_MAX_TAGGED=2):
+            for url in urls:
+                self.client.get(url)
+
+        tag = cache.get(f'response:tags:{self.product_1.id}')
+        self.assertEqual(len(tag), 2)
+        # Вытесненная из метки страница удалена, иначе ее не сбросить
+        self.assertCached(urls[2])
+        self.assertNotCached(urls[0])
+
+    def test_authenticated_not_cached(self):
+        """ Ответы авторизованным не кешируются """
+        self.client.force_authenticate(user=self.user)
+        url = f'/api/v1/products/{self.product_1.id}/'
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+    def test_targeted_purge(self):
+        """ Изменение товара сбрасывает только страницы с ним """
+        url_1 = f'/api/v1/products/{self.product_1.id}/'
+        url_2 = f'/api/v1/products/{self.product_2.id}/'
+        self.client.get(url_1)
+        self.client.get(url_2)
+        self.client.get('/api/v1/products/')
+
+        product = Product.objects.get(pk=self.product_1.pk)
+        product.description = 'changed'
+        product.save()
+
+        self.assertEqual(
+            self.assertCached(url_1, cached=False).json()['description'],
+            'changed',
+        )
+        self.assertCached(url_2)
+
+    def test_lists_purged_on_create(self):
+        """ Новый товар сбрасывает списки, но не карточки """
+        url = f'/api/v1/products/{self.product_2.id}/'
+        self.client.get(url)
+        self.client.get('/api/v1/products/')
+
+        Product.objects.create(
+            title='third', price=10, discount_price=9, balance=1,
+        )
+
+        response = self.assertCached('/api/v1/products/', cached=False)
+        self.assertEqual(response.json()['count'], 3)
+        self.assertCached(url)
+
+    def test_category_rename(self):
+        """ Переименование категории сбрасывает страницы ее товаров """
+        url = '/api/v1/products/'
+        self.client.get(url)
+
+        category = Category.objects.get(pk=self.category.pk)
+        category.title = 'renamed'
+        category.save()
+
+        response = self.assertCached(url, cached=False)
+        self.assertIn(
+            'renamed',
+            [product['category'] for product in response.json()['results']],
+        )
+
+    def test_purged_after_commit(self):
+        """
+        Страница, закешированная до фиксации изменения, сбрасывается
+        после фиксации
+        """
+        url = f'/api/v1/products/{self.product_1.id}/'
+        product = Product.objects.get(pk=self.product_1.pk)
+        product.description = 'changed'
+        with self.captureOnCommitCallbacks() as callbacks:
+            product.save()
+            self.client.get(url)
+        self.assertCached(url)
+
+        for callback in callbacks:
+            callback()
+        self.assertNotCached(url)
+
+    def test_branch_delete(self):
+        """
+        Удаление ветки сбрасывает карточки товаров всех подкатегорий
+        одним запросом товаров
+        """
+        parent = self.category
+        for index in range(3):
+            parent = Category.objects.create(
+                title=f'sub {index}', slug=f'sub-{index}', parent=parent,
+            )
+        product = Product.objects.create(
+            title='deep', price=10, discount_price=9, balance=1,
+            category=parent,
+        )
+        urls = [
+            f'/api/v1/products/{product_id}/'
+            for product_id in (self.product_1.id, product.id)
+        ]
+        for url in urls:
+            self.client.get(url)
+
+        with CaptureQueriesContext(connection) as queries:
+            Category.objects.get(pk=self.category.pk).delete()
+        products_table = Product._meta.db_table
+        self.assertEqual(
+            len([
+                query for query in queries
+                if query['sql'].startswith('SELECT') and
+                f'FROM "{products_table}"' in query['sql']
+            ]),
+            1,
+        )
+        for url in urls:
+            self.assertNotCached(url)
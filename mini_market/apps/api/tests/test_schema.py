@@ -0,0 +1,17 @@
+import io
+
+from django.core.management import call_command
+from rest_framework.test import APIClient, APITestCase
+
+
+class SchemaTest(APITestCase):
+    def test_schema_valid(self):
+        """ Схема OpenAPI собирается без ошибок и предупреждений """
+        call_command(
+            'spectacular', '--validate', '--fail-on-warn',
+            stdout=io.StringIO(),
+        )
+
+    def test_docs(self):
+        response = APIClient().get('/api/v1/docs/')
+        self.assertEqual(response.status_code, 200)
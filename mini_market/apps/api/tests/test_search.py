@@ -0,0 +1,94 @@
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from rest_framework.test import APIClient, APITestCase
+
+from apps.products.models import Category, Product
+
+
+class ProductSearchTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.root = Category.objects.create(title='root', slug='root')
+        cls.child = Category.objects.create(
+            title='child', slug='child', parent=cls.root,
+        )
+        cls.other = Category.objects.create(title='other', slug='other')
+        cls.phone = Product.objects.create(
+            title='Phone case', price=10, discount_price=9, balance=1,
+            category=cls.child,
+        )
+        cls.charger = Product.objects.create(
+            title='Charger', price=10, discount_price=9, balance=1,
+            short_description='for phone', category=cls.other,
+        )
+        cls.cable = Product.objects.create(
+            title='Cable', price=10, discount_price=9, balance=1,
+            description='usb cable for phone and tablet', category=cls.root,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def search(self, **params):
+        response = self.client.get('/api/v1/products/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return {product['id'] for product in response.json()['results']}
+
+    def test_all_fields(self):
+        """ Поиск по названию, краткому и полному описанию """
+        self.assertEqual(
+            self.search(q='phone'),
+            {self.phone.id, self.charger.id, self.cable.id},
+        )
+
+    def test_prefix_and_all_terms(self):
+        """ Слова ищутся по префиксу и должны встречаться все """
+        self.assertEqual(self.search(q='pho tab'), {self.cable.id})
+        self.assertEqual(self.search(q='phone missing'), set())
+
+    def test_category_subtree(self):
+        """ Фильтр по категории включает подкатегории """
+        self.assertEqual(
+            self.search(q='phone', category='root'),
+            {self.phone.id, self.cable.id},
+        )
+        response = self.client.get(
+            '/api/v1/products/search/', {'q': 'phone', 'category': 'none'},
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_query_required(self):
+        response = self.client.get('/api/v1/products/search/')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.search(q='!!!'), set())
+
+    def test_cursor(self):
+        """ Пагинация по ключу работает по порядку выдачи поиска """
+        ids = []
+        url = '/api/v1/products/search/?q=phone&pagination=cursor'
+        while url:
+            data = self.client.get(url).json()
+            ids.extend(product['id'] for product in data['results'])
+            url = data['next']
+        self.assertEqual(
+            sorted(ids), sorted([self.phone.id, self.charger.id, self.cable.id]),
+        )
+
+    @skipUnless(connection.vendor == 'postgresql', 'Только для PostgreSQL')
+    def test_rank_and_index(self):
+        """ Совпадение в названии выше совпадения в описании """
+        ids = [
+            product['id'] for product in self.client.get(
+                '/api/v1/products/search/', {'q': 'phone'},
+            ).json()['results']
+        ]
+        self.assertEqual(ids[0], self.phone.id)
+        self.assertEqual(ids[-1], self.cable.id)
+
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = Product.search('phone').explain()
+        self.assertIn('product_search_vector_idx', plan)
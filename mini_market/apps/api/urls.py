@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import include, path
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 from rest_framework.routers import SimpleRouter
@@ -21,3 +22,6 @@ urlpatterns = [
         name='swagger',
     ),
 ]
+
+if settings.ASYNC_VIEWS:
+    urlpatterns.insert(0, path('v1/', include('apps.api.async_urls')))
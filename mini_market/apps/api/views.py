@@ -1,21 +1,58 @@
-from django.http import Http404
-from drf_spectacular.utils import extend_schema, extend_schema_view
+import io
+
+from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
+from drf_spectacular.utils import (OpenApiParameter, extend_schema,
+                                   extend_schema_view)
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.exceptions import ValidationError
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 
-from apps.api.serializers import (CategoryCreateSerializer, CategorySerializer,
-                                  InfoProductsSerializer, OrderSerializer,
+from apps.api.cache import response_cache
+from apps.api.decorators import anonymous_cache, catalog_conditional
+from apps.api.fast_serializers import (FastProductDetailSerializer,
+                                       FastProductListSerializer,
+                                       FastReadMixin)
+from apps.api.filters import ProductFilterBackend
+from apps.api.pagination import KeysetPagination, ProductPagination
+from apps.api.serializers import (CartAmountSerializer, CartItemSerializer,
+                                  CategoryCreateSerializer, CategorySerializer,
+                                  ExchangeTypeSerializer,
+                                  InfoProductsSerializer,
+                                  OrderExportSerializer, OrderSerializer,
+                                  PaymentWebhookSerializer,
                                   ProductCreateSerializer,
                                   ProductDetailSerializer,
+                                  ProductImportSerializer,
                                   ProductListSerializer,
+                                  ProductSearchSerializer,
                                   SubCategoryCreateSerializer)
-from apps.products.models import Category, Order, Product, ShippingCart
+from apps.products import outbox, stock
+from apps.products.cache import (catalog_version, category_statistic,
+                                 category_tree)
+from apps.products.exchange import (EXCHANGE_CONTENT_TYPES, export_orders,
+                                    export_products, filter_orders,
+                                    import_products, read_rows)
+from apps.products.models import (Category, NotEnoughProducts, Order,
+                                  OrderItem, Product, ShippingCart)
+from apps.products.payment import verify_signature
 from apps.products.tasks import payment
 
 
+def exchange_response(lines, exchange_type, name):
+    """ Потоковый ответ с файлом выгрузки """
+    response = StreamingHttpResponse(
+        lines,
+        content_type=f'{EXCHANGE_CONTENT_TYPES[exchange_type]}; charset=utf-8',
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{name}.{exchange_type}"'
+    )
+    return response
+
+
 @extend_schema(tags=('Категории',))
 @extend_schema_view(
     list=extend_schema(description='Выдача списка категорий'),
@@ -24,7 +61,7 @@ from apps.products.tasks import payment
     destroy=extend_schema(description='Удаление категории'),
     retrieve=extend_schema(description='Выдача категории по slug'),
 )
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(FastReadMixin, viewsets.ModelViewSet):
     queryset = Category.objects
     serializer_class = CategorySerializer
     lookup_field = 'slug'
@@ -41,7 +78,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
         match self.action:
             case 'products':
                 slug = self.kwargs['slug']
-                categories = Category.all_sub_categories(slug)
+                categories = category_tree.get().descendants(slug)
                 if categories is None:
                     raise Http404
                 self.queryset = Product.objects.filter(
@@ -63,15 +100,33 @@ class CategoryViewSet(viewsets.ModelViewSet):
 
         return self.serializer_class
 
+    @catalog_conditional
+    def list(self, request, *args, **kwargs):
+        categories = category_statistic.annotate(
+            category_tree.get().categories,
+        )
+        return Response(self.get_serializer(categories, many=True).data)
+
+    @catalog_conditional
+    def retrieve(self, request, *args, **kwargs):
+        category = category_tree.get().get(kwargs['slug'])
+        if category is None:
+            raise Http404
+        category, = category_statistic.annotate((category,))
+        return Response(self.get_serializer(category).data)
+
     @action(('post',), detail=False)
     def create_sub_category(self, request, *args, **kwargs):
         """ Создание подкатегорий """
         return super().create(request)
 
     @action(('get',), detail=True)
+    @catalog_conditional
+    @anonymous_cache(is_list=True)
     def products(self, request, slug):
         """ Выдача всех продуктов выбранной категории """
-        return super(CategoryViewSet, self).list(request)
+        self.pagination_class = KeysetPagination
+        return self.fast_list(FastProductListSerializer())
 
 
 @extend_schema(tags=('Продукты',))
@@ -82,24 +137,27 @@ class CategoryViewSet(viewsets.ModelViewSet):
     destroy=extend_schema(description='Удаление товара'),
     retrieve=extend_schema(description='Детальная выдача товара'),
 )
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(FastReadMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductListSerializer
-    pagination_class = PageNumberPagination
+    pagination_class = ProductPagination
+    filter_backends = (ProductFilterBackend,)
 
     def get_permissions(self):
         match self.action:
-            case 'list' | 'retrieve' | 'get_info':
+            case 'list' | 'retrieve' | 'get_info' | 'search':
                 return permissions.AllowAny(),
-            case 'to_cart':
+            case 'to_cart' | 'bulk_to_cart':
                 return permissions.IsAuthenticated(),
             case _:
                 return permissions.IsAdminUser(),
 
     def get_queryset(self):
         match self.action:
-            case 'list':
+            case 'list' | 'retrieve':
                 return Product.objects.select_related('category').all()
+            case 'search':
+                return self.get_search_queryset()
             case 'get_info':
                 return Product.get_statistic()
             case _:
@@ -107,7 +165,7 @@ class ProductViewSet(viewsets.ModelViewSet):
 
     def get_serializer_class(self):
         match self.action:
-            case 'list':
+            case 'list' | 'search':
                 self.serializer_class = ProductListSerializer
             case 'create':
                 self.serializer_class = ProductCreateSerializer
@@ -120,7 +178,46 @@ class ProductViewSet(viewsets.ModelViewSet):
 
         return self.serializer_class
 
+    @catalog_conditional
+    @anonymous_cache(is_list=True)
+    def list(self, request, *args, **kwargs):
+        return self.fast_list(FastProductListSerializer())
+
+    @catalog_conditional
+    @anonymous_cache(is_list=False)
+    def retrieve(self, request, *args, **kwargs):
+        return self.fast_retrieve(FastProductDetailSerializer())
+
+    def get_search_queryset(self):
+        serializer = ProductSearchSerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        queryset = Product.objects.select_related('category')
+        slug = serializer.validated_data.get('category')
+        if slug is not None:
+            categories = category_tree.get().descendants(slug)
+            if categories is None:
+                raise Http404
+            queryset = queryset.filter(category__in=categories)
+
+        return Product.search(serializer.validated_data['q'], queryset)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter('q', str, required=True,
+                             description='Поисковый запрос'),
+            OpenApiParameter('category', str,
+                             description='Slug категории с подкатегориями'),
+        ],
+    )
+    @action(('get',), detail=False)
+    @catalog_conditional
+    def search(self, request):
+        """ Полнотекстовый поиск товаров, сначала самые релевантные """
+        return self.fast_list(FastProductListSerializer())
+
     @action(('get',), detail=False)
+    @catalog_conditional
     def get_info(self, request):
         """ Выдача минимальной цены, максимальной цены и остатка """
         data = self.get_queryset()
@@ -128,8 +225,54 @@ class ProductViewSet(viewsets.ModelViewSet):
             self.get_serializer(data).data, status=status.HTTP_200_OK
         )
 
+    def get_exchange_type(self):
+        serializer = ExchangeTypeSerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data['type']
+
     @extend_schema(
-        request=None,
+        request={'multipart/form-data': ProductImportSerializer},
+        parameters=[
+            OpenApiParameter('type', str, enum=('csv', 'jsonl')),
+        ],
+        responses={200: None},
+    )
+    @action(
+        ('post',),
+        detail=False,
+        url_path='import',
+        parser_classes=(MultiPartParser,),
+    )
+    def import_catalog(self, request):
+        """ Загрузка товаров из CSV/JSONL с обновлением по артикулу """
+        exchange_type = self.get_exchange_type()
+        serializer = ProductImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        stream = io.TextIOWrapper(
+            serializer.validated_data['file'].file,
+            encoding='utf-8-sig',
+            newline='',
+        )
+        result = import_products(read_rows(stream, exchange_type))
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter('type', str, enum=('csv', 'jsonl')),
+        ],
+        responses={(200, 'text/csv'): str},
+    )
+    @action(('get',), detail=False, url_path='export')
+    def export_catalog(self, request):
+        """ Потоковая выгрузка всех товаров в CSV/JSONL """
+        exchange_type = self.get_exchange_type()
+        return exchange_response(
+            export_products(exchange_type), exchange_type, 'products',
+        )
+
+    @extend_schema(
+        request=CartAmountSerializer,
         responses={200: None},
         methods=['POST'],
         tags=('Корзина',),
@@ -137,19 +280,54 @@ class ProductViewSet(viewsets.ModelViewSet):
     @action(('post',), detail=True)
     def to_cart(self, request, pk):
         """ Добавление товара в корзину. """
-        user = request.user
-        product = self.get_object()
+        serializer = CartAmountSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
 
-        if product.balance < 1:
+        try:
+            product_id = int(pk)
+        except ValueError:
+            raise Http404
+
+        added = stock.add_to_cart(
+            request.user, {product_id: serializer.validated_data['amount']},
+        )
+        if not added:
+            if not Product.objects.filter(pk=product_id).exists():
+                raise Http404
             raise ValidationError('Not enough amount')
 
-        position, created = ShippingCart.objects.get_or_create(
-            product=product, user=user
+        return Response(status=status.HTTP_200_OK)
+
+    @extend_schema(
+        request=CartItemSerializer(many=True),
+        responses={200: None},
+        methods=['POST'],
+        tags=('Корзина',),
+    )
+    @action(('post',), detail=False)
+    def bulk_to_cart(self, request):
+        """ Добавление нескольких товаров в корзину одним запросом. """
+        serializer = CartItemSerializer(
+            data=request.data, many=True, allow_empty=False,
         )
+        serializer.is_valid(raise_exception=True)
 
-        if not created:
-            position.amount += 1
-            position.save()
+        items = {
+            item['product_id']: item['amount']
+            for item in serializer.validated_data
+        }
+
+        with transaction.atomic():
+            added = stock.add_to_cart(request.user, items)
+            not_added = sorted(items.keys() - added)
+            if not_added:
+                # Позиции откатятся вместе с транзакцией, резервы - вручную
+                stock.stock_counter.release(
+                    {product_id: items[product_id] for product_id in added},
+                )
+                raise ValidationError(
+                    f'Not enough amount or not found: {not_added}'
+                )
 
         return Response(status=status.HTTP_200_OK)
 
@@ -159,6 +337,34 @@ class OrderViewSet(viewsets.GenericViewSet):
     serializer_class = OrderSerializer
     queryset = Order.objects
 
+    def get_permissions(self):
+        match self.action:
+            case 'export':
+                return permissions.IsAdminUser(),
+            case 'payment_webhook':
+                # Запрос подписан платежным сервисом, а не пользователем
+                return permissions.AllowAny(),
+            case _:
+                return permissions.IsAuthenticated(),
+
+    @extend_schema(
+        parameters=[OrderExportSerializer],
+        responses={(200, 'text/csv'): str},
+        tags=('Заказы',),
+    )
+    @action(('get',), detail=False)
+    def export(self, request):
+        """ Потоковая выгрузка заказов за период в CSV/JSONL """
+        serializer = OrderExportSerializer(data=request.query_params.dict())
+        serializer.is_valid(raise_exception=True)
+        filters = dict(serializer.validated_data)
+        exchange_type = filters.pop('type')
+        return exchange_response(
+            export_orders(exchange_type, filter_orders(**filters)),
+            exchange_type,
+            'orders',
+        )
+
     @extend_schema(
         request=None,
         responses={201: None},
@@ -169,30 +375,64 @@ class OrderViewSet(viewsets.GenericViewSet):
     def create_order(self, request):
         """ Создание заказа. """
 
-        # Вариант получить данные в один запрос, если смысл задания был в этом
-        # Но необходимо так же проверить остаток товара
-        # data = ShippingCart.objects.filter(
-        #     user=request.user,
-        # ).select_related('product').aggregate(
-        #     total_count=Sum('amount'),
-        #     total_cost=Sum(F('amount') * F('product__price'))
-        # )
-
-        data, errors = ShippingCart.get_data_for_order(request.user)
-        if len(errors) > 0:
-            raise ValidationError(
-                f'Max available count for this product: {errors}'
+        with transaction.atomic():
+            items = ShippingCart.get_for_order(request.user)
+            data, errors = ShippingCart.get_data_for_order(items)
+            if data['total_count'] == 0:
+                raise ValidationError('Cart is empty')
+            if len(errors) > 0:
+                raise ValidationError(
+                    f'Max available count for this product: {errors}'
+                )
+
+            serializer = self.get_serializer(
+                data={
+                    'quantity': data['total_count'],
+                    'total_cost': data['total_cost'],
+                }
             )
+            serializer.is_valid(raise_exception=True)
 
-        serializer = self.get_serializer(
-            data={
-                'quantity': data['total_count'],
-                'total_cost': data['total_cost'],
-            }
-        )
-        serializer.is_valid(raise_exception=True)
-        order = serializer.save(user=request.user)
-        request.user.carts.all().delete()
+            try:
+                product_ids = stock.write_off(items)
+            except NotEnoughProducts as error:
+                raise ValidationError(
+                    f'Max available count for this product: {error.products}'
+                )
+
+            order = serializer.save(user=request.user)
+            OrderItem.create_from_cart(order, items)
+            ShippingCart.objects.filter(
+                pk__in=[item['id'] for item in items],
+            ).delete()
+            outbox.enqueue(payment, order.id)
 
-        payment.apply_async((order.id,))
+        # Остатки изменены без сигналов моделей
+        catalog_version.bump()
+        response_cache.purge_products(product_ids)
+        if Product.objects.filter(pk__in=product_ids, balance=0).exists():
+            # Закончившиеся товары выпадают из списков с in_stock
+            response_cache.purge_lists()
         return Response(status=status.HTTP_201_CREATED)
+
+    @extend_schema(
+        request=PaymentWebhookSerializer,
+        responses={200: None},
+        methods=['POST'],
+        tags=('Заказы',)
+    )
+    @action(('post',), detail=False, authentication_classes=())
+    def payment_webhook(self, request):
+        """
+        Уведомление платежного сервиса о смене статуса.
+        Повторная доставка ничего не меняет, поэтому ответ всегда 200.
+        """
+        if not verify_signature(
+                request.body, request.headers.get('X-Signature'),
+        ):
+            raise PermissionDenied('Invalid signature')
+        serializer = PaymentWebhookSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if serializer.validated_data['status'] == 'paid':
+            Order.mark_payed(serializer.validated_data['orderId'])
+        return Response(status=status.HTTP_200_OK)
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from apps.products.models import Category, Order, Product
+from apps.products.models import (Category, Order, OrderItem, PendingEmail,
+                                  Product)
 
 
 @admin.register(Product)
@@ -15,7 +16,26 @@ class CategoryAdmin(admin.ModelAdmin):
     list_display_links = ('id', 'title')
 
 
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    fields = ('product', 'title', 'price', 'amount')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ('id', 'data_created', 'user', 'is_payed')
     list_display_links = ('id', 'data_created')
+    list_select_related = ('user',)
+    list_filter = ('is_payed',)
+    inlines = (OrderItemInline,)
+    # Без COUNT(*) по всей таблице на каждой странице
+    show_full_result_count = False
+
+
+@admin.register(PendingEmail)
+class PendingEmailAdmin(admin.ModelAdmin):
+    list_display = ('id', 'recipient', 'subject', 'attempts', 'send_after')
+    list_display_links = ('id', 'recipient')
@@ -0,0 +1,187 @@
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from apps.products.models import Category, CategoryStatistic
+
+
+class CategoryTree:
+    """ Снимок дерева категорий для выдачи без запросов к БД """
+
+    def __init__(self, categories):
+        self.categories = categories
+        self.by_slug = {category['slug']: category for category in categories}
+        self.children = {}
+        for category in categories:
+            self.children.setdefault(
+                category['parent_id'], [],
+            ).append(category['id'])
+
+    def get(self, slug):
+        return self.by_slug.get(slug)
+
+    def descendants(self, slug):
+        """
+        Множество id категории и всех ее подкатегорий.
+        None, если категории не существует.
+        """
+        category = self.by_slug.get(slug)
+        if category is None:
+            return None
+
+        result = set()
+        stack = [category['id']]
+        while stack:
+            category_id = stack.pop()
+            result.add(category_id)
+            stack.extend(self.children.get(category_id, ()))
+        return result
+
+
+class SnapshotCache:
+    """
+    Двухуровневый кеш снимка данных из БД.
+    Снимок хранится в памяти воркера и в общем кеше (Redis) под номером
+    версии. Изменение данных увеличивает версию, после чего воркеры
+    подхватывают новый снимок.
+    """
+
+    prefix = None
+
+    def __init__(self):
+        self.version_key = f'{self.prefix}:version'
+        self._lock = threading.Lock()
+        self._state = None
+
+    def get(self):
+        now = time.monotonic()
+        state = self._state
+        if (
+                state is not None and
+                now - state[2] < settings.CATEGORY_TREE_LOCAL_TIMEOUT
+        ):
+            return state[1]
+
+        version = self.get_version()
+        if state is not None and state[0] == version:
+            self._state = (version, state[1], now)
+            return state[1]
+
+        with self._lock:
+            snapshot = self.build(self._load(version))
+            self._state = (version, snapshot, now)
+        return snapshot
+
+    def get_version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            # Новая версия не должна совпасть с вытесненной ранее
+            cache.add(self.version_key, time.time_ns())
+            version = cache.get(self.version_key)
+        return version
+
+    def invalidate(self):
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.add(self.version_key, time.time_ns())
+        self._state = None
+
+    def _load(self, version):
+        key = f'{self.prefix}:{version}'
+        rows = cache.get(key)
+        if rows is None:
+            # Снимок кешируется под новой версией, поэтому читается с
+            # основной БД: отставшая реплика закрепила бы старые данные
+            rows = self.query(DEFAULT_DB_ALIAS)
+            cache.set(key, rows, settings.CATEGORY_TREE_TIMEOUT)
+        return rows
+
+    def query(self, using):
+        """ Строки снимка, сохраняемые в общем кеше """
+        raise NotImplementedError
+
+    def build(self, rows):
+        """ Объект снимка в памяти воркера """
+        return rows
+
+
+class CategoryTreeCache(SnapshotCache):
+    """ Снимок дерева категорий, сбрасывается только изменением категорий """
+
+    prefix = 'category_tree'
+    fields = ('id', 'title', 'slug', 'parent_id')
+
+    def query(self, using):
+        return list(Category.objects.using(using).values(*self.fields))
+
+    def build(self, rows):
+        return CategoryTree(rows)
+
+
+class CategoryStatisticCache(SnapshotCache):
+    """
+    Снимок CategoryStatistic по id категории. Версия отдельная от дерева:
+    изменения товаров сбрасывают только сводку, а не дерево.
+    """
+
+    prefix = 'category_statistic'
+    fields = ('product_count', 'min_price', 'max_price')
+    empty = {'product_count': 0, 'min_price': None, 'max_price': None}
+
+    def query(self, using):
+        return list(
+            CategoryStatistic.objects.using(using).values_list(
+                'category_id', *self.fields,
+            )
+        )
+
+    def build(self, rows):
+        return {row[0]: dict(zip(self.fields, row[1:])) for row in rows}
+
+    def annotate(self, categories):
+        """ Категории из снимка дерева со сводкой по товарам """
+        statistic = self.get()
+        return [
+            {**category, **statistic.get(category['id'], self.empty)}
+            for category in categories
+        ]
+
+
+category_tree = CategoryTreeCache()
+category_statistic = CategoryStatisticCache()
+
+
+class CatalogVersion:
+    """
+    Глобальная версия каталога и время его последнего изменения.
+    Используется для ETag и Last-Modified ответов на чтение каталога.
+    """
+
+    version_key = 'catalog:version'
+    modified_key = 'catalog:modified'
+
+    def get(self):
+        data = cache.get_many((self.version_key, self.modified_key))
+        if len(data) < 2:
+            self.bump()
+            data = cache.get_many((self.version_key, self.modified_key))
+        return data[self.version_key], data.get(self.modified_key)
+
+    def bump(self):
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.add(self.version_key, time.time_ns(), None)
+        cache.set(
+            self.modified_key,
+            datetime.now(timezone.utc).replace(microsecond=0),
+            None,
+        )
+
+
+catalog_version = CatalogVersion()
@@ -0,0 +1,216 @@
+import csv
+import json
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.dispatch import Signal
+
+from apps.products.models import (Category, CategoryStatistic, Order, Product,
+                                  ProductStatistic)
+
+# Колонки файлов обмена, category - slug категории
+EXCHANGE_FIELDS = (
+    'vendor_code',
+    'title',
+    'price',
+    'discount_price',
+    'balance',
+    'short_description',
+    'description',
+    'category',
+)
+MODEL_FIELDS = EXCHANGE_FIELDS[:-1]
+UPDATE_FIELDS = (*MODEL_FIELDS[1:], 'category')
+EXCHANGE_TYPES = ('csv', 'jsonl')
+EXCHANGE_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+# Колонки выгрузки заказов и соответствующие поля
+ORDER_EXPORT_COLUMNS = {
+    'id': 'id',
+    'data_created': 'data_created',
+    'username': 'user__username',
+    'email': 'user__email',
+    'quantity': 'quantity',
+    'total_cost': 'total_cost',
+    'is_payed': 'is_payed',
+    'order_id': 'order_id',
+}
+
+# Отправляется после импорта с product_ids записанных товаров,
+# bulk_create не вызывает post_save
+products_imported = Signal()
+
+
+class ImportResult:
+    """ Итог импорта: число записанных строк и ошибки по строкам """
+
+    def __init__(self):
+        self.saved = 0
+        self.errors = []
+
+    def add_error(self, line, errors):
+        self.errors.append({'line': line, 'errors': errors})
+
+    def as_dict(self):
+        return {'saved': self.saved, 'errors': self.errors}
+
+
+def read_rows(stream, type):
+    """ Ленивое чтение текстового потока, выдает (номер строки, словарь) """
+    match type:
+        case 'csv':
+            reader = csv.DictReader(stream)
+            for row in reader:
+                yield reader.line_num, row
+        case 'jsonl':
+            for line, text in enumerate(stream, start=1):
+                if not text.strip():
+                    continue
+                try:
+                    row = json.loads(text)
+                except ValueError as error:
+                    row = error
+                yield line, row
+        case _:
+            raise ValueError(f'Unknown exchange type "{type}"')
+
+
+def build_product(row, categories):
+    """ Проверка строки полями модели, без запросов к БД """
+    if not isinstance(row, dict):
+        raise ValidationError({'row': [f'Invalid row: {row}']})
+
+    errors = {}
+    values = {}
+    for name in MODEL_FIELDS:
+        field = Product._meta.get_field(name)
+        value = row.get(name)
+        if value in (None, '') and field.has_default():
+            values[name] = field.get_default()
+            continue
+        try:
+            values[name] = field.clean(value, None)
+        except ValidationError as error:
+            errors[name] = error.messages
+
+    if not values.get('vendor_code') and 'vendor_code' not in errors:
+        errors['vendor_code'] = ['This field is required.']
+
+    slug = row.get('category') or None
+    category_id = None
+    if slug is not None:
+        category_id = categories.get(slug)
+        if category_id is None:
+            errors['category'] = [f'Unknown category "{slug}"']
+
+    if errors:
+        raise ValidationError(errors)
+    return Product(category_id=category_id, **values)
+
+
+def import_products(rows, chunk_size=1000):
+    """
+    Импорт товаров с обновлением по артикулу.
+    Строки пишутся пачками по chunk_size через bulk_create с
+    update_conflicts, каждая пачка в своей транзакции.
+    Ошибочные строки пропускаются и попадают в отчет.
+    """
+    categories = dict(Category.objects.values_list('slug', 'id'))
+    result = ImportResult()
+    product_ids = []
+
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_size)):
+        # В одной пачке артикул может встречаться только один раз
+        products = {}
+        for line, row in chunk:
+            try:
+                product = build_product(row, categories)
+            except ValidationError as error:
+                result.add_error(line, error.message_dict)
+                continue
+            products[product.vendor_code] = product
+
+        if not products:
+            continue
+        with transaction.atomic():
+            Product.objects.bulk_create(
+                products.values(),
+                update_conflicts=True,
+                unique_fields=('vendor_code',),
+                update_fields=UPDATE_FIELDS,
+            )
+        result.saved += len(products)
+        product_ids.extend(product.pk for product in products.values())
+
+    if result.saved:
+        ProductStatistic.recalculate()
+        CategoryStatistic.recalculate()
+        products_imported.send(sender=Product, product_ids=product_ids)
+    return result
+
+
+class Echo:
+    """ Файловый объект для csv.writer, возвращающий записанную строку """
+
+    def write(self, value):
+        return value
+
+
+def write_rows(type, header, rows):
+    """ Строки файла CSV/JSONL по кортежам значений в порядке header """
+    match type:
+        case 'csv':
+            writer = csv.writer(Echo())
+            yield writer.writerow(header)
+            for row in rows:
+                yield writer.writerow(row)
+        case 'jsonl':
+            for row in rows:
+                yield json.dumps(
+                    dict(zip(header, row)),
+                    ensure_ascii=False,
+                    default=str,
+                ) + '\n'
+        case _:
+            raise ValueError(f'Unknown exchange type "{type}"')
+
+
+def export_products(type, queryset=None, chunk_size=2000):
+    """ Потоковая выгрузка товаров, выдает строки файла """
+    if queryset is None:
+        queryset = Product.objects.all()
+    rows = queryset.order_by('id').values_list(
+        *MODEL_FIELDS, 'category__slug',
+    ).iterator(chunk_size=chunk_size)
+    return write_rows(type, EXCHANGE_FIELDS, rows)
+
+
+def filter_orders(created_from=None, created_to=None, is_payed=None):
+    """ Заказы за период по дате создания, индекс order_created_payed_idx """
+    orders = Order.objects.all()
+    if created_from is not None:
+        orders = orders.filter(data_created__gte=created_from)
+    if created_to is not None:
+        orders = orders.filter(data_created__lt=created_to)
+    if is_payed is not None:
+        orders = orders.filter(is_payed=is_payed)
+    return orders
+
+
+def export_orders(type, queryset=None, chunk_size=2000):
+    """
+    Потоковая выгрузка заказов для бухгалтерии.
+    Строки читаются серверным курсором пачками по chunk_size,
+    поэтому память не зависит от числа заказов.
+    """
+    if queryset is None:
+        queryset = Order.objects.all()
+    rows = queryset.order_by('data_created').values_list(
+        *ORDER_EXPORT_COLUMNS.values(),
+    ).iterator(chunk_size=chunk_size)
+    return write_rows(type, tuple(ORDER_EXPORT_COLUMNS), rows)
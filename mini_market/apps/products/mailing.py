@@ -0,0 +1,78 @@
+import logging
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from apps.products.models import PendingEmail
+
+logger = logging.getLogger(__name__)
+
+
+def send_pending_emails():
+    """
+    Отправляет пачку готовых писем по одному SMTP соединению.
+    Отправленные удаляются, ошибочные откладываются с удвоением задержки.
+    Возвращает число взятых из очереди писем.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            PendingEmail.objects.select_for_update(
+                skip_locked=True,
+            ).filter(
+                send_after__lte=now,
+            ).order_by('send_after', 'id')[:settings.EMAIL_BATCH_SIZE]
+        )
+        if not emails:
+            return 0
+
+        sent = []
+        failed = []
+        with get_connection() as connection:
+            for email in emails:
+                message = EmailMessage(
+                    subject=email.subject,
+                    body=email.message,
+                    from_email=settings.EMAIL_HOST_USER,
+                    to=(email.recipient,),
+                    connection=connection,
+                )
+                try:
+                    message.send()
+                except smtplib.SMTPServerDisconnected as error:
+                    failed.append((email, error))
+                    connection.close()
+                    connection.open()
+                except (smtplib.SMTPException, OSError) as error:
+                    failed.append((email, error))
+                else:
+                    sent.append(email.id)
+
+        PendingEmail.objects.filter(id__in=sent).delete()
+        postpone_failed(failed, now)
+    return len(emails)
+
+
+def postpone_failed(failed, now):
+    postponed = []
+    dropped = []
+    for email, error in failed:
+        email.attempts += 1
+        if email.attempts >= settings.EMAIL_MAX_ATTEMPTS:
+            logger.error(
+                f'Email to "{email.recipient}" dropped after '
+                f'{email.attempts} attempts: {error}'
+            )
+            dropped.append(email.id)
+            continue
+        email.send_after = now + timedelta(
+            seconds=settings.EMAIL_RETRY_DELAY * 2 ** (email.attempts - 1),
+        )
+        postponed.append(email)
+
+    PendingEmail.objects.filter(id__in=dropped).delete()
+    PendingEmail.objects.bulk_update(postponed, ('attempts', 'send_after'))
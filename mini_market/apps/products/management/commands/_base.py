@@ -0,0 +1,48 @@
+import math
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+
+class BenchmarkCommand(BaseCommand):
+    """
+    Базовая команда для замеров производительности.
+    Все данные, созданные во время замера, откатываются.
+    """
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.benchmark(*args, **options)
+            transaction.set_rollback(True)
+
+    def benchmark(self, *args, **options):
+        raise NotImplementedError
+
+    @staticmethod
+    def measure(func, *args, repeat=1, **kwargs):
+        """ Возвращает результат последнего вызова и список замеров в мс """
+        timings = []
+        result = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            timings.append((time.perf_counter() - start) * 1000)
+        return result, timings
+
+    @staticmethod
+    def percentile(timings, percent):
+        """ Перцентиль замеров методом ближайшего ранга """
+        ordered = sorted(timings)
+        index = max(math.ceil(len(ordered) * percent / 100) - 1, 0)
+        return ordered[index]
+
+    def report(self, title, timings):
+        self.stdout.write(
+            f'{title:<40} '
+            f'p50 {statistics.median(timings):10.3f} ms   '
+            f'p99 {self.percentile(timings, 99):10.3f} ms   '
+            f'max {max(timings):10.3f} ms   '
+            f'n={len(timings)}'
+        )
@@ -0,0 +1,80 @@
+from apps.products.management.commands._base import BenchmarkCommand
+from apps.products.models import Category
+
+
+def legacy_all_sub_categories(slug):
+    """ Прежний алгоритм обхода дерева, оставлен для сравнения """
+    try:
+        parent = Category.objects.get(slug=slug)
+    except Category.DoesNotExist:
+        return None
+
+    result = {parent.id}
+    categories = Category.objects.all()
+
+    i = 0
+    while i < len(categories):
+        if (
+                categories[i].parent_id in result and
+                categories[i].id not in result
+        ):
+            result.add(categories[i].id)
+            i = 0
+        i += 1
+    return result
+
+
+class Command(BenchmarkCommand):
+    help = 'Сравнение выборки подкатегорий по пути и прежним обходом'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', nargs='+', type=int, default=(1000, 10000, 100000),
+        )
+        parser.add_argument('--branching', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--legacy-limit',
+            type=int,
+            default=10000,
+            help='Максимальный размер дерева для прежнего алгоритма',
+        )
+
+    def benchmark(self, *args, **options):
+        for size in options['sizes']:
+            slug = self.build_tree(size, options['branching'])
+            self.stdout.write(f'Дерево из {size} категорий')
+
+            result, timings = self.measure(
+                Category.all_sub_categories, slug, repeat=options['repeat'],
+            )
+            self.report(f'  path index ({len(result)} ids)', timings)
+
+            if size > options['legacy_limit']:
+                self.stdout.write('  legacy loop пропущен (--legacy-limit)')
+                continue
+            legacy, timings = self.measure(legacy_all_sub_categories, slug)
+            assert legacy == result, 'Результаты алгоритмов расходятся'
+            self.report('  legacy loop', timings)
+
+    @staticmethod
+    def build_tree(size, branching):
+        """
+        Создает дерево заданного размера с явными id и путями.
+        Возвращает slug узла первого уровня.
+        """
+        Category.objects.all().delete()
+        categories = []
+        for index in range(1, size + 1):
+            parent = categories[(index - 2) // branching] if index > 1 else None
+            categories.append(
+                Category(
+                    id=index,
+                    title=f'bench {index}',
+                    slug=f'bench-{index}',
+                    parent=parent,
+                    path=f'{parent.path if parent else "/"}{index}/',
+                )
+            )
+        Category.objects.bulk_create(categories, batch_size=5000)
+        return categories[1].slug
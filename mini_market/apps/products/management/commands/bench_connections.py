@@ -0,0 +1,170 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIServer
+
+import requests
+from django.contrib.auth import get_user_model
+from django.core.servers.basehttp import WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.products.management.commands._base import BenchmarkCommand
+from apps.products.models import Category, Product
+
+User = get_user_model()
+
+PRODUCTS_PATH = '/api/v1/products/'
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PooledWSGIServer(ThreadingMixIn, WSGIServer):
+    """
+    WSGI сервер с фиксированным числом потоков, как gthread воркер gunicorn.
+    Потоки живут весь замер, поэтому соединения с БД в них переиспользуются.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, threads):
+        super().__init__(('127.0.0.1', 0), QuietRequestHandler)
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+        self.set_app(get_wsgi_application())
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_port}'
+
+    def process_request(self, request, client_address):
+        self.executor.submit(
+            self.process_request_thread, request, client_address,
+        )
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.executor.shutdown()
+        self.server_close()
+
+
+class Command(BenchmarkCommand):
+    help = 'Задержка списка товаров под нагрузкой при разных CONN_MAX_AGE'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--products', type=int, default=100)
+        parser.add_argument(
+            '--conn-max-age',
+            type=int,
+            nargs='+',
+            default=[0, 600],
+            help='Значения CONN_MAX_AGE для встроенного сервера',
+        )
+        parser.add_argument(
+            '--url',
+            help='Адрес запущенного сервера (например, gunicorn), '
+                 'вместо встроенного',
+        )
+        parser.add_argument('--token', help='JWT для запросов к --url')
+
+    def handle(self, *args, **options):
+        # Потоки сервера читают данные своими соединениями,
+        # поэтому они фиксируются и удаляются после замера
+        if options['url']:
+            self.load(
+                'external server', options['url'], options['token'], options,
+            )
+            return
+        category = Category.objects.create(
+            title='bench', slug='bench-connections',
+        )
+        user = User.objects.create_user(username='bench-connections')
+        try:
+            Product.objects.bulk_create(
+                Product(
+                    title=f'bench {index}',
+                    price=10,
+                    discount_price=9,
+                    balance=1,
+                    short_description='bench',
+                    description='bench',
+                    category=category,
+                )
+                for index in range(options['products'])
+            )
+            options['token'] = str(AccessToken.for_user(user))
+            self.benchmark(**options)
+        finally:
+            Product.objects.filter(category=category).delete()
+            category.delete()
+            user.delete()
+
+    def benchmark(self, *args, **options):
+        settings_dict = connections.settings['default']
+        initial = settings_dict.get('CONN_MAX_AGE', 0)
+        self.stdout.write(
+            f'{connections["default"].vendor}, '
+            f'{options["concurrency"]} потоков сервера и клиента'
+        )
+        opened = []
+
+        def count_connection(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        connection_created.connect(count_connection)
+        try:
+            for max_age in options['conn_max_age']:
+                settings_dict['CONN_MAX_AGE'] = max_age
+                opened.clear()
+                with PooledWSGIServer(options['concurrency']) as server:
+                    self.load(
+                        f'CONN_MAX_AGE={max_age}', server.url, options['token'],
+                        options,
+                    )
+                self.stdout.write(
+                    f'{"":<40} connections opened: {len(opened)}'
+                )
+        finally:
+            connection_created.disconnect(count_connection)
+            settings_dict['CONN_MAX_AGE'] = initial
+
+    def load(self, title, url, token, options):
+        """ Параллельные запросы к списку товаров, замер каждого ответа """
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        sessions = threading.local()
+        created = []
+
+        def get(_):
+            if not hasattr(sessions, 'session'):
+                sessions.session = requests.Session()
+                sessions.session.headers.update(headers)
+                created.append(sessions.session)
+            response, timings = self.measure(
+                sessions.session.get, url + PRODUCTS_PATH,
+            )
+            response.raise_for_status()
+            return timings[0]
+
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            # Прогрев: соединения клиента и первые запросы к БД
+            list(pool.map(get, range(options['concurrency'] * 5)))
+            timings, elapsed = self.measure(
+                lambda: list(pool.map(get, range(options['requests']))),
+            )
+        for session in created:
+            session.close()
+        self.report(title, timings)
+        self.stdout.write(
+            f'{"":<40} {len(timings) * 1000 / elapsed[0]:.1f} req/s'
+        )
@@ -0,0 +1,49 @@
+from django.core.mail import send_mail
+from django.test import override_settings
+
+from apps.products.management.commands._base import BenchmarkCommand
+from apps.products.models import PendingEmail
+from apps.products.stubs import SMTPStubServer
+from apps.products.tasks import send_emails
+
+
+class Command(BenchmarkCommand):
+    help = 'Писем в секунду: отдельные соединения против отправки пачкой'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=1000)
+
+    def benchmark(self, *args, **options):
+        count = options['messages']
+        recipients = [f'user{index}@example.com' for index in range(count)]
+
+        with SMTPStubServer() as stub, override_settings(**stub.settings()):
+            def one_by_one():
+                for recipient in recipients:
+                    send_mail(
+                        subject='subject',
+                        message='text',
+                        from_email=None,
+                        recipient_list=(recipient,),
+                    )
+
+            def batched():
+                PendingEmail.objects.bulk_create(
+                    PendingEmail(
+                        recipient=recipient, subject='subject', message='text',
+                    )
+                    for recipient in recipients
+                )
+                send_emails.apply()
+
+            for title, func in (
+                    ('send_mail per message', one_by_one),
+                    ('send_emails batch', batched),
+            ):
+                connections = stub.connections
+                _, timings = self.measure(func)
+                self.report(title, timings)
+                self.stdout.write(
+                    f'{"":<40} {count * 1000 / timings[0]:.0f} messages/s, '
+                    f'connections: {stub.connections - connections}'
+                )
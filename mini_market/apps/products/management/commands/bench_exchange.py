@@ -0,0 +1,70 @@
+import csv
+import io
+
+from apps.products.exchange import (EXCHANGE_FIELDS, export_products,
+                                    import_products, read_rows)
+from apps.products.management.commands._base import BenchmarkCommand
+from apps.products.models import Category, Product
+
+
+class Command(BenchmarkCommand):
+    help = 'Скорость потокового импорта и выгрузки товаров'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument(
+            '--legacy-rows',
+            type=int,
+            default=1000,
+            help='Строк для замера прежней записи по одному товару',
+        )
+
+    def benchmark(self, *args, **options):
+        rows = options['rows']
+        Category.objects.create(title='bench', slug='bench-exchange')
+        content = self.build_csv(rows)
+
+        for title in ('import csv (insert)', 'import csv (update)'):
+            result, timings = self.measure(
+                import_products,
+                read_rows(io.StringIO(content), 'csv'),
+                chunk_size=options['chunk_size'],
+            )
+            assert not result.errors, result.errors[:5]
+            self.report_rate(title, timings, rows)
+
+        for exchange_type in ('csv', 'jsonl'):
+            _, timings = self.measure(
+                lambda: sum(1 for _ in export_products(exchange_type)),
+            )
+            self.report_rate(f'export {exchange_type}', timings, rows)
+
+        legacy_rows = options['legacy_rows']
+        category = Category.objects.get(slug='bench-exchange')
+
+        def save_one_by_one():
+            for index in range(legacy_rows):
+                Product.objects.create(
+                    title=f'legacy {index}', price=10, discount_price=9,
+                    balance=1, category=category,
+                )
+
+        _, timings = self.measure(save_one_by_one)
+        self.report_rate('save() per product', timings, legacy_rows)
+
+    @staticmethod
+    def build_csv(rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXCHANGE_FIELDS)
+        for index in range(rows):
+            writer.writerow((
+                f'bench-{index}', f'product {index}', '10.50', '9.99',
+                index % 100, 'short', 'description', 'bench-exchange',
+            ))
+        return buffer.getvalue()
+
+    def report_rate(self, title, timings, rows):
+        self.report(title, timings)
+        self.stdout.write(f'{"":<40} {rows * 1000 / timings[0]:.0f} rows/s')
@@ -0,0 +1,73 @@
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+
+from apps.products.exchange import export_orders
+from apps.products.management.commands._base import BenchmarkCommand
+from apps.products.models import Order
+
+User = get_user_model()
+
+
+class Command(BenchmarkCommand):
+    help = 'Скорость и пиковая память потоковой выгрузки заказов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', nargs='+', type=int, default=(100000, 1000000),
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument(
+            '--legacy-limit',
+            type=int,
+            default=100000,
+            help='Максимум заказов для замера загрузки всего queryset',
+        )
+
+    def benchmark(self, *args, **options):
+        user = User.objects.create_user(
+            username='bench-export', email='bench@example.com',
+        )
+        total = 0
+        for size in sorted(options['sizes']):
+            Order.objects.bulk_create(
+                (
+                    Order(user=user, quantity=1, total_cost=10)
+                    for _ in range(size - total)
+                ),
+                batch_size=5000,
+            )
+            total = size
+            self.stdout.write(f'{size} заказов')
+
+            for exchange_type in ('csv', 'jsonl'):
+                (count, peak), timings = self.measure(
+                    self.traced,
+                    lambda: sum(1 for _ in export_orders(
+                        exchange_type, chunk_size=options['chunk_size'],
+                    )),
+                )
+                self.report(f'  export {exchange_type}', timings)
+                self.stdout.write(
+                    f'{"":<40} {size * 1000 / timings[0]:.0f} rows/s, '
+                    f'peak {peak / 2 ** 20:.1f} MiB'
+                )
+
+            if size > options['legacy_limit']:
+                continue
+            (_, peak), timings = self.measure(
+                self.traced,
+                lambda: list(Order.objects.select_related('user')),
+            )
+            self.report('  list(queryset)', timings)
+            self.stdout.write(f'{"":<40} peak {peak / 2 ** 20:.1f} MiB')
+
+    @staticmethod
+    def traced(func):
+        """ Результат func и пик выделенной Python памяти в байтах """
+        tracemalloc.start()
+        try:
+            result = func()
+            return result, tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
@@ -0,0 +1,84 @@
+import requests
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+
+from apps.products.management.commands._base import BenchmarkCommand
+from apps.products.models import Order
+from apps.products.payment import get_payment_client
+from apps.products.stubs import PaymentStubServer
+from apps.products.tasks import payment
+
+User = get_user_model()
+
+
+def legacy_payment(url, order):
+    """ Прежний запрос: новое соединение и без таймаута """
+    return requests.post(url, json={
+        'amount': float(order.total_cost),
+        'items_qty': order.quantity,
+        'user_email': order.user.email,
+    }).json()
+
+
+class Command(BenchmarkCommand):
+    help = 'Число задач оплаты в секунду на один процесс воркера'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=500)
+        parser.add_argument(
+            '--delay',
+            type=float,
+            default=0,
+            help='Задержка ответа заглушки платежного сервиса (сек.)',
+        )
+
+    def benchmark(self, *args, **options):
+        user = User.objects.create_user(
+            username='bench-payment', email='bench@example.com',
+        )
+        orders = Order.objects.bulk_create(
+            Order(user=user, quantity=1, total_cost=10)
+            for _ in range(options['orders'])
+        )
+        for order in orders:
+            order.user = user
+
+        with PaymentStubServer(delay=options['delay']) as stub, \
+                override_settings(
+                    PAYMENT_URL=stub.url,
+                    EMAIL_BACKEND='django.core.mail.backends.dummy.EmailBackend',
+                ):
+            get_payment_client.cache_clear()
+
+            _, timings = self.measure_each(
+                lambda order: legacy_payment(stub.url, order), orders,
+            )
+            self.report_rate('requests.post per task', timings)
+
+            connections = stub.connections
+            client = get_payment_client()
+            _, timings = self.measure_each(client.create_payment, orders)
+            self.report_rate('pooled client per task', timings)
+            self.stdout.write(
+                f'{"":<40} connections: {stub.connections - connections}'
+            )
+
+            # Задача целиком: чтение заказа, запрос, сохранение, письмо
+            _, timings = self.measure_each(
+                lambda order: payment.apply((order.id,)), orders,
+            )
+            self.report_rate('payment task end-to-end', timings)
+            get_payment_client.cache_clear()
+
+    def measure_each(self, func, items):
+        timings = []
+        for item in items:
+            _, timing = self.measure(func, item)
+            timings.extend(timing)
+        return None, timings
+
+    def report_rate(self, title, timings):
+        self.report(title, timings)
+        self.stdout.write(
+            f'{"":<40} {len(timings) * 1000 / sum(timings):.1f} tasks/s'
+        )
@@ -0,0 +1,84 @@
+import random
+
+from django.db import connection
+
+from apps.products.management.commands._base import BenchmarkCommand
+from apps.products.models import Category, Product
+
+WORDS = (
+    'phone', 'case', 'cable', 'charger', 'tablet', 'laptop', 'screen',
+    'keyboard', 'mouse', 'speaker', 'headphones', 'camera', 'battery',
+    'adapter', 'holder', 'stand', 'glass', 'cover', 'wireless', 'black',
+)
+
+
+class Command(BenchmarkCommand):
+    help = 'Задержка полнотекстового поиска товаров'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--page-size', type=int, default=20)
+
+    def benchmark(self, *args, **options):
+        root, child = self.fill(options['rows'])
+        self.stdout.write(
+            f'{options["rows"]} товаров, {connection.vendor}'
+        )
+
+        page_size = options['page_size']
+        child_ids = {root.id, child.id}
+        queries = (
+            ('common word', 'phone', None),
+            ('rare word', 'unique', None),
+            ('prefix', 'head', None),
+            ('two words', 'wireless cab', None),
+            ('common word + category', 'phone', child_ids),
+        )
+        for title, text, categories in queries:
+            queryset = Product.objects.all()
+            if categories is not None:
+                queryset = queryset.filter(category__in=categories)
+            _, timings = self.measure(
+                lambda: list(
+                    Product.search(text, queryset).values('id', 'rank')[
+                        :page_size
+                    ]
+                ),
+                repeat=options['repeat'],
+            )
+            self.report(f'  {title}', timings)
+
+    @staticmethod
+    def fill(rows):
+        randomizer = random.Random(0)
+        root = Category.objects.create(title='bench', slug='bench-search')
+        child = Category.objects.create(
+            title='bench child', slug='bench-search-child', parent=root,
+        )
+        other = Category.objects.create(
+            title='bench other', slug='bench-search-other',
+        )
+        categories = (root, child, other)
+
+        def products():
+            for index in range(rows):
+                words = randomizer.sample(WORDS, 6)
+                title = ' '.join(words[:2])
+                if index % 10000 == 0:
+                    title = f'{title} unique'
+                yield Product(
+                    title=title,
+                    price=10,
+                    discount_price=9,
+                    balance=1,
+                    short_description=' '.join(words[2:4]),
+                    description=' '.join(words),
+                    category=categories[index % len(categories)],
+                )
+
+        Product.objects.bulk_create(products(), batch_size=5000)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE products_product')
+        return root, child
@@ -0,0 +1,98 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+
+from apps.products import stock
+from apps.products.management.commands._base import BenchmarkCommand
+from apps.products.models import Product, ShippingCart
+
+User = get_user_model()
+
+
+class Command(BenchmarkCommand):
+    help = (
+        'Конкурентное добавление одного товара в корзины: проверка остатка '
+        'в БД против резерва счетчиком в кеше'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reservers', type=int, default=2000)
+        parser.add_argument('--balance', type=int, default=100)
+        parser.add_argument('--concurrency', type=int, default=32)
+
+    def handle(self, *args, **options):
+        # Покупатели работают в своих потоках и соединениях, поэтому
+        # данные фиксируются и удаляются после замера
+        users = User.objects.bulk_create(
+            User(username=f'bench-stock-{index}')
+            for index in range(options['reservers'])
+        )
+        product = Product.objects.create(
+            title='bench stock',
+            price=10,
+            discount_price=9,
+            balance=options['balance'],
+        )
+        try:
+            self.benchmark(users, product, **options)
+        finally:
+            product.delete()
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+    def benchmark(self, users, product, **options):
+        self.stdout.write(
+            f'{connection.vendor}, {len(users)} покупателей, '
+            f'остаток {product.balance}, {options["concurrency"]} потоков'
+        )
+        for title, add in (
+                ('check at checkout', ShippingCart.add_products),
+                ('stock hold', stock.add_to_cart),
+        ):
+            stock.stock_counter.reset((product.id,))
+            ShippingCart.objects.filter(product=product).delete()
+            self.load(title, add, users, product, options['concurrency'])
+
+    def load(self, title, add, users, product, concurrency):
+        queries = []
+        lock = threading.Lock()
+
+        def count_query(execute, sql, params, many, context):
+            with lock:
+                queries.append(sql)
+            return execute(sql, params, many, context)
+
+        def add_wrapper(sender, connection, **kwargs):
+            connection.execute_wrappers.append(count_query)
+
+        def reserve(user):
+            added, timings = self.measure(add, user, {product.id: 1})
+            return added, timings[0]
+
+        def close_connections():
+            connections.close_all()
+
+        connection_created.connect(add_wrapper)
+        try:
+            with ThreadPoolExecutor(concurrency) as pool:
+                results, elapsed = self.measure(
+                    lambda: list(pool.map(reserve, users)),
+                )
+                # Соединения потоков закрываются в самих потоках
+                barrier = threading.Barrier(concurrency)
+                list(pool.map(
+                    lambda _: (barrier.wait(), close_connections()),
+                    range(concurrency),
+                ))
+        finally:
+            connection_created.disconnect(add_wrapper)
+
+        accepted = sum(1 for added, _ in results if added)
+        self.report(title, [timing for _, timing in results])
+        self.stdout.write(
+            f'{"":<40} {len(results) * 1000 / elapsed[0]:.0f} req/s, '
+            f'{len(queries)} queries, {accepted} in carts '
+            f'for {product.balance} in stock'
+        )
@@ -0,0 +1,177 @@
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from celery.contrib.testing.worker import start_worker
+from celery.signals import before_task_publish, task_postrun
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+
+from apps.products.management.commands._base import BenchmarkCommand
+from apps.products.models import Order, PendingEmail
+from apps.products.payment import get_payment_client
+from apps.products.stubs import PaymentStubServer
+from apps.products.tasks import payment, relay_outbox
+from mini_market.celery import app
+
+User = get_user_model()
+
+TASKS = (payment, relay_outbox)
+
+# Прежняя схема: оплата и обслуживание в общей очереди, письма отдельно,
+# подтверждение до выполнения и prefetch по умолчанию
+LEGACY = {
+    'queues': {
+        payment.name: 'celery',
+        relay_outbox.name: 'celery',
+    },
+    'acks_late': False,
+    'prefetch': 4,
+}
+
+
+class Command(BenchmarkCommand):
+    help = (
+        'Задержка задач от публикации до выполнения: общая очередь '
+        'против отдельных очередей с prefetch 1. Обслуживание - проходы '
+        'relay_outbox, которые в общей очереди ждут медленные оплаты.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--payments', type=int, default=40)
+        parser.add_argument('--maintenance', type=int, default=20)
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Процессы воркера оплаты (в прежней схеме - общего)',
+        )
+        parser.add_argument(
+            '--delay',
+            type=float,
+            default=0.2,
+            help='Задержка ответа заглушки платежного сервиса (сек.)',
+        )
+
+    def handle(self, *args, **options):
+        # Воркеры работают в своих потоках и видят только зафиксированные
+        # данные, поэтому заказы удаляются после замера
+        user = User.objects.create_user(
+            username='bench-tasks', email='bench@example.com',
+        )
+        try:
+            self.benchmark(user, **options)
+        finally:
+            PendingEmail.objects.filter(recipient=user.email).delete()
+            user.delete()
+
+    def benchmark(self, user, **options):
+        published = {}
+        finished = {}
+
+        def on_publish(sender, headers, **kwargs):
+            published[headers['id']] = (sender, time.perf_counter())
+
+        def on_finish(task_id, **kwargs):
+            finished[task_id] = time.perf_counter()
+
+        before_task_publish.connect(on_publish)
+        task_postrun.connect(on_finish)
+        # Брокер в памяти процесса вместо Redis, опрос каждые 5 мс
+        app.conf.update(
+            CELERY_BROKER_URL='memory://',
+            CELERY_BROKER_TRANSPORT_OPTIONS={'polling_interval': 0.005},
+        )
+        try:
+            with PaymentStubServer(delay=options['delay']) as stub, \
+                    override_settings(
+                        PAYMENT_URL=stub.url,
+                        EMAIL_BACKEND=(
+                            'django.core.mail.backends.locmem.EmailBackend'
+                        ),
+                    ):
+                get_payment_client.cache_clear()
+                # Письма в замер не входят: окно пачки уже открыто,
+                # поэтому оплаты не планируют send_emails
+                cache.set('email:flush', True, None)
+                for title, scheme in (
+                        ('shared queue, prefetch 4', LEGACY),
+                        ('split queues, prefetch 1, acks_late', None),
+                ):
+                    published.clear()
+                    finished.clear()
+                    self.stdout.write(title)
+                    _, elapsed = self.measure(
+                        self.run_pipeline, user, scheme, finished, options,
+                    )
+                    self.report_latency(published, finished)
+                    self.stdout.write(f'{"  total":<40} {elapsed[0]:.0f} ms')
+        finally:
+            cache.delete('email:flush')
+            before_task_publish.disconnect(on_publish)
+            task_postrun.disconnect(on_finish)
+            get_payment_client.cache_clear()
+
+    def run_pipeline(self, user, scheme, finished, options):
+        orders = Order.objects.bulk_create(
+            Order(user=user, quantity=1, total_cost=10)
+            for _ in range(options['payments'])
+        )
+        total = len(orders) + options['maintenance']
+        queues = scheme['queues'] if scheme else {}
+        with self.configure(scheme), ExitStack() as stack:
+            # Пул solo на каждый процесс: prefetch считается так же,
+            # как у prefork воркера с тем же числом процессов
+            for worker_queues in self.get_workers(scheme, options['workers']):
+                stack.enter_context(start_worker(
+                    app,
+                    pool='solo',
+                    queues=worker_queues,
+                    perform_ping_check=False,
+                ))
+
+            for order in orders:
+                payment.apply_async(
+                    (order.id,), queue=queues.get(payment.name),
+                )
+            for _ in range(options['maintenance']):
+                relay_outbox.apply_async(queue=queues.get(relay_outbox.name))
+            while len(finished) < total:
+                time.sleep(0.01)
+        Order.objects.filter(user=user).delete()
+
+    @staticmethod
+    def get_workers(scheme, workers):
+        if scheme:
+            # Прежний воркер слушал celery и email, процессов на один
+            # больше, чтобы суммарно их было столько же, как в новой схеме
+            return [('celery', 'email')] * (workers + 1)
+        return [
+            *[('payments',)] * workers,
+            ('celery', 'email', 'maintenance'),
+        ]
+
+    @staticmethod
+    def configure(scheme):
+        """ Временно возвращает прежние acks и prefetch """
+        stack = ExitStack()
+        if scheme is None:
+            return stack
+        prefetch = app.conf.CELERY_WORKER_PREFETCH_MULTIPLIER
+        app.conf.CELERY_WORKER_PREFETCH_MULTIPLIER = scheme['prefetch']
+        stack.callback(
+            setattr, app.conf, 'CELERY_WORKER_PREFETCH_MULTIPLIER', prefetch,
+        )
+        for task in TASKS:
+            stack.callback(setattr, task, 'acks_late', task.acks_late)
+            task.acks_late = scheme['acks_late']
+        return stack
+
+    def report_latency(self, published, finished):
+        timings = defaultdict(list)
+        for task_id, (name, start) in published.items():
+            if task_id in finished:
+                timings[name].append((finished[task_id] - start) * 1000)
+        for name, values in timings.items():
+            self.report(f'  {name.rsplit(".", 1)[-1]}', values)
@@ -0,0 +1,59 @@
+import sys
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.products.exchange import EXCHANGE_TYPES, export_orders, filter_orders
+
+
+def datetime_argument(value):
+    result = parse_datetime(value)
+    if result is None:
+        raise ValueError(value)
+    if timezone.is_naive(result):
+        result = timezone.make_aware(result)
+    return result
+
+
+class Command(BaseCommand):
+    help = 'Потоковая выгрузка заказов для бухгалтерии в CSV/JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', choices=EXCHANGE_TYPES, default='csv')
+        parser.add_argument(
+            '--from',
+            dest='created_from',
+            type=datetime_argument,
+            help='Дата создания от (включительно), ISO 8601',
+        )
+        parser.add_argument(
+            '--to',
+            dest='created_to',
+            type=datetime_argument,
+            help='Дата создания до (не включительно), ISO 8601',
+        )
+        payed = parser.add_mutually_exclusive_group()
+        payed.add_argument(
+            '--payed', dest='is_payed', action='store_true', default=None,
+        )
+        payed.add_argument(
+            '--not-payed', dest='is_payed', action='store_false',
+        )
+        parser.add_argument('--output', help='Путь к файлу, по умолчанию stdout')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        orders = filter_orders(
+            created_from=options['created_from'],
+            created_to=options['created_to'],
+            is_payed=options['is_payed'],
+        )
+        lines = export_orders(
+            options['type'], orders, chunk_size=options['chunk_size'],
+        )
+        if options['output'] is None:
+            sys.stdout.writelines(lines)
+            return
+        with open(options['output'], 'w', encoding='utf-8', newline='') as f:
+            f.writelines(lines)
@@ -0,0 +1,24 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from apps.products.exchange import EXCHANGE_TYPES, export_products
+
+
+class Command(BaseCommand):
+    help = 'Потоковая выгрузка товаров в CSV/JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', choices=EXCHANGE_TYPES, default='csv')
+        parser.add_argument('--output', help='Путь к файлу, по умолчанию stdout')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        lines = export_products(
+            options['type'], chunk_size=options['chunk_size'],
+        )
+        if options['output'] is None:
+            sys.stdout.writelines(lines)
+            return
+        with open(options['output'], 'w', encoding='utf-8', newline='') as f:
+            f.writelines(lines)
@@ -0,0 +1,46 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.products.exchange import EXCHANGE_TYPES, import_products, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Импорт товаров из CSV/JSONL с обновлением по артикулу'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу, "-" - stdin')
+        parser.add_argument(
+            '--type',
+            choices=EXCHANGE_TYPES,
+            help='Формат файла, по умолчанию по расширению',
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        exchange_type = options['type']
+        if exchange_type is None:
+            exchange_type = os.path.splitext(path)[1].lstrip('.').lower()
+        if exchange_type not in EXCHANGE_TYPES:
+            raise CommandError('Не удалось определить формат, укажите --type')
+
+        if path == '-':
+            result = self.run(sys.stdin, exchange_type, options)
+        else:
+            with open(path, encoding='utf-8-sig', newline='') as stream:
+                result = self.run(stream, exchange_type, options)
+
+        for error in result.errors:
+            self.stderr.write(f'line {error["line"]}: {error["errors"]}')
+        self.stdout.write(
+            f'Записано: {result.saved}, ошибок: {len(result.errors)}'
+        )
+
+    @staticmethod
+    def run(stream, exchange_type, options):
+        return import_products(
+            read_rows(stream, exchange_type),
+            chunk_size=options['chunk_size'],
+        )
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:45
+
+from django.db import migrations, models
+
+
+def fill_category_paths(apps, schema_editor):
+    Category = apps.get_model('products', 'Category')
+    children = {}
+    for category_id, parent_id in Category.objects.values_list(
+            'id', 'parent_id',
+    ):
+        children.setdefault(parent_id, []).append(category_id)
+
+    paths = {}
+    stack = [(category_id, '/') for category_id in children.get(None, ())]
+    while stack:
+        category_id, parent_path = stack.pop()
+        paths[category_id] = f'{parent_path}{category_id}/'
+        stack.extend(
+            (child_id, paths[category_id])
+            for child_id in children.get(category_id, ())
+        )
+
+    Category.objects.bulk_update(
+        (Category(id=category_id, path=path)
+         for category_id, path in paths.items()),
+        ('path',),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_alter_order_options_alter_product_description_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255, verbose_name='Путь в дереве'),
+        ),
+        migrations.RunPython(fill_category_paths, migrations.RunPython.noop),
+    ]
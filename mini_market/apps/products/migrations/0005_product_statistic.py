@@ -0,0 +1,30 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_title_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=8, null=True, verbose_name='Минимальная цена')),
+                ('max_price', models.DecimalField(decimal_places=2, max_digits=8, null=True, verbose_name='Максимальная цена')),
+                ('total_count', models.BigIntegerField(default=0, verbose_name='Общий остаток')),
+            ],
+            options={
+                'verbose_name': 'Статистика товаров',
+                'verbose_name_plural': 'Статистика товаров',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price'], name='product_price_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.0.6 on 2026-10-18 19:02
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+import django.db.models.functions.math
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_price_idx',
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='discount',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(discount_price__lt=models.F('price'), then=django.db.models.functions.math.Round(django.db.models.functions.comparison.Cast(models.ExpressionWrapper(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('price'), '-', models.F('discount_price')), '*', models.Value(100)), '/', django.db.models.functions.comparison.Cast('price', models.FloatField())), output_field=models.FloatField()), models.DecimalField(decimal_places=2, max_digits=5)), 2)), default=models.Value(Decimal('0.00'))), output_field=models.DecimalField(decimal_places=2, max_digits=5), verbose_name='Скидка, %'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price', 'id'], name='product_price_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['discount', 'id'], name='product_discount_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('balance__gt', 0)), fields=['title', 'id'], name='product_in_stock_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('balance__gt', 0)), fields=['price', 'id'], name='product_in_stock_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('discount_price__lt', models.F('price'))), fields=['discount', 'id'], name='product_on_sale_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 19:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_outbox_message'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='vendor_code',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True, verbose_name='Артикул'),
+        ),
+    ]
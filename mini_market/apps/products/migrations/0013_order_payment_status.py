@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-18 19:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_order_created_payed_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['order_id'], name='order_order_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('is_payed', False), ('order_id__isnull', False)), fields=['data_created', 'id'], name='order_unpaid_idx'),
+        ),
+    ]
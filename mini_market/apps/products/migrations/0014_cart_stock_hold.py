@@ -0,0 +1,24 @@
+# Generated by Django 5.0.6 on 2026-10-18 19:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0013_order_payment_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shippingcart',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Резерв до'),
+        ),
+        migrations.AddIndex(
+            model_name='shippingcart',
+            index=models.Index(condition=models.Q(('expires_at__isnull', False)), fields=['expires_at'], name='cart_hold_expires_idx'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.0.6 on 2026-10-18 19:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min
+
+
+def fill_category_statistic(apps, schema_editor):
+    Category = apps.get_model('products', 'Category')
+    CategoryStatistic = apps.get_model('products', 'CategoryStatistic')
+    Product = apps.get_model('products', 'Product')
+    paths = dict(Category.objects.values_list('id', 'path'))
+    data = {category_id: [0, None, None] for category_id in paths}
+    rows = Product.objects.filter(
+        category__isnull=False,
+    ).values('category_id').annotate(
+        product_count=Count('id'),
+        min_price=Min('price'),
+        max_price=Max('price'),
+    ).order_by()
+    for row in rows:
+        for category_id in paths[row['category_id']].strip('/').split('/'):
+            item = data[int(category_id)]
+            item[0] += row['product_count']
+            if item[1] is None or row['min_price'] < item[1]:
+                item[1] = row['min_price']
+            if item[2] is None or row['max_price'] > item[2]:
+                item[2] = row['max_price']
+
+    CategoryStatistic.objects.bulk_create(
+        (CategoryStatistic(
+            category_id=category_id,
+            product_count=product_count,
+            min_price=min_price,
+            max_price=max_price,
+        ) for category_id, (product_count, min_price, max_price)
+         in data.items()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0015_order_item'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryStatistic',
+            fields=[
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='statistic', serialize=False, to='products.category', verbose_name='Категория')),
+                ('product_count', models.BigIntegerField(default=0, verbose_name='Число товаров')),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=8, null=True, verbose_name='Минимальная цена')),
+                ('max_price', models.DecimalField(decimal_places=2, max_digits=8, null=True, verbose_name='Максимальная цена')),
+            ],
+            options={
+                'verbose_name': 'Статистика категории',
+                'verbose_name_plural': 'Статистика категорий',
+            },
+        ),
+        migrations.RunPython(
+            fill_category_statistic, migrations.RunPython.noop,
+        ),
+    ]
@@ -1,12 +1,57 @@
+import re
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVectorField)
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
-from django.db import models
-from django.db.models import Max, Min, Sum
+from django.db import connection, models, transaction
+from django.db.models import (Case, Count, ExpressionWrapper, F, FloatField,
+                              Max, Min, Q, Sum, Value, When)
+from django.db.models.functions import (Cast, Coalesce, Concat, Greatest,
+                                        Least, Round, Substr)
+from django.utils import timezone
 
 User = get_user_model()
 
+# Конфигурация полнотекстового поиска, совпадает с триггером в миграции 0007
+SEARCH_CONFIG = 'russian'
+SEARCH_TERM_RE = re.compile(r'\w+')
+SEARCH_MAX_TERMS = 8
+
+
+class NotEnoughProducts(Exception):
+    """ Недостаточно товара на складе """
+
+    def __init__(self, products):
+        super().__init__(products)
+        self.products = products
+
+
+class LoadedValuesMixin:
+    """ Запоминает значения полей на момент загрузки из БД или save """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+        }
+
+    @property
+    def previous_values(self):
+        return getattr(self, '_loaded_values', {})
+
 
-class Category(models.Model):
+class Category(LoadedValuesMixin, models.Model):
     """ Модель категорий """
 
     title = models.CharField(verbose_name='Название', max_length=50)
@@ -24,6 +69,14 @@ class Category(models.Model):
         null=True,
     )
 
+    path = models.CharField(
+        verbose_name='Путь в дереве',
+        max_length=255,
+        db_index=True,
+        editable=False,
+        default='',
+    )
+
     class Meta:
         ordering = 'title',
         verbose_name = 'Категория'
@@ -32,6 +85,71 @@ class Category(models.Model):
     def __str__(self):
         return self.title
 
+    def clean(self):
+        if (
+                self.pk is not None and
+                self.parent_id is not None and
+                f'/{self.pk}/' in self._parent_path()
+        ):
+            raise ValidationError(
+                {'parent': 'Категория не может быть вложена в свою же ветку'}
+            )
+
+    def save(self, *args, **kwargs):
+        """
+        Сохранение с пересчетом материализованного пути.
+        При смене родителя пути всей ветки обновляются одним запросом.
+        """
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'parent' not in update_fields:
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            if self.pk is None:
+                super().save(*args, **kwargs)
+                self.path = self.build_path()
+                Category.objects.filter(pk=self.pk).update(path=self.path)
+                return
+
+            old_path = Category.objects.filter(
+                pk=self.pk,
+            ).values_list('path', flat=True).first()
+            self.path = self.build_path()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'path'}
+            super().save(*args, **kwargs)
+
+            if old_path and old_path != self.path:
+                Category.objects.filter(
+                    path__startswith=old_path,
+                ).exclude(pk=self.pk).update(
+                    path=Concat(
+                        Value(self.path),
+                        Substr('path', len(old_path) + 1),
+                    )
+                )
+
+    def _parent_path(self):
+        if self.parent_id is None:
+            return '/'
+        return Category.objects.filter(
+            pk=self.parent_id,
+        ).values_list('path', flat=True).get()
+
+    def build_path(self):
+        """ Материализованный путь вида /id_корня/.../id/ """
+        parent_path = self._parent_path()
+        if f'/{self.pk}/' in parent_path:
+            raise ValueError('Категория не может быть вложена в свою же ветку')
+        return f'{parent_path}{self.pk}/'
+
+    def get_descendants(self, include_self=True):
+        """ Все подкатегории в полную глубину одним запросом по индексу """
+        categories = Category.objects.filter(path__startswith=self.path)
+        if not include_self:
+            categories = categories.exclude(pk=self.pk)
+        return categories
+
     @classmethod
     def all_sub_categories(cls, slug):
         """
@@ -39,29 +157,29 @@ class Category(models.Model):
         для переданой категории, в полную глубину
          """
 
-        try:
-            parent = cls.objects.get(slug=slug)
-        except cls.DoesNotExist:
+        path = cls.objects.filter(
+            slug=slug,
+        ).values_list('path', flat=True).first()
+        if path is None:
             return None
 
-        result = {parent.id}
-        categories = cls.objects.all()
-
-        i = 0
-        while i < len(categories):
-            if (
-                    categories[i].parent_id in result and
-                    categories[i].id not in result
-            ):
-                result.add(categories[i].id)
-                i = 0
-            i += 1
-        return result
+        return set(
+            cls.objects.filter(
+                path__startswith=path,
+            ).values_list('id', flat=True)
+        )
 
 
-class Product(models.Model):
+class Product(LoadedValuesMixin, models.Model):
     """ Модель товаров """
 
+    vendor_code = models.CharField(
+        verbose_name='Артикул',
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+    )
     title = models.CharField(verbose_name='Название', max_length=100)
     price = models.DecimalField(
         verbose_name='Цена',
@@ -89,12 +207,65 @@ class Product(models.Model):
         blank=True,
         null=True,
     )
+    # Заполняется триггером PostgreSQL, GIN индекс создается в миграции
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Деление во float, чтобы SQLite не делил нацело целые цены.
+    # Округление в выражении, чтобы значение в БД совпадало с прочитанным.
+    discount = models.GeneratedField(
+        verbose_name='Скидка, %',
+        expression=Case(
+            When(
+                discount_price__lt=F('price'),
+                then=Round(
+                    Cast(
+                        ExpressionWrapper(
+                            (F('price') - F('discount_price')) * 100 /
+                            Cast('price', FloatField()),
+                            output_field=FloatField(),
+                        ),
+                        models.DecimalField(max_digits=5, decimal_places=2),
+                    ),
+                    2,
+                ),
+            ),
+            default=Value(Decimal('0.00')),
+        ),
+        output_field=models.DecimalField(max_digits=5, decimal_places=2),
+        db_persist=True,
+    )
 
     class Meta:
         ordering = 'title',
         verbose_name = 'Товар'
         verbose_name_plural = 'Товары'
         default_related_name = 'products'
+        indexes = (
+            models.Index(
+                fields=('title', 'id'),
+                name='product_title_id_idx',
+            ),
+            models.Index(fields=('price', 'id'), name='product_price_id_idx'),
+            models.Index(
+                fields=('discount', 'id'),
+                name='product_discount_id_idx',
+            ),
+            # Частичные индексы для фильтров in_stock и on_sale
+            models.Index(
+                fields=('title', 'id'),
+                name='product_in_stock_title_idx',
+                condition=Q(balance__gt=0),
+            ),
+            models.Index(
+                fields=('price', 'id'),
+                name='product_in_stock_price_idx',
+                condition=Q(balance__gt=0),
+            ),
+            models.Index(
+                fields=('discount', 'id'),
+                name='product_on_sale_idx',
+                condition=Q(discount_price__lt=F('price')),
+            ),
+        )
 
     def __str__(self):
         return self.title
@@ -104,16 +275,411 @@ class Product(models.Model):
         """
         Возвращает минимальную, максимальную цену и остаток всех товаров
         """
-        return cls.objects.aggregate(
+        return ProductStatistic.get_data()
+
+    @classmethod
+    async def aget_statistic(cls):
+        """ Асинхронный вариант get_statistic """
+        return await ProductStatistic.aget_data()
+
+    @classmethod
+    def search(cls, text, queryset=None):
+        """
+        Поиск по названию и описаниям с ранжированием.
+        Каждое слово запроса ищется как префикс, все слова обязательны.
+        В PostgreSQL используется search_vector и GIN индекс,
+        на SQLite - простой поиск через LIKE.
+        """
+        if queryset is None:
+            queryset = cls.objects.all()
+
+        terms = SEARCH_TERM_RE.findall(text.lower())[:SEARCH_MAX_TERMS]
+        if not terms:
+            return queryset.annotate(
+                rank=Value(0.0, output_field=FloatField()),
+            ).none()
+
+        if connection.vendor == 'postgresql':
+            query = SearchQuery(
+                ' & '.join(f'{term}:*' for term in terms),
+                config=SEARCH_CONFIG,
+                search_type='raw',
+            )
+            return queryset.filter(search_vector=query).annotate(
+                rank=SearchRank(F('search_vector'), query),
+            ).order_by('-rank', 'id')
+
+        condition = Q()
+        for term in terms:
+            condition &= (
+                Q(title__icontains=term) |
+                Q(short_description__icontains=term) |
+                Q(description__icontains=term)
+            )
+        return queryset.filter(condition).annotate(
+            rank=Value(0.0, output_field=FloatField()),
+        ).order_by('title', 'id')
+
+
+class ProductStatistic(models.Model):
+    """
+    Сводные данные по товарам в одной строке.
+    Поддерживаются инкрементально при изменении товаров и заказах,
+    периодически пересчитываются задачей recalculate_statistic.
+    """
+
+    STATISTIC_ID = 1
+
+    min_price = models.DecimalField(
+        verbose_name='Минимальная цена',
+        max_digits=8,
+        decimal_places=2,
+        null=True,
+    )
+    max_price = models.DecimalField(
+        verbose_name='Максимальная цена',
+        max_digits=8,
+        decimal_places=2,
+        null=True,
+    )
+    total_count = models.BigIntegerField(
+        verbose_name='Общий остаток',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Статистика товаров'
+        verbose_name_plural = 'Статистика товаров'
+
+    @classmethod
+    def get_data(cls):
+        data = cls.objects.filter(
+            pk=cls.STATISTIC_ID,
+        ).values('min_price', 'max_price', 'total_count').first()
+        if data is None:
+            data = cls.recalculate()
+        return data
+
+    @classmethod
+    async def aget_data(cls):
+        data = await cls.objects.filter(
+            pk=cls.STATISTIC_ID,
+        ).values('min_price', 'max_price', 'total_count').afirst()
+        if data is None:
+            data = await sync_to_async(cls.recalculate)()
+        return data
+
+    @classmethod
+    def recalculate(cls):
+        """ Полный пересчет по таблице товаров """
+        data = Product.objects.aggregate(
+            min_price=Min('price'),
+            max_price=Max('price'),
+            total_count=Coalesce(Sum('balance'), 0),
+        )
+        cls.objects.update_or_create(pk=cls.STATISTIC_ID, defaults=data)
+        return data
+
+    @classmethod
+    def _update(cls, **kwargs):
+        if not cls.objects.filter(pk=cls.STATISTIC_ID).update(**kwargs):
+            cls.recalculate()
+
+    @classmethod
+    def _recalculate_prices(cls):
+        """ Пересчет крайних цен, Min/Max берутся по индексу цены """
+        cls._update(
+            **Product.objects.aggregate(
+                min_price=Min('price'),
+                max_price=Max('price'),
+            )
+        )
+
+    @classmethod
+    def product_added(cls, price, balance):
+        price = Value(Decimal(str(price)))
+        cls._update(
+            min_price=Least(Coalesce('min_price', price), price),
+            max_price=Greatest(Coalesce('max_price', price), price),
+            total_count=F('total_count') + balance,
+        )
+
+    @classmethod
+    def product_changed(cls, old_price, price, old_balance, balance):
+        if old_price is None or old_balance is None:
+            cls.recalculate()
+            return
+
+        if balance != old_balance:
+            cls.balance_changed(balance - old_balance)
+        if price == old_price:
+            return
+
+        data = cls.objects.filter(
+            pk=cls.STATISTIC_ID,
+        ).values('min_price', 'max_price').first()
+        if data is None or old_price in data.values():
+            cls._recalculate_prices()
+        else:
+            cls.product_added(price, 0)
+
+    @classmethod
+    def product_removed(cls, price, balance):
+        cls.balance_changed(-balance)
+        data = cls.objects.filter(
+            pk=cls.STATISTIC_ID,
+        ).values('min_price', 'max_price').first()
+        if data is None or price in data.values():
+            cls._recalculate_prices()
+
+    @classmethod
+    def balance_changed(cls, delta):
+        """
+        Изменение общего остатка, например при оформлении заказа.
+        Применяется после фиксации транзакции: блокировка единственной
+        строки статистики до конца оформления выстроила бы в очередь
+        все заказы.
+        """
+        if delta:
+            transaction.on_commit(
+                lambda: cls._update(total_count=F('total_count') + delta),
+            )
+
+
+class CategoryStatistic(models.Model):
+    """
+    Число товаров и диапазон цен категории вместе со всеми подкатегориями.
+    Поддерживается инкрементально по цепочке предков из материализованного
+    пути, периодически пересчитывается задачей recalculate_statistic.
+    """
+
+    category = models.OneToOneField(
+        'Category',
+        verbose_name='Категория',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='statistic',
+    )
+    product_count = models.BigIntegerField(
+        verbose_name='Число товаров',
+        default=0,
+    )
+    min_price = models.DecimalField(
+        verbose_name='Минимальная цена',
+        max_digits=8,
+        decimal_places=2,
+        null=True,
+    )
+    max_price = models.DecimalField(
+        verbose_name='Максимальная цена',
+        max_digits=8,
+        decimal_places=2,
+        null=True,
+    )
+
+    class Meta:
+        verbose_name = 'Статистика категории'
+        verbose_name_plural = 'Статистика категорий'
+
+    @classmethod
+    def recalculate(cls):
+        """
+        Полный пересчет: товары группируются по категориям одним
+        запросом, суммы по предкам считаются по путям категорий.
+        """
+        paths = dict(Category.objects.values_list('id', 'path'))
+        rows = Product.objects.filter(
+            category__isnull=False,
+        ).values('category_id').annotate(
+            product_count=Count('id'),
             min_price=Min('price'),
             max_price=Max('price'),
-            total_count=Sum('balance'),
+        ).order_by()
+
+        data = {category_id: [0, None, None] for category_id in paths}
+        for row in rows:
+            for category_id in cls.ancestors(paths[row['category_id']]):
+                item = data[category_id]
+                item[0] += row['product_count']
+                if item[1] is None or row['min_price'] < item[1]:
+                    item[1] = row['min_price']
+                if item[2] is None or row['max_price'] > item[2]:
+                    item[2] = row['max_price']
+
+        cls.objects.bulk_create(
+            (
+                cls(
+                    category_id=category_id,
+                    product_count=product_count,
+                    min_price=min_price,
+                    max_price=max_price,
+                )
+                for category_id, (product_count, min_price, max_price)
+                in data.items()
+            ),
+            update_conflicts=True,
+            unique_fields=('category',),
+            update_fields=('product_count', 'min_price', 'max_price'),
+        )
+
+    @staticmethod
+    def ancestors(path):
+        """ id категории и всех ее предков из пути вида /1/5/9/ """
+        return [int(category_id) for category_id in path.strip('/').split('/')]
+
+    @classmethod
+    def _get_ancestors(cls, category_id):
+        """ Словарь {id: путь} категории и всех ее предков """
+        if category_id is None:
+            return {}
+        path = Category.objects.filter(
+            pk=category_id,
+        ).values_list('path', flat=True).first()
+        if not path:
+            return {}
+        return cls._get_paths(path)
+
+    @classmethod
+    def _get_paths(cls, path):
+        """ Словарь {id: путь} категории и всех ее предков по ее пути """
+        ancestors = {}
+        for index, ancestor_id in enumerate(cls.ancestors(path), 1):
+            ancestors[ancestor_id] = (
+                '/' + '/'.join(path.strip('/').split('/')[:index]) + '/'
+            )
+        return ancestors
+
+    @classmethod
+    def _recalculate_categories(cls, ancestors):
+        """
+        Пересчет переданных категорий ({id: путь}) по их поддеревьям
+        и запись одним upsert, строки отсутствующих категорий создаются
+        """
+        cls.objects.bulk_create(
+            (
+                cls(
+                    category_id=category_id,
+                    **Product.objects.filter(
+                        category__path__startswith=path,
+                    ).aggregate(
+                        product_count=Count('id'),
+                        min_price=Min('price'),
+                        max_price=Max('price'),
+                    ),
+                )
+                for category_id, path in ancestors.items()
+            ),
+            update_conflicts=True,
+            unique_fields=('category',),
+            update_fields=('product_count', 'min_price', 'max_price'),
+        )
+
+    @classmethod
+    def _update(cls, ancestors, stale_price=None, **changes):
+        """
+        Инкрементальное изменение статистики категорий ({id: путь}).
+        Категории, у которых stale_price - крайняя цена, и категории без
+        строки пересчитываются по своему поддереву, остальные
+        обновляются одним UPDATE.
+        """
+        if not ancestors:
+            return
+        stale = set()
+        if stale_price is not None:
+            price = Decimal(str(stale_price))
+            stale.update(
+                cls.objects.filter(
+                    Q(min_price=price) | Q(max_price=price),
+                    category_id__in=ancestors,
+                ).values_list('category_id', flat=True)
+            )
+        updated = cls.objects.filter(
+            category_id__in=ancestors.keys() - stale,
+        ).update(**changes)
+        if updated + len(stale) < len(ancestors):
+            stale.update(
+                ancestors.keys() - set(
+                    cls.objects.filter(
+                        category_id__in=ancestors,
+                    ).values_list('category_id', flat=True)
+                )
+            )
+        if stale:
+            cls._recalculate_categories(
+                {category_id: ancestors[category_id] for category_id in stale}
+            )
+
+    @staticmethod
+    def _price_changes(price, count):
+        price = Value(Decimal(str(price)))
+        return {
+            'product_count': F('product_count') + count,
+            'min_price': Least(Coalesce('min_price', price), price),
+            'max_price': Greatest(Coalesce('max_price', price), price),
+        }
+
+    @classmethod
+    def product_added(cls, category_id, price):
+        cls._update(
+            cls._get_ancestors(category_id), **cls._price_changes(price, 1),
         )
 
+    @classmethod
+    def product_removed(cls, category_id, price):
+        cls._update(
+            cls._get_ancestors(category_id),
+            stale_price=price,
+            product_count=F('product_count') - 1,
+        )
+
+    @classmethod
+    def branch_removed(cls, path):
+        """
+        Удаление ветки с путем path: ее товары остались без категории,
+        пересчитываются только уцелевшие предки
+        """
+        ancestors = cls._get_paths(path)
+        ancestors.pop(cls.ancestors(path)[-1])
+        if ancestors:
+            cls._recalculate_categories(ancestors)
+
+    @classmethod
+    def product_changed(cls, old_category_id, old_price, category_id, price):
+        """
+        Перенос товара в другую категорию или изменение цены.
+        Общие предки старой и новой категорий не меняют число товаров.
+        """
+        if old_price is None:
+            cls.recalculate()
+            return
+        old = cls._get_ancestors(old_category_id)
+        new = (
+            old if old_category_id == category_id
+            else cls._get_ancestors(category_id)
+        )
+        cls._update(
+            {key: path for key, path in old.items() if key not in new},
+            stale_price=old_price,
+            product_count=F('product_count') - 1,
+        )
+        cls._update(
+            {key: path for key, path in new.items() if key not in old},
+            **cls._price_changes(price, 1),
+        )
+        if old_price != price:
+            cls._update(
+                {key: path for key, path in new.items() if key in old},
+                stale_price=old_price,
+                **cls._price_changes(price, 0),
+            )
+
 
 class ShippingCart(models.Model):
     """ Модель корзины """
 
+    # Предел PositiveSmallIntegerField в PostgreSQL
+    MAX_AMOUNT = 32767
+
     user = models.ForeignKey(
         User,
         verbose_name='Пользователь',
@@ -128,6 +694,14 @@ class ShippingCart(models.Model):
         verbose_name='Количество',
         default=1,
     )
+    # Пока позиция есть в корзине, ее количество зарезервировано.
+    # Просроченный резерв снимает release_expired_holds, пустое
+    # значение - позиция без резерва
+    expires_at = models.DateTimeField(
+        verbose_name='Резерв до',
+        null=True,
+        blank=True,
+    )
 
     class Meta:
         verbose_name = 'Корзина'
@@ -139,29 +713,177 @@ class ShippingCart(models.Model):
                 name='unique_user_product',
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('expires_at',),
+                name='cart_hold_expires_idx',
+                condition=Q(expires_at__isnull=False),
+            ),
+        )
+
+    @classmethod
+    def add_products(cls, user, items, expires_at=None):
+        """
+        Добавляет товары в корзину одним запросом INSERT ... ON CONFLICT.
+        items - словарь {id товара: количество}, expires_at - срок резерва.
+        Позиция добавляется или увеличивается, только если итоговое
+        количество не превышает остаток. Возвращает множество id
+        добавленных товаров. Итог не может превысить MAX_AMOUNT.
+        """
+        if not items:
+            return set()
+
+        quote = connection.ops.quote_name
+        cart = quote(cls._meta.db_table)
+        product = quote(Product._meta.db_table)
+        values = ', '.join(('(%s, %s)',) * len(items))
+        params = [user.pk, expires_at]
+        for product_id, amount in items.items():
+            params.extend((product_id, amount))
+        params.append(cls.MAX_AMOUNT)
+
+        # Резерв продлевается только у позиций, которые уже под резервом,
+        # иначе количество без резерва стало бы зарезервированным.
+        # Сумма двух smallint переполнилась бы в PostgreSQL, поэтому
+        # условия сравнивают amount с разностью в integer
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'''
+                INSERT INTO {cart} (user_id, expires_at, product_id, amount)
+                SELECT %s, %s, p.id, v.column2
+                FROM (VALUES {values}) AS v
+                JOIN {product} AS p ON p.id = v.column1
+                WHERE p.balance >= v.column2
+                ON CONFLICT (user_id, product_id) DO UPDATE
+                SET amount = {cart}.amount + EXCLUDED.amount,
+                    expires_at = CASE
+                        WHEN {cart}.expires_at IS NULL THEN NULL
+                        ELSE EXCLUDED.expires_at
+                    END
+                WHERE {cart}.amount <= %s - EXCLUDED.amount
+                    AND {cart}.amount <= (
+                        SELECT balance FROM {product}
+                        WHERE id = EXCLUDED.product_id
+                    ) - EXCLUDED.amount
+                RETURNING product_id
+                ''',
+                params,
+            )
+            return {row[0] for row in cursor.fetchall()}
+
+    @classmethod
+    def get_available(cls, product_ids):
+        """
+        Остатки товаров за вычетом резервов в корзинах.
+        Возвращает словарь {id товара: доступное количество}.
+        """
+        return dict(
+            Product.objects.filter(pk__in=product_ids).annotate(
+                available=F('balance') - Coalesce(
+                    Sum(
+                        'carts__amount',
+                        filter=Q(carts__expires_at__isnull=False),
+                    ),
+                    0,
+                ),
+            ).values_list('id', 'available')
+        )
+
+    @classmethod
+    def release_expired(cls, batch_size):
+        """
+        Снимает резерв с пачки позиций с истекшим сроком, позиции остаются
+        в корзинах. Возвращает список (id товара, количество) по позициям.
+        """
+        with transaction.atomic():
+            rows = cls.objects.select_for_update(skip_locked=True).filter(
+                expires_at__lte=timezone.now(),
+            ).order_by('expires_at').values_list('id', 'product_id', 'amount')
+            rows = list(rows[:batch_size])
+            cls.objects.filter(
+                id__in=[row[0] for row in rows],
+            ).update(expires_at=None)
+        return [row[1:] for row in rows]
 
     @classmethod
-    def get_data_for_order(cls, user):
+    def get_for_order(cls, user):
+        """
+        Блокирует позиции корзины покупателя на время оформления заказа.
+        Сумма, списание, позиции заказа и очистка корзины считаются по
+        этому снимку: параллельное добавление в корзину ждет блокировки
+        или добавляет новую позицию, которая останется в корзине.
+        Должен вызываться в транзакции.
+        """
+        return list(
+            cls.objects.select_for_update(of=('self',)).filter(
+                user=user,
+            ).order_by('product_id').values(
+                'id',
+                'product_id',
+                'amount',
+                'expires_at',
+                'product__title',
+                'product__price',
+                'product__balance',
+            )
+        )
+
+    @staticmethod
+    def get_data_for_order(items):
         """
         Выдает общую сумму товаров в корзине и общее количество.
         Вторым аргументом словарь с недостающими товарами.
+        items - позиции из get_for_order. Итоги считаются по этому снимку,
+        а не агрегатом в SQL: PostgreSQL не допускает агрегаты с FOR UPDATE,
+        а отдельный запрос Sum учел бы позиции, добавленные после
+        блокировки, которые не попадут в заказ.
         """
-        items = ShippingCart.objects.filter(
-            user=user,
-        ).select_related('product')
-
         data = {
-            'total_cost': 0,
-            'total_count': 0,
+            'total_count': sum(item['amount'] for item in items),
+            'total_cost': sum(
+                (item['amount'] * item['product__price'] for item in items),
+                Decimal(0),
+            ),
+        }
+        not_enough = {
+            item['product__title']: item['product__balance']
+            for item in items
+            if item['amount'] > item['product__balance']
         }
-        not_enough = {}
+        return data, not_enough
+
+    @staticmethod
+    def write_off(items):
+        """
+        Списывает позиции корзины со склада условными UPDATE.
+        items - позиции из get_for_order, упорядоченные по товару.
+        Должен вызываться в транзакции: при нехватке хотя бы одного товара
+        выбрасывает NotEnoughProducts и транзакция откатывается.
+        Возвращает список id списанных товаров.
+        """
+        failed = []
+        written_off = {}
         for item in items:
-            if item.amount > item.product.balance:
-                not_enough[item.product.title] = item.product.balance
-            data['total_count'] += item.amount
-            data['total_cost'] += item.amount * item.product.price
+            product_id, amount = item['product_id'], item['amount']
+            updated = Product.objects.filter(
+                pk=product_id,
+                balance__gte=amount,
+            ).update(balance=F('balance') - amount)
+            if updated:
+                written_off[product_id] = amount
+            else:
+                failed.append(product_id)
 
-        return data, not_enough
+        if failed:
+            raise NotEnoughProducts(
+                dict(
+                    Product.objects.filter(
+                        pk__in=failed,
+                    ).values_list('title', 'balance')
+                )
+            )
+        ProductStatistic.balance_changed(-sum(written_off.values()))
+        return list(written_off)
 
 
 class Order(models.Model):
@@ -207,3 +929,153 @@ class Order(models.Model):
     class Meta:
         verbose_name = 'Заказ'
         verbose_name_plural = 'Заказы'
+        indexes = (
+            models.Index(
+                fields=('data_created', 'is_payed'),
+                name='order_created_payed_idx',
+            ),
+            models.Index(
+                fields=('order_id',),
+                name='order_order_id_idx',
+            ),
+            # Сверка обходит только ожидающие оплаты заказы, оплаченные
+            # в индекс не попадают и не увеличивают его
+            models.Index(
+                fields=('data_created', 'id'),
+                name='order_unpaid_idx',
+                condition=Q(is_payed=False, order_id__isnull=False),
+            ),
+        )
+
+    @classmethod
+    def mark_payed(cls, order_id):
+        """
+        Отмечает заказ оплаченным одним UPDATE по номеру в платежном
+        сервисе. Повторный вызов ничего не меняет. Возвращает число
+        измененных заказов.
+        """
+        return cls.objects.filter(
+            order_id=order_id, is_payed=False,
+        ).update(is_payed=True)
+
+    @classmethod
+    def get_unpaid(cls, created_after):
+        """ Ожидающие оплаты заказы в порядке индекса order_unpaid_idx """
+        return cls.objects.filter(
+            is_payed=False,
+            order_id__isnull=False,
+            data_created__gte=created_after,
+        ).order_by('data_created', 'id').only(
+            'id', 'order_id', 'data_created',
+        )
+
+
+class OrderItem(models.Model):
+    """ Позиция заказа с ценой и названием товара на момент покупки """
+
+    order = models.ForeignKey(
+        'Order',
+        verbose_name='Заказ',
+        on_delete=models.CASCADE,
+    )
+    product = models.ForeignKey(
+        'Product',
+        verbose_name='Товар',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    title = models.CharField(verbose_name='Название', max_length=100)
+    price = models.DecimalField(
+        verbose_name='Цена',
+        max_digits=8,
+        decimal_places=2,
+    )
+    amount = models.PositiveSmallIntegerField(verbose_name='Количество')
+
+    class Meta:
+        verbose_name = 'Позиция заказа'
+        verbose_name_plural = 'Позиции заказов'
+        default_related_name = 'items'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('order', 'product'),
+                name='unique_order_product',
+            ),
+        )
+        indexes = (
+            # Продажи по товару суммируются по индексу, без чтения таблицы
+            models.Index(
+                fields=('product', 'amount', 'price'),
+                name='orderitem_product_sales_idx',
+            ),
+        )
+
+    def __str__(self):
+        return self.title
+
+    @classmethod
+    def create_from_cart(cls, order, items):
+        """
+        Переносит позиции корзины в позиции заказа одним bulk_create.
+        items - позиции из get_for_order, заблокированные до очистки корзины.
+        """
+        return cls.objects.bulk_create(
+            cls(
+                order=order,
+                product_id=item['product_id'],
+                amount=item['amount'],
+                title=item['product__title'],
+                price=item['product__price'],
+            )
+            for item in items
+        )
+
+
+class PendingEmail(models.Model):
+    """
+    Письмо в очереди на отправку.
+    Очередь разбирается пачками задачей send_emails по одному
+    SMTP соединению, неотправленные письма повторяются по отдельности.
+    """
+
+    recipient = models.EmailField(verbose_name='Получатель')
+    subject = models.CharField(verbose_name='Тема', max_length=255)
+    message = models.TextField(verbose_name='Текст')
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток отправки',
+        default=0,
+    )
+    send_after = models.DateTimeField(
+        verbose_name='Отправить не раньше',
+        default=timezone.now,
+    )
+
+    class Meta:
+        verbose_name = 'Письмо в очереди'
+        verbose_name_plural = 'Письма в очереди'
+        indexes = (
+            models.Index(
+                fields=('send_after', 'id'),
+                name='pending_email_send_after_idx',
+            ),
+        )
+
+
+class OutboxMessage(models.Model):
+    """
+    Задача Celery, записанная в одной транзакции с изменением данных.
+    Публикуется в брокер после коммита и удаляется, поэтому задача
+    доставляется хотя бы один раз даже при недоступном брокере.
+    """
+
+    task = models.CharField(verbose_name='Задача', max_length=255)
+    args = models.JSONField(verbose_name='Аргументы', default=list)
+    created_at = models.DateTimeField(
+        verbose_name='Дата создания',
+        default=timezone.now,
+    )
+
+    class Meta:
+        verbose_name = 'Сообщение outbox'
+        verbose_name_plural = 'Сообщения outbox'
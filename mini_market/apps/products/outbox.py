@@ -0,0 +1,98 @@
+import logging
+import os
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from apps.products.models import OutboxMessage
+from mini_market.celery import app as celery
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(task, *args):
+    """
+    Записывает задачу в outbox текущей транзакции.
+    В брокер она уйдет из фонового потока после коммита.
+    """
+    OutboxMessage.objects.create(task=task.name, args=list(args))
+    transaction.on_commit(outbox_relay.wake)
+
+
+def publish_pending(min_age=None):
+    """
+    Публикует пачку сообщений через одно соединение с брокером.
+    Опубликованные удаляются, при ошибке брокера остальные ждут
+    следующего прохода. Возвращает число опубликованных сообщений.
+    """
+    with transaction.atomic():
+        messages = OutboxMessage.objects.select_for_update(
+            skip_locked=True,
+        ).order_by('id')
+        if min_age is not None:
+            messages = messages.filter(
+                created_at__lte=timezone.now() - timedelta(seconds=min_age),
+            )
+        messages = list(messages[:settings.OUTBOX_BATCH_SIZE])
+
+        published = []
+        try:
+            with celery.producer_or_acquire() as producer:
+                for message in messages:
+                    celery.send_task(
+                        message.task, args=message.args, producer=producer,
+                    )
+                    published.append(message.id)
+        except Exception:
+            logger.exception('Outbox publishing failed')
+
+        OutboxMessage.objects.filter(id__in=published).delete()
+    return len(published)
+
+
+class OutboxRelay:
+    """
+    Фоновый поток процесса, публикующий outbox после коммита.
+    Запрос не ждет брокер: on_commit только будит поток.
+    Сообщения, которые поток не успел отправить, подбирает relay_outbox.
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.pid = None
+
+    def wake(self):
+        with self.lock:
+            # После fork поток родителя в дочернем процессе не существует
+            if (
+                    self.thread is None or
+                    self.pid != os.getpid() or
+                    not self.thread.is_alive()
+            ):
+                self.event = threading.Event()
+                self.pid = os.getpid()
+                self.thread = threading.Thread(
+                    target=self.run, name='outbox-relay', daemon=True,
+                )
+                self.thread.start()
+        self.event.set()
+
+    def run(self):
+        while True:
+            self.event.wait()
+            self.event.clear()
+            try:
+                while publish_pending() == settings.OUTBOX_BATCH_SIZE:
+                    pass
+            except Exception:
+                logger.exception('Outbox relay failed')
+            finally:
+                connections.close_all()
+
+
+outbox_relay = OutboxRelay()
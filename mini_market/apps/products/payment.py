@@ -0,0 +1,235 @@
+import functools
+import hashlib
+import hmac
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from apps.products.models import Order
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentError(Exception):
+    """ Платежный сервис отклонил запрос, повтор не поможет """
+
+
+class PaymentUnavailable(PaymentError):
+    """ Платежный сервис недоступен, запрос можно повторить позже """
+
+
+class CircuitBreaker:
+    """
+    Размыкатель цепи с состоянием в общем кеше, одном для всех воркеров.
+    После threshold ошибок подряд запросы не отправляются reset_timeout
+    секунд. Затем пропускается пробный запрос: успех сбрасывает счетчик,
+    ошибка снова размыкает цепь.
+    """
+
+    def __init__(self, name, threshold, reset_timeout):
+        self.failures_key = f'circuit:{name}:failures'
+        self.open_key = f'circuit:{name}:open'
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+
+    def allow(self):
+        return cache.get(self.open_key) is None
+
+    def success(self):
+        cache.delete(self.failures_key)
+
+    def failure(self):
+        cache.add(self.failures_key, 0, None)
+        try:
+            failures = cache.incr(self.failures_key)
+        except ValueError:
+            failures = 1
+        if failures >= self.threshold:
+            cache.set(self.open_key, True, self.reset_timeout)
+            # Для повторного размыкания хватит одной ошибки пробного запроса
+            cache.set(self.failures_key, self.threshold - 1, None)
+
+
+class PaymentClient:
+    """
+    Клиент платежного сервиса.
+    Держит пул постоянных соединений, поэтому создается один раз
+    на процесс воркера через get_payment_client.
+    """
+
+    retry_statuses = frozenset((408, 429))
+
+    def __init__(
+            self,
+            url,
+            status_url,
+            token,
+            connect_timeout,
+            read_timeout,
+            pool_size,
+            breaker,
+    ):
+        self.url = url
+        self.status_url = status_url
+        self.token = token
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = breaker
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=0,
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    @staticmethod
+    def idempotency_key(order):
+        """ Повторная отправка заказа не создает второй платеж """
+        return f'order-{order.id}'
+
+    def create_payment(self, order):
+        """ Регистрирует заказ, возвращает ответ сервиса с orderId и url """
+        data = {
+            'amount': float(order.total_cost),
+            'items_qty': order.quantity,
+            'api_token': self.token,
+            'user_email': order.user.email,
+        }
+        response = self.request(
+            'post',
+            self.url,
+            json=data,
+            headers={'Idempotency-Key': self.idempotency_key(order)},
+        )
+        if response.status_code != 200:
+            raise PaymentError(
+                f'Payment service rejected order {order.id}: '
+                f'{response.status_code}'
+            )
+        return response.json()
+
+    def is_payed(self, order):
+        """ Статус платежа заказа в платежном сервисе """
+        response = self.request(
+            'get',
+            self.status_url.format(order_id=order.order_id),
+            params={'api_token': self.token},
+        )
+        if response.status_code != 200:
+            raise PaymentError(
+                f'Payment service has no status for order {order.id}: '
+                f'{response.status_code}'
+            )
+        return response.json().get('status') == 'paid'
+
+    def request(self, method, url, **kwargs):
+        """ Запрос через размыкатель, сбои сети и 5xx - PaymentUnavailable """
+        if not self.breaker.allow():
+            raise PaymentUnavailable('Payment circuit is open')
+        try:
+            response = self.session.request(
+                method, url, timeout=self.timeout, **kwargs,
+            )
+        except requests.RequestException as error:
+            self.breaker.failure()
+            raise PaymentUnavailable(
+                f'Request to payment service fail: {error}'
+            ) from error
+
+        if (
+                response.status_code >= 500 or
+                response.status_code in self.retry_statuses
+        ):
+            self.breaker.failure()
+            raise PaymentUnavailable(
+                f'Payment service responded {response.status_code}'
+            )
+        self.breaker.success()
+        return response
+
+    def close(self):
+        self.session.close()
+
+
+def verify_signature(body, signature):
+    """ Проверка HMAC-SHA256 подписи уведомления платежного сервиса """
+    secret = settings.PAYMENT_WEBHOOK_SECRET
+    if not secret or not signature:
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+@functools.cache
+def get_payment_client():
+    """ Клиент текущего процесса, создается после fork воркера """
+    return PaymentClient(
+        url=settings.PAYMENT_URL,
+        status_url=settings.PAYMENT_STATUS_URL,
+        token=settings.PAYMENT_TOKEN,
+        connect_timeout=settings.PAYMENT_CONNECT_TIMEOUT,
+        read_timeout=settings.PAYMENT_READ_TIMEOUT,
+        pool_size=settings.PAYMENT_POOL_SIZE,
+        breaker=CircuitBreaker(
+            'payment',
+            threshold=settings.PAYMENT_CIRCUIT_THRESHOLD,
+            reset_timeout=settings.PAYMENT_CIRCUIT_RESET_TIMEOUT,
+        ),
+    )
+
+
+def sync_payment_statuses():
+    """
+    Сверка статусов неоплаченных заказов с платежным сервисом.
+    Заказы обходятся пачками по индексу order_unpaid_idx, статусы
+    пачки запрашиваются параллельно через пул соединений клиента,
+    оплаченные сохраняются одним bulk_update. Возвращает их число.
+    Отказ по отдельному заказу пропускает только его, сверку прерывает
+    лишь PaymentUnavailable.
+    """
+    client = get_payment_client()
+
+    def is_payed(order):
+        try:
+            return client.is_payed(order)
+        except PaymentUnavailable:
+            raise
+        except PaymentError as error:
+            logger.warning(f'Payment status skipped: {error}')
+            return False
+
+    created_after = timezone.now() - timedelta(
+        days=settings.PAYMENT_RECONCILE_MAX_AGE,
+    )
+    queryset = Order.get_unpaid(created_after)
+    batch_size = settings.PAYMENT_RECONCILE_BATCH_SIZE
+    updated = 0
+    with ThreadPoolExecutor(settings.PAYMENT_POOL_SIZE) as executor:
+        batch = list(queryset[:batch_size])
+        while batch:
+            payed = [
+                order
+                for order, is_payed in zip(
+                    batch, executor.map(is_payed, batch),
+                )
+                if is_payed
+            ]
+            for order in payed:
+                order.is_payed = True
+            Order.objects.bulk_update(payed, ('is_payed',))
+            updated += len(payed)
+            if len(batch) < batch_size:
+                break
+            last = batch[-1]
+            # Продолжение по ключу (data_created, id), без OFFSET
+            batch = list(queryset.filter(
+                Q(data_created__gt=last.data_created) |
+                Q(data_created=last.data_created, id__gt=last.id)
+            )[:batch_size])
+    return updated
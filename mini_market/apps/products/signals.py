@@ -0,0 +1,133 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.products.cache import (catalog_version, category_statistic,
+                                 category_tree)
+from apps.products.exchange import products_imported
+from apps.products.models import (Category, CategoryStatistic, Product,
+                                  ProductStatistic)
+from apps.products.stock import stock_counter
+
+
+@receiver((post_save, post_delete), sender=Category)
+def invalidate_category_tree(**kwargs):
+    """ Сброс кеша дерева сразу и повторно после фиксации транзакции """
+    category_tree.invalidate()
+    transaction.on_commit(category_tree.invalidate)
+
+
+@receiver(post_save, sender=Product)
+def update_statistic_on_save(instance, created, **kwargs):
+    if created:
+        ProductStatistic.product_added(instance.price, instance.balance)
+        return
+    previous = instance.previous_values
+    ProductStatistic.product_changed(
+        previous.get('price'),
+        instance.price,
+        previous.get('balance'),
+        instance.balance,
+    )
+
+
+def invalidate_category_statistic():
+    """ Сброс снимка статистики категорий, дерево при этом не меняется """
+    category_statistic.invalidate()
+    transaction.on_commit(category_statistic.invalidate)
+
+
+def recalculate_category_statistic():
+    CategoryStatistic.recalculate()
+    category_statistic.invalidate()
+
+
+@receiver(post_save, sender=Category)
+def create_category_statistic(instance, created, **kwargs):
+    if created:
+        CategoryStatistic.objects.create(category=instance)
+
+
+@receiver(post_save, sender=Product)
+def update_category_statistic_on_save(instance, created, **kwargs):
+    if created:
+        CategoryStatistic.product_added(instance.category_id, instance.price)
+    else:
+        previous = instance.previous_values
+        old_category_id = previous.get('category_id')
+        old_price = previous.get('price')
+        if (
+                old_category_id == instance.category_id and
+                old_price == instance.price
+        ):
+            return
+        CategoryStatistic.product_changed(
+            old_category_id, old_price, instance.category_id, instance.price,
+        )
+    invalidate_category_statistic()
+
+
+@receiver(post_delete, sender=Product)
+def update_category_statistic_on_delete(instance, **kwargs):
+    CategoryStatistic.product_removed(instance.category_id, instance.price)
+    invalidate_category_statistic()
+
+
+@receiver(products_imported, sender=Product)
+def invalidate_imported_category_statistic(**kwargs):
+    invalidate_category_statistic()
+
+
+@receiver(post_save, sender=Category)
+def recalculate_category_statistic_on_move(instance, created, **kwargs):
+    """
+    Перенос ветки меняет суммы предков. Пути подкатегорий обновляются
+    после post_save, поэтому пересчет выполняется после фиксации.
+    """
+    if not created and instance.previous_values.get('path') != instance.path:
+        transaction.on_commit(recalculate_category_statistic)
+
+
+@receiver(post_delete, sender=Category)
+def recalculate_category_statistic_on_delete(instance, origin=None, **kwargs):
+    """
+    Товары удаленной ветки остаются без категории. Каскад отправляет
+    сигнал для каждой подкатегории, поэтому пересчет выполняется один раз
+    на вызов delete(): при удалении категории - только уцелевших предков,
+    при удалении queryset - полный после фиксации
+    """
+    if isinstance(origin, Category):
+        if origin is instance:
+            CategoryStatistic.branch_removed(instance.path)
+            invalidate_category_statistic()
+        return
+    if getattr(origin, '_category_statistic_recalculated', False):
+        return
+    if origin is not None:
+        origin._category_statistic_recalculated = True
+    transaction.on_commit(recalculate_category_statistic)
+
+
+@receiver(post_save, sender=Product)
+def reset_stock_counter(instance, created, **kwargs):
+    """ Изменение остатка, например поставка, сверяет счетчик с БД """
+    previous = instance.previous_values
+    if not created and previous.get('balance') != instance.balance:
+        transaction.on_commit(lambda: stock_counter.reset((instance.id,)))
+
+
+@receiver(products_imported, sender=Product)
+def reset_imported_stock_counters(product_ids, **kwargs):
+    transaction.on_commit(lambda: stock_counter.reset(product_ids))
+
+
+@receiver(post_delete, sender=Product)
+def update_statistic_on_delete(instance, **kwargs):
+    ProductStatistic.product_removed(instance.price, instance.balance)
+
+
+@receiver((post_save, post_delete), sender=Category)
+@receiver((post_save, post_delete, products_imported), sender=Product)
+def bump_catalog_version(**kwargs):
+    catalog_version.bump()
+    transaction.on_commit(catalog_version.bump)
@@ -0,0 +1,176 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.db import transaction
+from django.utils import timezone
+
+from apps.products.models import Product, ShippingCart
+
+
+class StockCounter:
+    """
+    Счетчики доступного остатка товаров в общем кеше (Redis).
+    Доступный остаток - balance за вычетом резервов в корзинах.
+    Резерв уменьшает счетчик атомарно, поэтому под нагрузкой
+    конкурирующие покупатели не обращаются к БД, пока товар не закончился.
+    Счетчик загружается из БД при отсутствии и живет STOCK_COUNTER_TIMEOUT,
+    после чего снова сверяется с БД.
+    """
+
+    prefix = 'stock:available'
+    # incr/decr кеша Django проверяют ключ и меняют его разными командами:
+    # истекший между ними счетчик создавался бы заново без срока жизни
+    # и больше не сверялся бы с БД. Скрипт меняет только существующий ключ
+    script = """
+        if redis.call('exists', KEYS[1]) == 1 then
+            return redis.call('incrby', KEYS[1], ARGV[1])
+        end
+        return false
+    """
+
+    def key(self, product_id):
+        return f'{self.prefix}:{product_id}'
+
+    def load(self, product_ids):
+        """ Загрузка отсутствующих счетчиков одним запросом к БД """
+        keys = {self.key(product_id): product_id for product_id in product_ids}
+        missing = keys.keys() - cache.get_many(keys).keys()
+        if not missing:
+            return
+        available = ShippingCart.get_available(
+            [keys[key] for key in missing],
+        )
+        for product_id, amount in available.items():
+            cache.add(
+                self.key(product_id), amount, settings.STOCK_COUNTER_TIMEOUT,
+            )
+
+    def change(self, product_id, delta):
+        """ Атомарное изменение счетчика, None - счетчика нет """
+        backend = caches['default']
+        key = self.key(product_id)
+        if not isinstance(backend, RedisCache):
+            try:
+                return backend.incr(key, delta)
+            except ValueError:
+                return None
+        key = backend.make_and_validate_key(key)
+        client = backend._cache.get_client(key, write=True)
+        return client.eval(self.script, 1, key, delta)
+
+    def reserve(self, items):
+        """
+        Резервирует товары, items - словарь {id товара: количество}.
+        Возвращает словарь зарезервированных позиций.
+        """
+        self.load(items)
+        reserved = {}
+        for product_id, amount in items.items():
+            left = self.change(product_id, -amount)
+            if left is None:
+                # Товара нет в БД или счетчик только что истек
+                continue
+            if left < 0:
+                self.release({product_id: amount})
+                continue
+            reserved[product_id] = amount
+        return reserved
+
+    def release(self, items):
+        """ Возврат резерва, истекший счетчик загрузится из БД заново """
+        for product_id, amount in items.items():
+            self.change(product_id, amount)
+
+    def reset(self, product_ids):
+        """ Сверка с БД: счетчики загрузятся при следующем резерве """
+        cache.delete_many([self.key(product_id) for product_id in product_ids])
+
+    def sync(self):
+        """
+        Сверка существующих счетчиков с БД пачками: остаток за вычетом
+        резервов. Исправляет расхождения, накопленные до истечения счетчика
+        """
+        product_ids = Product.objects.order_by('id').values_list(
+            'id', flat=True,
+        )
+        size = settings.STOCK_HOLD_BATCH_SIZE
+        last_id = 0
+        while True:
+            batch = list(product_ids.filter(id__gt=last_id)[:size])
+            if not batch:
+                return
+            last_id = batch[-1]
+            keys = {self.key(product_id): product_id for product_id in batch}
+            existing = cache.get_many(keys)
+            if existing:
+                available = ShippingCart.get_available(
+                    [keys[key] for key in existing],
+                )
+                cache.set_many(
+                    {
+                        self.key(product_id): amount
+                        for product_id, amount in available.items()
+                    },
+                    settings.STOCK_COUNTER_TIMEOUT,
+                )
+
+stock_counter = StockCounter()
+
+
+def add_to_cart(user, items):
+    """
+    Добавляет товары в корзину с резервом на STOCK_HOLD_TTL секунд.
+    Резерв проверяется счетчиком до записи в БД, товары без остатка
+    отклоняются без запросов. Возвращает множество id добавленных товаров.
+    """
+    reserved = stock_counter.reserve(items)
+    added = ShippingCart.add_products(
+        user,
+        reserved,
+        expires_at=timezone.now() + timedelta(seconds=settings.STOCK_HOLD_TTL),
+    )
+    stock_counter.release({
+        product_id: amount
+        for product_id, amount in reserved.items()
+        if product_id not in added
+    })
+    return added
+
+
+def write_off(items):
+    """
+    Списывает корзину при оформлении заказа, резервы становятся списанием.
+    items - позиции из ShippingCart.get_for_order.
+    Счетчики зарезервированных позиций не меняются: остаток и резерв
+    уменьшаются на одно и то же количество. Позиции без резерва
+    уменьшают доступный остаток, их счетчики сверяются с БД.
+    Должен вызываться в транзакции, как и ShippingCart.write_off.
+    """
+    not_held = [
+        item['product_id'] for item in items if item['expires_at'] is None
+    ]
+    product_ids = ShippingCart.write_off(items)
+    if not_held:
+        transaction.on_commit(lambda: stock_counter.reset(not_held))
+    return product_ids
+
+
+def release_expired_holds():
+    """
+    Снимает истекшие резервы пачками: позиции остаются в корзинах
+    без резерва, их количество возвращается в счетчики.
+    Возвращает число освобожденных позиций.
+    """
+    released = 0
+    while True:
+        rows = ShippingCart.release_expired(settings.STOCK_HOLD_BATCH_SIZE)
+        items = defaultdict(int)
+        for product_id, amount in rows:
+            items[product_id] += amount
+        stock_counter.release(items)
+        released += len(rows)
+        if len(rows) < settings.STOCK_HOLD_BATCH_SIZE:
+            return released
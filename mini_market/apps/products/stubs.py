@@ -0,0 +1,202 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import StreamRequestHandler, ThreadingTCPServer
+
+
+class PaymentStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Заголовки и тело уходят одним пакетом, иначе keep-alive
+    # упирается в задержку Nagle
+    wbufsize = -1
+
+    def setup(self):
+        super().setup()
+        self.server.stub.connection_opened()
+
+    def do_POST(self):
+        stub = self.server.stub
+        length = int(self.headers.get('Content-Length', 0))
+        data = json.loads(self.rfile.read(length) or b'{}')
+        status, body = stub.handle(self.headers.get('Idempotency-Key'), data)
+        self.send_json(status, body)
+
+    def do_GET(self):
+        order_id = self.path.split('?', 1)[0].rsplit('/', 1)[-1]
+        self.send_json(*self.server.stub.get_status(order_id))
+
+    def send_json(self, status, body):
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PaymentStubServer:
+    """
+    Локальная заглушка платежного сервиса для тестов и замеров.
+    Запросы с одним Idempotency-Key получают один и тот же orderId.
+    failures - сколько первых запросов ответить 503, delay - задержка ответа,
+    paid - номера оплаченных заказов для запросов статуса,
+    unknown - номера, на статус которых сервис отвечает 404.
+    """
+
+    def __init__(self, failures=0, delay=0, paid=(), unknown=()):
+        self.failures = failures
+        self.delay = delay
+        self.paid = set(paid)
+        self.unknown = set(unknown)
+        self.requests = []
+        self.status_requests = []
+        self.connections = 0
+        self.payments = {}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), PaymentStubHandler)
+        self.server.daemon_threads = True
+        self.server.stub = self
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True,
+        )
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f'http://{host}:{port}/payments'
+
+    def connection_opened(self):
+        with self.lock:
+            self.connections += 1
+
+    def handle(self, key, data):
+        if self.delay:
+            time.sleep(self.delay)
+        with self.lock:
+            self.requests.append((key, data))
+            if self.failures > 0:
+                self.failures -= 1
+                return 503, {'error': 'unavailable'}
+            order_id = self.payments.setdefault(
+                key, f'stub-{len(self.payments) + 1}',
+            )
+        return 200, {
+            'orderId': order_id,
+            'url': f'https://pay.example.com/{order_id}',
+        }
+
+    def get_status(self, order_id):
+        if self.delay:
+            time.sleep(self.delay)
+        with self.lock:
+            self.status_requests.append(order_id)
+        if order_id in self.unknown:
+            return 404, {'error': 'not found'}
+        status = 'paid' if order_id in self.paid else 'pending'
+        return 200, {'orderId': order_id, 'status': status}
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class SMTPStubHandler(StreamRequestHandler):
+    """ Минимальный SMTP диалог без TLS и авторизации """
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        stub = self.server.stub
+        stub.connection_opened()
+        self.reply('220 stub ESMTP')
+        recipients = []
+        while line := self.rfile.readline():
+            command = line.decode().strip()
+            verb = command[:4].upper()
+            if verb in ('EHLO', 'HELO'):
+                self.reply('250 stub')
+            elif verb == 'MAIL':
+                recipients = []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                address = command.split(':', 1)[1].strip(' <>')
+                if address in stub.rejected:
+                    self.reply('550 No such user')
+                else:
+                    recipients.append(address)
+                    self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                while (line := self.rfile.readline()) not in (b'.\r\n', b''):
+                    data.append(line)
+                stub.message_received(recipients, b''.join(data))
+                self.reply('250 OK')
+            elif verb == 'RSET':
+                recipients = []
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+class SMTPStubServer:
+    """
+    Локальная заглушка SMTP сервера для тестов и замеров.
+    Письма на адреса из rejected отклоняются кодом 550.
+    """
+
+    def __init__(self, rejected=()):
+        self.rejected = set(rejected)
+        self.messages = []
+        self.connections = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingTCPServer(('127.0.0.1', 0), SMTPStubHandler)
+        self.server.daemon_threads = True
+        self.server.stub = self
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True,
+        )
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def settings(self):
+        """ Настройки Django для отправки писем в заглушку """
+        return {
+            'EMAIL_BACKEND': 'django.core.mail.backends.smtp.EmailBackend',
+            'EMAIL_HOST': '127.0.0.1',
+            'EMAIL_PORT': self.port,
+            'EMAIL_HOST_USER': '',
+            'EMAIL_HOST_PASSWORD': '',
+            'EMAIL_USE_TLS': False,
+            'EMAIL_USE_SSL': False,
+        }
+
+    def connection_opened(self):
+        with self.lock:
+            self.connections += 1
+
+    def message_received(self, recipients, data):
+        with self.lock:
+            self.messages.append((recipients, data))
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
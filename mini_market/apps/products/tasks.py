@@ -1,16 +1,30 @@
 import logging
+import smtplib
 
-import requests
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.cache import cache
+from django.db import transaction
 
-from apps.products.models import Order
+from apps.products.cache import category_statistic
+from apps.products.mailing import send_pending_emails
+from apps.products.models import (CategoryStatistic, Order, PendingEmail,
+                                  ProductStatistic)
+from apps.products.outbox import publish_pending
+from apps.products.payment import (PaymentError, PaymentUnavailable,
+                                   get_payment_client, sync_payment_statuses)
+from apps.products.stock import release_expired_holds, stock_counter
 from mini_market.celery import app as celery
 
 logger = logging.getLogger(__name__)
 
 
-@celery.task()
+@celery.task(
+    autoretry_for=(PaymentUnavailable,),
+    max_retries=settings.PAYMENT_MAX_RETRIES,
+    retry_backoff=True,
+    retry_backoff_max=settings.PAYMENT_RETRY_BACKOFF_MAX,
+    retry_jitter=True,
+)
 def payment(order_id):
     try:
         order = Order.objects.select_related('user').get(id=order_id)
@@ -18,31 +32,99 @@ def payment(order_id):
         logger.error(f'Order with id "{order_id}" not found.')
         return
 
-    send_data = {
-        'amount': float(order.total_cost),
-        'items_qty': order.quantity,
-        'api_token': settings.PAYMENT_TOKEN,
-        'user_email': order.user.email,
-    }
-    response = requests.post(settings.PAYMENT_URL, json=send_data)
-
-    if response.status_code != 200:
-        logger.error(
-            f'Request to payment service fail: url "{settings.PAYMENT_URL}"'
-        )
+    if order.order_id:
+        # Повторная доставка задачи, платеж уже создан
+        return
+
+    try:
+        data = get_payment_client().create_payment(order)
+    except PaymentUnavailable:
+        raise
+    except PaymentError as error:
+        logger.error(str(error))
         return
 
-    data = response.json()
     order.order_id = data['orderId']
     order.payment_url = data['url']
-    order.save()
+    order.save(update_fields=('order_id', 'payment_url'))
 
-    send_mail(
+    queue_email(
+        recipient=order.user.email,
         subject='Ссылка на оплату заказа Mini Market',
         message=f'Для оплаты заказа перейдите по ссылке: {data["url"]}',
-        recipient_list=(order.user.email,),
-        from_email=settings.EMAIL_HOST_USER,
-        fail_silently=False,
-        connection=None,
-        html_message=None,
     )
+
+
+@celery.task()
+def reconcile_payments():
+    """
+    Периодическая сверка статусов оплаты на случай потерянных уведомлений.
+    Недоступный сервис не повторяется: заказы подберет следующий запуск.
+    """
+    try:
+        updated = sync_payment_statuses()
+    except PaymentUnavailable as error:
+        logger.warning(f'Payment reconciliation stopped: {error}')
+        return
+    if updated:
+        logger.info(f'Reconciled {updated} payed orders.')
+
+
+def queue_email(recipient, subject, message):
+    """
+    Ставит письмо в очередь. Первое письмо в окне EMAIL_BATCH_WINDOW
+    планирует отправку, остальные уходят с ним одной пачкой.
+    """
+    PendingEmail.objects.create(
+        recipient=recipient, subject=subject, message=message,
+    )
+    window = settings.EMAIL_BATCH_WINDOW
+    if cache.add('email:flush', True, window):
+        transaction.on_commit(
+            lambda: send_emails.apply_async(countdown=window),
+        )
+
+
+@celery.task(
+    autoretry_for=(smtplib.SMTPException, OSError),
+    max_retries=settings.EMAIL_MAX_ATTEMPTS,
+    retry_backoff=True,
+    retry_backoff_max=settings.EMAIL_RETRY_DELAY,
+    retry_jitter=True,
+)
+def send_emails():
+    """
+    Разбор очереди писем пачками.
+    Отложенные после ошибки письма подбирает периодический запуск.
+    """
+    while send_pending_emails() == settings.EMAIL_BATCH_SIZE:
+        pass
+
+
+@celery.task()
+def relay_outbox():
+    """ Страховочная публикация outbox, если фоновый поток не справился """
+    while publish_pending(
+            min_age=settings.OUTBOX_SWEEP_AGE,
+    ) == settings.OUTBOX_BATCH_SIZE:
+        pass
+
+
+@celery.task()
+def release_stock_holds():
+    """
+    Возврат на склад резервов, не оформленных в заказ за STOCK_HOLD_TTL,
+    и сверка счетчиков остатка с БД
+    """
+    released = release_expired_holds()
+    if released:
+        logger.info(f'Released {released} expired cart holds.')
+    stock_counter.sync()
+
+
+@celery.task()
+def recalculate_statistic():
+    """ Полный пересчет статистики товаров для устранения расхождений """
+    ProductStatistic.recalculate()
+    CategoryStatistic.recalculate()
+    category_statistic.invalidate()
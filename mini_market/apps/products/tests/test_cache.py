@@ -0,0 +1,93 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.products.cache import category_statistic, category_tree
+from apps.products.models import Category, Product
+
+
+class CategoryTreeCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.root = Category.objects.create(title='root', slug='root')
+        cls.child = Category.objects.create(
+            title='child', slug='child', parent=cls.root,
+        )
+
+    def setUp(self):
+        cache.clear()
+        category_tree.invalidate()
+        category_statistic.invalidate()
+
+    def test_steady_state_without_queries(self):
+        """ Повторные обращения к дереву не ходят в БД """
+        category_tree.get()
+        category_statistic.get()
+        with self.assertNumQueries(0):
+            tree = category_tree.get()
+            self.assertEqual(
+                tree.descendants('root'), {self.root.id, self.child.id},
+            )
+        client = APIClient()
+        with self.assertNumQueries(0):
+            response = client.get('/api/v1/categories/')
+        self.assertEqual(
+            [category['slug'] for category in response.json()],
+            ['child', 'root'],
+        )
+
+    def test_shared_snapshot(self):
+        """ Новый воркер берет снимок из общего кеша """
+        category_tree.get()
+        category_tree._state = None
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(category_tree.get().get('child'))
+
+    def test_invalidation_on_change(self):
+        """ Изменения категорий сбрасывают снимок """
+        category_tree.get()
+        Category.objects.create(title='leaf', slug='leaf', parent=self.child)
+        self.assertEqual(len(category_tree.get().descendants('root')), 3)
+
+        Category.objects.get(slug='leaf').delete()
+        self.assertEqual(len(category_tree.get().descendants('root')), 2)
+        self.assertIsNone(category_tree.get().descendants('leaf'))
+
+    def test_category_statistic(self):
+        """ Сводка по товарам выдается из снимка и обновляется с товарами """
+        Product.objects.create(
+            title='phone', price=50, discount_price=40, balance=1,
+            category=self.child,
+        )
+        client = APIClient()
+        client.get('/api/v1/categories/')
+        with self.assertNumQueries(0):
+            response = client.get('/api/v1/categories/')
+        self.assertEqual(
+            response.json()[1],
+            {
+                'id': self.root.id,
+                'title': 'root',
+                'slug': 'root',
+                'product_count': 1,
+                'min_price': '50.00',
+                'max_price': '50.00',
+            },
+        )
+
+        # Изменения товаров не сбрасывают снимок дерева
+        version = category_tree.get_version()
+        Product.objects.create(
+            title='case', price=5, discount_price=4, balance=1,
+            category=self.root,
+        )
+        self.assertEqual(category_tree.get_version(), version)
+        response = client.get(f'/api/v1/categories/{self.child.slug}/')
+        self.assertEqual(response.json()['product_count'], 1)
+        response = client.get(f'/api/v1/categories/{self.root.slug}/')
+        self.assertEqual(
+            [response.json()[key] for key in (
+                'product_count', 'min_price', 'max_price',
+            )],
+            [2, '5.00', '50.00'],
+        )
@@ -0,0 +1,81 @@
+import io
+import json
+from decimal import Decimal
+
+from django.test import TestCase
+
+from apps.products.exchange import export_products, import_products, read_rows
+from apps.products.models import Category, Product, ProductStatistic
+
+CSV = '''vendor_code,title,price,discount_price,balance,short_description,description,category
+A1,First,10.50,9,3,short,,phones
+A2,Second,abc,9,3,,,
+A3,Third,5,4,-1,,,unknown
+,Fourth,5,4,1,,,
+A1,First updated,11,9,4,,,phones
+'''
+
+
+class ExchangeTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(title='phones', slug='phones')
+
+    def test_import_errors(self):
+        """ Ошибочные строки пропускаются и попадают в отчет по номеру """
+        result = import_products(read_rows(io.StringIO(CSV), 'csv'))
+
+        self.assertEqual(
+            [error['line'] for error in result.errors], [3, 4, 5],
+        )
+        self.assertEqual(set(result.errors[0]['errors']), {'price'})
+        self.assertEqual(
+            set(result.errors[1]['errors']), {'balance', 'category'},
+        )
+        self.assertEqual(set(result.errors[2]['errors']), {'vendor_code'})
+
+        product = Product.objects.get(vendor_code='A1')
+        self.assertEqual(product.title, 'First updated')
+        self.assertEqual(product.price, Decimal('11.00'))
+        self.assertEqual(product.category, self.category)
+        self.assertEqual(product.description, '')
+        self.assertEqual(ProductStatistic.get_data()['total_count'], 4)
+
+    def test_upsert(self):
+        """ Повторный импорт обновляет товары по артикулу """
+        Product.objects.create(
+            vendor_code='B1', title='old', price=1, discount_price=1,
+            balance=1,
+        )
+        rows = [
+            json.dumps({
+                'vendor_code': f'B{index}',
+                'title': f'product {index}',
+                'price': 10,
+                'discount_price': 9.5,
+                'balance': index,
+            })
+            for index in range(1, 6)
+        ]
+        result = import_products(
+            read_rows(io.StringIO('\n'.join(rows)), 'jsonl'), chunk_size=2,
+        )
+        self.assertEqual(result.as_dict(), {'saved': 5, 'errors': []})
+        self.assertEqual(Product.objects.count(), 5)
+        self.assertEqual(
+            Product.objects.get(vendor_code='B1').title, 'product 1',
+        )
+
+    def test_round_trip(self):
+        """ Выгрузка загружается обратно без изменений """
+        import_products(read_rows(io.StringIO(CSV), 'csv'))
+        for exchange_type in ('csv', 'jsonl'):
+            with self.subTest(type=exchange_type):
+                before = list(Product.objects.values())
+                content = ''.join(export_products(exchange_type))
+                result = import_products(
+                    read_rows(io.StringIO(content), exchange_type),
+                )
+                self.assertEqual(result.errors, [])
+                after = list(Product.objects.values())
+                self.assertEqual(before, after)
@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.products.models import PendingEmail
+from apps.products.stubs import SMTPStubServer
+from apps.products.tasks import queue_email, send_emails
+
+
+class SendEmailsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def queue(self, *recipients):
+        PendingEmail.objects.bulk_create(
+            PendingEmail(recipient=recipient, subject='subject', message='text')
+            for recipient in recipients
+        )
+
+    def test_batch(self):
+        """ Пачка писем уходит по одному соединению """
+        self.queue(*(f'user{index}@example.com' for index in range(5)))
+        with SMTPStubServer() as stub, override_settings(**stub.settings()):
+            send_emails.apply()
+        self.assertEqual(len(stub.messages), 5)
+        self.assertEqual(stub.connections, 1)
+        self.assertFalse(PendingEmail.objects.exists())
+
+    @override_settings(EMAIL_BATCH_SIZE=2)
+    def test_batch_size(self):
+        """ Очередь больше пачки разбирается за один запуск """
+        self.queue(*(f'user{index}@example.com' for index in range(5)))
+        with SMTPStubServer() as stub, override_settings(**stub.settings()):
+            send_emails.apply()
+        self.assertEqual(len(stub.messages), 5)
+        self.assertEqual(stub.connections, 3)
+
+    @override_settings(EMAIL_MAX_ATTEMPTS=2)
+    def test_failed_recipient(self):
+        """ Отклоненный адрес повторяется отдельно и не мешает остальным """
+        self.queue('first@example.com', 'bad@example.com', 'last@example.com')
+        stub = SMTPStubServer(rejected=('bad@example.com',))
+        with stub, override_settings(**stub.settings()):
+            send_emails.apply()
+            self.assertEqual(len(stub.messages), 2)
+            email = PendingEmail.objects.get()
+            self.assertEqual(email.recipient, 'bad@example.com')
+            self.assertEqual(email.attempts, 1)
+            self.assertGreater(email.send_after, timezone.now())
+
+            # До истечения задержки письмо не отправляется повторно
+            send_emails.apply()
+            self.assertEqual(PendingEmail.objects.get().attempts, 1)
+
+            PendingEmail.objects.update(send_after=timezone.now())
+            send_emails.apply()
+        self.assertFalse(PendingEmail.objects.exists())
+
+    @mock.patch('apps.products.tasks.send_emails.apply_async')
+    def test_window(self, apply_async):
+        """ Письма в одном окне планируют одну отправку """
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(3):
+                queue_email(f'user{index}@example.com', 'subject', 'text')
+        apply_async.assert_called_once()
+        self.assertEqual(PendingEmail.objects.count(), 3)
@@ -0,0 +1,309 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from apps.products.models import (Category, CategoryStatistic, Product,
+                                  ProductStatistic, ShippingCart)
+
+User = get_user_model()
+
+
+class CategoryTreeTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.root = Category.objects.create(title='root', slug='root')
+        cls.child = Category.objects.create(
+            title='child', slug='child', parent=cls.root,
+        )
+        cls.grandchild = Category.objects.create(
+            title='grandchild', slug='grandchild', parent=cls.child,
+        )
+        cls.other = Category.objects.create(title='other', slug='other')
+
+    def test_paths(self):
+        """ Материализованный путь строится от корня """
+        self.assertEqual(self.root.path, f'/{self.root.id}/')
+        self.assertEqual(
+            self.grandchild.path,
+            f'/{self.root.id}/{self.child.id}/{self.grandchild.id}/',
+        )
+
+    def test_all_sub_categories(self):
+        """ Выдача всех подкатегорий в полную глубину """
+        with self.assertNumQueries(2):
+            result = Category.all_sub_categories('root')
+        self.assertEqual(
+            result, {self.root.id, self.child.id, self.grandchild.id},
+        )
+        self.assertEqual(
+            Category.all_sub_categories('grandchild'), {self.grandchild.id},
+        )
+        self.assertIsNone(Category.all_sub_categories('unknown'))
+
+    def test_reparent(self):
+        """ При переносе ветки пути потомков пересчитываются """
+        self.child.parent = self.other
+        self.child.save()
+
+        self.grandchild.refresh_from_db()
+        self.assertTrue(self.grandchild.path.startswith(self.other.path))
+        self.assertEqual(Category.all_sub_categories('root'), {self.root.id})
+        self.assertEqual(
+            Category.all_sub_categories('other'),
+            {self.other.id, self.child.id, self.grandchild.id},
+        )
+
+    def test_reparent_into_own_branch(self):
+        """ Нельзя перенести категорию в собственную ветку """
+        self.root.parent = self.grandchild
+        with self.assertRaises(ValidationError):
+            self.root.clean()
+        with self.assertRaises(ValueError):
+            self.root.save()
+
+    def test_delete_branch(self):
+        """ Удаление категории удаляет всю ветку """
+        self.child.delete()
+        self.assertEqual(Category.all_sub_categories('root'), {self.root.id})
+        self.assertFalse(Category.objects.filter(slug='grandchild').exists())
+
+
+class CategoryStatisticTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.root = Category.objects.create(title='root', slug='root')
+        cls.child = Category.objects.create(
+            title='child', slug='child', parent=cls.root,
+        )
+        cls.other = Category.objects.create(title='other', slug='other')
+        cls.phone = Product.objects.create(
+            title='phone', price=50, discount_price=40, balance=1,
+            category=cls.child,
+        )
+        cls.case = Product.objects.create(
+            title='case', price=5, discount_price=4, balance=1,
+            category=cls.root,
+        )
+
+    def get_statistic(self):
+        return {
+            category_id: (product_count, min_price, max_price)
+            for category_id, product_count, min_price, max_price in
+            CategoryStatistic.objects.values_list(
+                'category_id', 'product_count', 'min_price', 'max_price',
+            )
+        }
+
+    def assertStatistic(self, expected):
+        """ Инкрементальные изменения совпадают с полным пересчетом """
+        expected = {
+            category.id: (
+                product_count,
+                min_price and Decimal(min_price),
+                max_price and Decimal(max_price),
+            )
+            for category, (product_count, min_price, max_price)
+            in expected.items()
+        }
+        self.assertEqual(self.get_statistic(), expected)
+        CategoryStatistic.recalculate()
+        self.assertEqual(self.get_statistic(), expected)
+
+    def test_rollup(self):
+        """ Товары подкатегорий учитываются у всех предков """
+        self.assertStatistic({
+            self.root: (2, 5, 50),
+            self.child: (1, 50, 50),
+            self.other: (0, None, None),
+        })
+
+    def test_create_update_delete(self):
+        Product.objects.create(
+            title='charger', price=20, discount_price=10, balance=1,
+            category=self.child,
+        )
+        self.assertStatistic({
+            self.root: (3, 5, 50),
+            self.child: (2, 20, 50),
+            self.other: (0, None, None),
+        })
+
+        phone = Product.objects.get(pk=self.phone.pk)
+        phone.category = self.other
+        phone.price = 60
+        phone.save()
+        self.assertStatistic({
+            self.root: (2, 5, 20),
+            self.child: (1, 20, 20),
+            self.other: (1, 60, 60),
+        })
+
+        Product.objects.get(pk=self.case.pk).delete()
+        self.assertStatistic({
+            self.root: (1, 20, 20),
+            self.child: (1, 20, 20),
+            self.other: (1, 60, 60),
+        })
+
+    def test_price_change(self):
+        """ Цена внутри диапазона меняется без полного пересчета """
+        Product.objects.create(
+            title='charger', price=20, discount_price=10, balance=1,
+            category=self.root,
+        )
+        product = Product.objects.get(title='charger')
+        product.price = 30
+        with self.assertNumQueries(6):
+            product.save()
+        self.assertStatistic({
+            self.root: (3, 5, 50),
+            self.child: (1, 50, 50),
+            self.other: (0, None, None),
+        })
+
+    def test_extreme_without_full_recalculation(self):
+        """
+        Удаление крайней цены и товар новой категории пересчитывают только
+        затронутых предков
+        """
+        with mock.patch.object(
+                CategoryStatistic, 'recalculate', side_effect=AssertionError,
+        ):
+            leaf = Category.objects.create(
+                title='leaf', slug='leaf', parent=self.child,
+            )
+            Product.objects.create(
+                title='cable', price=1, discount_price=1, balance=1,
+                category=leaf,
+            )
+            Product.objects.get(pk=self.phone.pk).delete()
+            CategoryStatistic.objects.filter(category=leaf).delete()
+            product = Product.objects.get(title='cable')
+            product.price = 2
+            product.save()
+        self.assertStatistic({
+            self.root: (2, 2, 5),
+            self.child: (1, 2, 2),
+            leaf: (1, 2, 2),
+            self.other: (0, None, None),
+        })
+
+    def test_delete_branch(self):
+        """
+        Удаление ветки пересчитывает только уцелевших предков один раз,
+        а не для каждой подкатегории
+        """
+        leaf = Category.objects.create(
+            title='leaf', slug='leaf', parent=self.child,
+        )
+        Product.objects.create(
+            title='cable', price=1, discount_price=1, balance=1,
+            category=leaf,
+        )
+        with mock.patch.object(
+                CategoryStatistic,
+                '_recalculate_categories',
+                wraps=CategoryStatistic._recalculate_categories,
+        ) as recalculate_categories, mock.patch.object(
+                CategoryStatistic, 'recalculate', side_effect=AssertionError,
+        ), self.captureOnCommitCallbacks(execute=True):
+            Category.objects.get(pk=self.child.pk).delete()
+        recalculate_categories.assert_called_once_with(
+            {self.root.id: self.root.path},
+        )
+        self.assertStatistic({
+            self.root: (1, 5, 5),
+            self.other: (0, None, None),
+        })
+
+    def test_delete_queryset(self):
+        """ Удаление queryset пересчитывает статистику один раз """
+        with mock.patch.object(
+                CategoryStatistic,
+                'recalculate',
+                wraps=CategoryStatistic.recalculate,
+        ) as recalculate, self.captureOnCommitCallbacks(execute=True):
+            Category.objects.filter(
+                pk__in=(self.child.pk, self.other.pk),
+            ).delete()
+        recalculate.assert_called_once_with()
+        self.assertStatistic({self.root: (1, 5, 5)})
+
+    def test_move_category(self):
+        """ Перенос ветки пересчитывает суммы после фиксации """
+        with self.captureOnCommitCallbacks(execute=True):
+            self.child.parent = self.other
+            self.child.save()
+        self.assertStatistic({
+            self.root: (1, 5, 5),
+            self.child: (1, 50, 50),
+            self.other: (1, 50, 50),
+        })
+
+
+class ProductStatisticTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cheap = Product.objects.create(
+            title='cheap', price=5, discount_price=4, balance=2,
+        )
+        cls.expensive = Product.objects.create(
+            title='expensive', price=50, discount_price=40, balance=3,
+        )
+
+    def assertStatistic(self, min_price, max_price, total_count):
+        expected = {
+            'min_price': Decimal(min_price),
+            'max_price': Decimal(max_price),
+            'total_count': total_count,
+        }
+        self.assertEqual(Product.get_statistic(), expected)
+        self.assertEqual(ProductStatistic.recalculate(), expected)
+
+    def test_served_from_snapshot(self):
+        """ Статистика выдается одним запросом по первичному ключу """
+        with self.assertNumQueries(1):
+            Product.get_statistic()
+        self.assertStatistic(5, 50, 5)
+
+    def test_create_update_delete(self):
+        """ Статистика поддерживается при изменениях товаров """
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(
+                title='middle', price=20, discount_price=10, balance=1,
+            )
+        self.assertStatistic(5, 50, 6)
+
+        product = Product.objects.get(pk=self.cheap.pk)
+        product.price = 30
+        product.balance = 10
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertStatistic(20, 50, 14)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.get(pk=self.expensive.pk).delete()
+        self.assertStatistic(20, 30, 11)
+
+    def test_order_write_off(self):
+        """ Списание по заказу уменьшает общий остаток """
+        user = User.objects.create_user(username='buyer')
+        ShippingCart.objects.create(user=user, product=self.cheap, amount=2)
+        with self.captureOnCommitCallbacks() as callbacks:
+            with CaptureQueriesContext(connection) as queries:
+                ShippingCart.write_off(ShippingCart.get_for_order(user))
+        # Строка статистики не блокируется до конца оформления
+        table = ProductStatistic._meta.db_table
+        self.assertFalse(
+            any(table in query['sql'] for query in queries),
+        )
+        self.assertEqual(Product.get_statistic()['total_count'], 5)
+
+        for callback in callbacks:
+            callback()
+        self.assertStatistic(5, 50, 3)
@@ -0,0 +1,67 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.products.models import OutboxMessage
+from apps.products.outbox import enqueue, publish_pending
+from apps.products.tasks import payment, relay_outbox
+
+
+@mock.patch('apps.products.outbox.celery')
+class OutboxTest(TestCase):
+    def test_enqueue(self, celery):
+        """ Задача пишется в транзакции и публикуется только после коммита """
+        with mock.patch('apps.products.outbox.outbox_relay') as relay:
+            with self.captureOnCommitCallbacks() as callbacks:
+                enqueue(payment, 1)
+            relay.wake.assert_not_called()
+            for callback in callbacks:
+                callback()
+            relay.wake.assert_called_once_with()
+        celery.send_task.assert_not_called()
+        self.assertEqual(OutboxMessage.objects.get().args, [1])
+
+    @override_settings(OUTBOX_BATCH_SIZE=2)
+    def test_publish_batch(self, celery):
+        """ Пачка уходит через одно соединение и удаляется из outbox """
+        for order_id in range(3):
+            OutboxMessage.objects.create(task=payment.name, args=[order_id])
+
+        self.assertEqual(publish_pending(), 2)
+        celery.producer_or_acquire.assert_called_once_with()
+        producer = celery.producer_or_acquire.return_value.__enter__()
+        celery.send_task.assert_has_calls([
+            mock.call(payment.name, args=[0], producer=producer),
+            mock.call(payment.name, args=[1], producer=producer),
+        ])
+        self.assertEqual(OutboxMessage.objects.get().args, [2])
+
+    def test_broker_failure(self, celery):
+        """ Неопубликованные из-за ошибки брокера сообщения остаются """
+        for order_id in range(3):
+            OutboxMessage.objects.create(task=payment.name, args=[order_id])
+        celery.send_task.side_effect = (None, ConnectionError, None)
+
+        self.assertEqual(publish_pending(), 1)
+        self.assertEqual(
+            list(OutboxMessage.objects.values_list('args', flat=True)),
+            [[1], [2]],
+        )
+
+    @override_settings(OUTBOX_SWEEP_AGE=5)
+    def test_sweeper(self, celery):
+        """ Страховочный проход не трогает только что записанные сообщения """
+        OutboxMessage.objects.create(
+            task=payment.name,
+            args=[1],
+            created_at=timezone.now() - timedelta(seconds=10),
+        )
+        OutboxMessage.objects.create(task=payment.name, args=[2])
+
+        relay_outbox.apply()
+        celery.send_task.assert_called_once_with(
+            payment.name, args=[1], producer=mock.ANY,
+        )
+        self.assertEqual(OutboxMessage.objects.get().args, [2])
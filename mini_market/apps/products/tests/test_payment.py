@@ -0,0 +1,175 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.products.models import Order, PendingEmail
+from apps.products.payment import PaymentUnavailable, get_payment_client
+from apps.products.stubs import PaymentStubServer
+from apps.products.tasks import payment, reconcile_payments
+
+User = get_user_model()
+
+
+class PaymentTaskTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='buyer', email='buyer@example.com',
+        )
+
+    def setUp(self):
+        cache.clear()
+        get_payment_client.cache_clear()
+        self.addCleanup(get_payment_client.cache_clear)
+        self.order = Order.objects.create(
+            user=self.user, quantity=2, total_cost='10.50',
+        )
+
+    def run_with_stub(self, stub, *order_ids, **settings):
+        settings = {
+            'PAYMENT_URL': stub.url,
+            'PAYMENT_READ_TIMEOUT': 0.5,
+            'PAYMENT_CIRCUIT_THRESHOLD': 3,
+            **settings,
+        }
+        with override_settings(**settings):
+            get_payment_client.cache_clear()
+            for order_id in order_ids or (self.order.id,):
+                payment.apply((order_id,))
+
+    def test_payment(self):
+        """ Заказ получает ссылку, запрос идет с ключом идемпотентности """
+        with PaymentStubServer() as stub:
+            self.run_with_stub(stub)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.order_id, 'stub-1')
+        self.assertEqual(
+            self.order.payment_url, 'https://pay.example.com/stub-1',
+        )
+        key, data = stub.requests[0]
+        self.assertEqual(key, f'order-{self.order.id}')
+        self.assertEqual(data['amount'], 10.5)
+        self.assertEqual(
+            list(PendingEmail.objects.values_list('recipient', flat=True)),
+            ['buyer@example.com'],
+        )
+
+    def test_connection_reuse(self):
+        """ Запросы разных задач идут по одному соединению """
+        orders = Order.objects.bulk_create(
+            Order(user=self.user, quantity=1, total_cost=1) for _ in range(3)
+        )
+        with PaymentStubServer() as stub:
+            self.run_with_stub(stub, *(order.id for order in orders))
+        self.assertEqual(len(stub.requests), 3)
+        self.assertEqual(stub.connections, 1)
+
+    def test_retry(self):
+        """ Ошибки сервиса повторяются с тем же ключом идемпотентности """
+        with PaymentStubServer(failures=2) as stub:
+            self.run_with_stub(stub)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.order_id, 'stub-1')
+        self.assertEqual(
+            {key for key, _ in stub.requests}, {f'order-{self.order.id}'},
+        )
+        self.assertEqual(len(stub.requests), 3)
+
+    def test_already_paid(self):
+        """ Повторная доставка задачи не создает второй платеж """
+        Order.objects.filter(pk=self.order.pk).update(order_id='done')
+        with PaymentStubServer() as stub:
+            self.run_with_stub(stub)
+        self.assertEqual(stub.requests, [])
+
+    def test_circuit_breaker(self):
+        """ После серии ошибок запросы не отправляются до паузы """
+        with PaymentStubServer(failures=100) as stub:
+            with override_settings(
+                    PAYMENT_URL=stub.url, PAYMENT_CIRCUIT_THRESHOLD=3,
+            ):
+                client = get_payment_client()
+                for _ in range(5):
+                    with self.assertRaises(PaymentUnavailable):
+                        client.create_payment(self.order)
+        self.assertEqual(len(stub.requests), 3)
+
+    def test_timeout(self):
+        """ Медленный сервис не блокирует воркер дольше таймаута """
+        with PaymentStubServer(delay=1) as stub:
+            with override_settings(
+                    PAYMENT_URL=stub.url, PAYMENT_READ_TIMEOUT=0.1,
+            ):
+                with self.assertRaises(PaymentUnavailable):
+                    get_payment_client().create_payment(self.order)
+
+
+class ReconcilePaymentsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='buyer')
+        cls.orders = Order.objects.bulk_create(
+            Order(
+                user=user, quantity=1, total_cost=1, order_id=f'stub-{index}',
+            )
+            for index in range(7)
+        )
+        # Без номера платежа, уже оплаченный и слишком старый заказы
+        # в сверку не попадают
+        Order.objects.create(user=user, quantity=1, total_cost=1)
+        Order.objects.filter(pk=cls.orders[0].pk).update(is_payed=True)
+        Order.objects.filter(pk=cls.orders[1].pk).update(
+            data_created=timezone.now() - timedelta(days=30),
+        )
+
+    def setUp(self):
+        cache.clear()
+        get_payment_client.cache_clear()
+        self.addCleanup(get_payment_client.cache_clear)
+
+    def test_reconcile(self):
+        """ Оплаченные заказы сохраняются пачками, остальные не меняются """
+        paid = {'stub-1', 'stub-2', 'stub-4', 'stub-6'}
+        with PaymentStubServer(paid=paid) as stub, override_settings(
+                PAYMENT_STATUS_URL=stub.url + '/{order_id}',
+                PAYMENT_RECONCILE_BATCH_SIZE=2,
+        ):
+            reconcile_payments.apply()
+        self.assertEqual(
+            sorted(stub.status_requests),
+            ['stub-2', 'stub-3', 'stub-4', 'stub-5', 'stub-6'],
+        )
+        self.assertEqual(
+            set(Order.objects.filter(
+                is_payed=True,
+            ).values_list('order_id', flat=True)),
+            {'stub-0', 'stub-2', 'stub-4', 'stub-6'},
+        )
+
+    def test_unknown_order_skipped(self):
+        """ Отказ по одному заказу не прерывает сверку остальных """
+        with PaymentStubServer(
+                paid={'stub-4', 'stub-6'}, unknown={'stub-2'},
+        ) as stub, override_settings(
+                PAYMENT_STATUS_URL=stub.url + '/{order_id}',
+                PAYMENT_RECONCILE_BATCH_SIZE=2,
+        ), self.assertLogs('apps.products.payment', 'WARNING'):
+            reconcile_payments.apply().get()
+        self.assertEqual(
+            set(Order.objects.filter(
+                is_payed=True,
+            ).values_list('order_id', flat=True)),
+            {'stub-0', 'stub-4', 'stub-6'},
+        )
+
+    def test_unavailable(self):
+        """ Недоступный сервис не роняет задачу, заказы ждут следующей """
+        with override_settings(
+                PAYMENT_STATUS_URL='http://127.0.0.1:1/{order_id}',
+                PAYMENT_CONNECT_TIMEOUT=0.1,
+        ):
+            reconcile_payments.apply().get()
+        self.assertEqual(Order.objects.filter(is_payed=True).count(), 1)
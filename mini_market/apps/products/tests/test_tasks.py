@@ -0,0 +1,26 @@
+from django.test import SimpleTestCase
+
+from apps.products.tasks import (payment, recalculate_statistic,
+                                 relay_outbox, send_emails)
+from mini_market.celery import app
+
+
+class TaskRoutingTest(SimpleTestCase):
+    def test_queues(self):
+        """ Оплата не делит очередь с письмами и обслуживанием """
+        for task, queue in (
+                (payment, 'payments'),
+                (send_emails, 'email'),
+                (relay_outbox, 'maintenance'),
+                (recalculate_statistic, 'maintenance'),
+        ):
+            with self.subTest(task=task.name):
+                # send_task из outbox маршрутизируется так же, по имени
+                route = app.amqp.router.route({}, task.name)
+                self.assertEqual(route['queue'].name, queue)
+
+    def test_acks_late_without_results(self):
+        for task in (payment, send_emails, relay_outbox):
+            with self.subTest(task=task.name):
+                self.assertTrue(task.acks_late)
+                self.assertTrue(task.ignore_result)
@@ -0,0 +1,41 @@
+""" Настройки gunicorn, согласованные с соединениями к БД """
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0:8000')
+# Асинхронный режим: GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker
+# и ASYNC_VIEWS=True, приложение берется из asgi.py
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+is_asgi = worker_class.startswith('uvicorn.')
+wsgi_app = os.getenv(
+    'GUNICORN_APP',
+    'mini_market.asgi:application' if is_asgi
+    else 'mini_market.wsgi:application',
+)
+workers = int(
+    os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1)
+)
+# При threads > 1 gunicorn сам переключает sync воркер на gthread
+threads = int(
+    os.getenv('GUNICORN_THREADS', 4 if worker_class == 'gthread' else 1)
+)
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+# Перезапуск воркеров ограничивает рост памяти, джиттер разносит рестарты
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+# Django хранит соединение в потоке: у sync воркера одно соединение,
+# у gthread - по одному на поток, поэтому их можно держать открытыми.
+# У gevent/eventlet каждый запрос обрабатывает новый гринлет, и постоянные
+# соединения копились бы до max_connections PostgreSQL, поэтому без пула
+# соединение закрывается после запроса. Под ASGI то же самое: каждый запрос
+# выполняет обращения к БД в своем потоке.
+if is_asgi or worker_class in ('gevent', 'eventlet'):
+    os.environ.setdefault('DATABASE_CONN_MAX_AGE', '0')
+else:
+    os.environ.setdefault('DATABASE_CONN_MAX_AGE', '600')
+# Пулу воркера достаточно соединения на каждый поток. Приложение
+# загружается в воркерах после fork, поэтому переменные окружения,
+# заданные здесь, попадают в настройки Django.
+os.environ.setdefault('DATABASE_POOL_MAX_SIZE', str(threads))
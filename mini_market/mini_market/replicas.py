@@ -0,0 +1,94 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Разрешено ли текущему запросу читать с реплик.
+# По умолчанию нет: задачи Celery, команды и запись работают с основной БД.
+_read_from_replica = ContextVar('read_from_replica', default=False)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """ Чтение с реплик внутри блока """
+    token = _read_from_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Чтение с случайной реплики, если оно разрешено для текущего запроса,
+    запись и все остальное - в основную БД.
+    """
+
+    def db_for_read(self, model, **hints):
+        if settings.DATABASE_REPLICAS and _read_from_replica.get():
+            return random.choice(settings.DATABASE_REPLICAS)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная БД
+        return True
+
+
+class ReplicaMiddleware:
+    """
+    Безопасные запросы читают с реплик.
+    После небезопасного запроса клиент получает cookie и до ее истечения
+    читает с основной БД, чтобы видеть свои изменения несмотря на
+    отставание реплик.
+    """
+
+    cookie_name = 'use_primary'
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Под ASGI работает без перехода в поток, как встроенные middleware
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        safe = request.method in self.safe_methods
+        with replica_reads(safe and self.can_use_replica(request)):
+            response = self.get_response(request)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        safe = request.method in self.safe_methods
+        with replica_reads(safe and self.can_use_replica(request)):
+            response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if (
+                request.method not in self.safe_methods and
+                settings.DATABASE_REPLICAS
+        ):
+            response.set_cookie(
+                self.cookie_name,
+                '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def can_use_replica(self, request):
+        if self.cookie_name in request.COOKIES:
+            return False
+        return not request.path.startswith(settings.REPLICA_EXCLUDED_PATHS)
@@ -1,3 +1,4 @@
+from .cache import *
 from .celery import *
 from .core import *
 from .database import *
@@ -0,0 +1,27 @@
+import os
+
+from .core import ON_DEV, REDIS_HOST
+
+CACHES_MAP = {
+    'production': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': f'redis://{REDIS_HOST}:6379/1',
+    },
+    'dev': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+CACHES = dict()
+CACHES['default'] = CACHES_MAP['dev'] if ON_DEV else CACHES_MAP['production']
+
+# Время жизни снимков дерева категорий и их статистики в Redis (сек.)
+CATEGORY_TREE_TIMEOUT = int(os.getenv('CATEGORY_TREE_TIMEOUT', 60 * 60))
+# Как часто воркер сверяет версии локальных снимков с Redis (сек.)
+CATEGORY_TREE_LOCAL_TIMEOUT = float(
+    os.getenv('CATEGORY_TREE_LOCAL_TIMEOUT', 1)
+)
+# Время жизни закешированных ответов каталога для анонимов (сек.)
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 5 * 60))
+# Сколько страниц помнит метка товара, старые страницы при этом удаляются
+RESPONSE_CACHE_MAX_TAGGED = int(os.getenv('RESPONSE_CACHE_MAX_TAGGED', 1000))
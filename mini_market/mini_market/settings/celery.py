@@ -1,4 +1,94 @@
+import os
+
+from kombu import Queue
+
 from mini_market.settings.core import REDIS_HOST
 
 CELERY_BROKER_URL = f'redis://{REDIS_HOST}:6379/0'
 CELERY_RESULT_BACKEND = f'redis://{REDIS_HOST}:6379/0'
+# Результаты задач никто не читает, бэкенд нужен только для ручной отладки
+# с ignore_result=False у конкретного вызова
+CELERY_TASK_IGNORE_RESULT = True
+
+# Очереди: оплата ждет внешний сервис и не должна задерживать остальное,
+# письма отправляются пачками, обслуживание - периодические задачи
+CELERY_TASK_DEFAULT_QUEUE = 'celery'
+CELERY_TASK_QUEUES = (
+    Queue('celery'),
+    Queue('payments'),
+    Queue('email'),
+    Queue('maintenance'),
+)
+CELERY_TASK_ROUTES = {
+    'apps.products.tasks.payment': {'queue': 'payments'},
+    'apps.products.tasks.reconcile_payments': {'queue': 'payments'},
+    'apps.products.tasks.send_emails': {'queue': 'email'},
+    'apps.products.tasks.relay_outbox': {'queue': 'maintenance'},
+    'apps.products.tasks.recalculate_statistic': {'queue': 'maintenance'},
+    'apps.products.tasks.release_stock_holds': {'queue': 'maintenance'},
+}
+
+# Задачи подтверждаются после выполнения: при падении воркера сообщение
+# вернется в очередь. Все задачи идемпотентны: оплата пропускает заказы
+# с order_id и передает ключ идемпотентности, письма удаляются по
+# отправке, outbox удаляет опубликованные строки.
+CELERY_TASK_ACKS_LATE = True
+# Воркер берет по одной задаче на процесс (поток, гринлет), чтобы медленная
+# оплата не держала за собой уже выданные этому воркеру задачи
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+# Неподтвержденная задача возвращается в очередь Redis через это время
+# (сек.). Должно быть больше самого долгого countdown/eta, иначе
+# отложенные повторы будут выданы второй раз.
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'visibility_timeout': int(
+        os.getenv('CELERY_VISIBILITY_TIMEOUT', 60 * 60)
+    ),
+}
+
+# Период полного пересчета статистики товаров (сек.), 0 - отключить
+STATISTIC_RECALCULATE_INTERVAL = int(
+    os.getenv('STATISTIC_RECALCULATE_INTERVAL', 60 * 60)
+)
+
+# Период сверки статусов неоплаченных заказов (сек.), 0 - отключить
+PAYMENT_RECONCILE_INTERVAL = int(os.getenv('PAYMENT_RECONCILE_INTERVAL', 300))
+
+# Период снятия истекших резервов и сверки счетчиков остатка (сек.),
+# 0 - отключить
+STOCK_HOLD_SWEEP_INTERVAL = int(os.getenv('STOCK_HOLD_SWEEP_INTERVAL', 60))
+
+# Период страховочного разбора очереди писем (сек.)
+EMAIL_FLUSH_INTERVAL = int(os.getenv('EMAIL_FLUSH_INTERVAL', 60))
+
+# Публикация задач из outbox: размер пачки, период страховочного
+# прохода и возраст сообщений, которые он подбирает (сек.)
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 100))
+OUTBOX_SWEEP_INTERVAL = int(os.getenv('OUTBOX_SWEEP_INTERVAL', 10))
+OUTBOX_SWEEP_AGE = int(os.getenv('OUTBOX_SWEEP_AGE', 5))
+
+CELERY_BEAT_SCHEDULE = dict()
+if OUTBOX_SWEEP_INTERVAL:
+    CELERY_BEAT_SCHEDULE['relay-outbox'] = {
+        'task': 'apps.products.tasks.relay_outbox',
+        'schedule': OUTBOX_SWEEP_INTERVAL,
+    }
+if EMAIL_FLUSH_INTERVAL:
+    CELERY_BEAT_SCHEDULE['send-emails'] = {
+        'task': 'apps.products.tasks.send_emails',
+        'schedule': EMAIL_FLUSH_INTERVAL,
+    }
+if PAYMENT_RECONCILE_INTERVAL:
+    CELERY_BEAT_SCHEDULE['reconcile-payments'] = {
+        'task': 'apps.products.tasks.reconcile_payments',
+        'schedule': PAYMENT_RECONCILE_INTERVAL,
+    }
+if STOCK_HOLD_SWEEP_INTERVAL:
+    CELERY_BEAT_SCHEDULE['release-stock-holds'] = {
+        'task': 'apps.products.tasks.release_stock_holds',
+        'schedule': STOCK_HOLD_SWEEP_INTERVAL,
+    }
+if STATISTIC_RECALCULATE_INTERVAL:
+    CELERY_BEAT_SCHEDULE['recalculate-statistic'] = {
+        'task': 'apps.products.tasks.recalculate_statistic',
+        'schedule': STATISTIC_RECALCULATE_INTERVAL,
+    }
@@ -16,6 +16,10 @@ DEBUG = True if os.environ.get('DEBUG', 'False') == 'True' else False
 
 ON_DEV = False if os.getenv('ON_DEV', 'True') == 'False' else True
 
+# Асинхронные представления каталога и корзины (apps/api/async_urls.py).
+# Включаются вместе с ASGI: gunicorn с воркерами uvicorn.
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
+
 ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', '*').split()
 
 CSRF_TRUSTED_ORIGINS = os.environ.get('CSRF_TRUSTED_ORIGINS').split()
@@ -45,6 +49,7 @@ INSTALLED_APPS += PROJECT_APPS
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'mini_market.replicas.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -111,6 +116,36 @@ REDIS_HOST = os.environ.get('REDIS_HOST', 'localhost')
 
 PAYMENT_URL = os.environ.get('PAYMENT_URL', 'empty')
 PAYMENT_TOKEN = os.environ.get('PAYMENT_TOKEN', 'empty')
+# Таймауты соединения и ответа платежного сервиса (сек.)
+PAYMENT_CONNECT_TIMEOUT = float(os.environ.get('PAYMENT_CONNECT_TIMEOUT', 3))
+PAYMENT_READ_TIMEOUT = float(os.environ.get('PAYMENT_READ_TIMEOUT', 10))
+# Размер пула соединений на процесс воркера
+PAYMENT_POOL_SIZE = int(os.environ.get('PAYMENT_POOL_SIZE', 4))
+# Повторы задачи оплаты с экспоненциальной задержкой до PAYMENT_RETRY_BACKOFF_MAX
+PAYMENT_MAX_RETRIES = int(os.environ.get('PAYMENT_MAX_RETRIES', 8))
+PAYMENT_RETRY_BACKOFF_MAX = int(os.environ.get('PAYMENT_RETRY_BACKOFF_MAX', 600))
+# Размыкатель: число ошибок подряд и время паузы (сек.)
+PAYMENT_CIRCUIT_THRESHOLD = int(os.environ.get('PAYMENT_CIRCUIT_THRESHOLD', 5))
+PAYMENT_CIRCUIT_RESET_TIMEOUT = int(
+    os.environ.get('PAYMENT_CIRCUIT_RESET_TIMEOUT', 30)
+)
+# Адрес статуса платежа, {order_id} - номер заказа в платежном сервисе
+PAYMENT_STATUS_URL = os.environ.get(
+    'PAYMENT_STATUS_URL', PAYMENT_URL.rstrip('/') + '/{order_id}',
+)
+# Ключ HMAC-SHA256 подписи уведомлений об оплате, пустой - прием отключен
+PAYMENT_WEBHOOK_SECRET = os.environ.get('PAYMENT_WEBHOOK_SECRET', '')
+# Сверка статусов: размер пачки заказов и сколько дней заказ ждет оплаты
+PAYMENT_RECONCILE_BATCH_SIZE = int(
+    os.environ.get('PAYMENT_RECONCILE_BATCH_SIZE', 100)
+)
+PAYMENT_RECONCILE_MAX_AGE = int(os.environ.get('PAYMENT_RECONCILE_MAX_AGE', 3))
+
+# Резерв товара в корзине (сек.), время жизни счетчика доступного остатка
+# в кеше до сверки с БД (сек.) и размер пачки при удалении истекших резервов
+STOCK_HOLD_TTL = int(os.environ.get('STOCK_HOLD_TTL', 15 * 60))
+STOCK_COUNTER_TIMEOUT = int(os.environ.get('STOCK_COUNTER_TIMEOUT', 5 * 60))
+STOCK_HOLD_BATCH_SIZE = int(os.environ.get('STOCK_HOLD_BATCH_SIZE', 500))
 
 
 LOGGING = {
@@ -1,7 +1,51 @@
 import os
 
+import django
+from django.core.exceptions import ImproperlyConfigured
+
 from .core import BASE_DIR, ON_DEV
 
+# Время жизни постоянного соединения (сек.): 0 - закрывать после каждого
+# запроса, пустое значение - не ограничивать. Значение по умолчанию
+# подбирается под класс воркеров в gunicorn.conf.py
+DATABASE_CONN_MAX_AGE = os.getenv('DATABASE_CONN_MAX_AGE', '60')
+DATABASE_CONN_MAX_AGE = (
+    int(DATABASE_CONN_MAX_AGE) if DATABASE_CONN_MAX_AGE else None
+)
+# Пул соединений psycopg 3 (нужны Django 5.1+ и пакет psycopg_pool)
+DATABASE_POOL = os.getenv('DATABASE_POOL', 'False') == 'True'
+DATABASE_POOL_MIN_SIZE = int(os.getenv('DATABASE_POOL_MIN_SIZE', 1))
+DATABASE_POOL_MAX_SIZE = int(os.getenv('DATABASE_POOL_MAX_SIZE', 4))
+DATABASE_POOL_TIMEOUT = float(os.getenv('DATABASE_POOL_TIMEOUT', 10))
+
+if DATABASE_POOL and django.VERSION < (5, 1):
+    raise ImproperlyConfigured(
+        'DATABASE_POOL requires Django 5.1 or newer.'
+    )
+
+
+def connection_settings():
+    """ Параметры управления соединениями для PostgreSQL """
+    if DATABASE_POOL:
+        # Пул сам переиспользует соединения, постоянные с ним несовместимы
+        return {
+            'CONN_MAX_AGE': 0,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': DATABASE_POOL_MIN_SIZE,
+                    'max_size': DATABASE_POOL_MAX_SIZE,
+                    'timeout': DATABASE_POOL_TIMEOUT,
+                },
+            },
+        }
+    return {
+        'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+        # Проверка соединения перед первым запросом в рамках запроса,
+        # чтобы не получать ошибку после рестарта или failover БД
+        'CONN_HEALTH_CHECKS': True,
+    }
+
+
 DATABASES_MAP = {
     'production': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -9,13 +53,50 @@ DATABASES_MAP = {
         'USER': os.getenv('POSTGRES_USER', 'postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'postgres'),
         'HOST': os.getenv('DATABASE_HOST', 'localhost'),
-        'PORT': os.getenv('DATABASE_PORT', 5432)
+        'PORT': os.getenv('DATABASE_PORT', 5432),
+        **connection_settings(),
     },
     'dev': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     },
+    # Отдельный файл вместо реплики, чтобы проверять маршрутизацию локально
+    'dev_replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db_replica.sqlite3'),
+    },
 }
 
 DATABASES = dict()
 DATABASES['default'] = DATABASES_MAP['dev'] if ON_DEV else DATABASES_MAP['production']
+
+# Реплики для чтения каталога. В разработке реплика - второй файл SQLite,
+# роутер использует его только при DATABASE_REPLICAS=replica.
+# В production реплики задаются хостами через запятую.
+if ON_DEV:
+    DATABASES['replica'] = DATABASES_MAP['dev_replica']
+    DATABASE_REPLICAS = tuple(
+        alias for alias in os.getenv('DATABASE_REPLICAS', '').split(',')
+        if alias
+    )
+else:
+    replica_hosts = (
+        host for host in os.getenv('DATABASE_REPLICA_HOSTS', '').split(',')
+        if host
+    )
+    for index, host in enumerate(replica_hosts, start=1):
+        DATABASES[f'replica_{index}'] = {
+            **DATABASES_MAP['production'],
+            'HOST': host,
+            'TEST': {'MIRROR': 'default'},
+        }
+    DATABASE_REPLICAS = tuple(
+        alias for alias in DATABASES if alias.startswith('replica_')
+    )
+
+DATABASE_ROUTERS = ('mini_market.replicas.ReplicaRouter',)
+
+# Время (сек.), в течение которого после записи клиент читает с основной БД
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+# Пути, которые всегда работают с основной БД
+REPLICA_EXCLUDED_PATHS = ('/admin/',)
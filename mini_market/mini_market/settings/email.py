@@ -7,3 +7,11 @@ EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD')
 EMAIL_USE_TLS = True
 EMAIL_USE_SSL = False
+
+# Окно накопления писем перед отправкой пачкой (сек.)
+EMAIL_BATCH_WINDOW = float(os.environ.get('EMAIL_BATCH_WINDOW', 2))
+# Максимум писем за одно SMTP соединение
+EMAIL_BATCH_SIZE = int(os.environ.get('EMAIL_BATCH_SIZE', 100))
+# Повторы неотправленного письма: задержка удваивается с каждой попыткой
+EMAIL_MAX_ATTEMPTS = int(os.environ.get('EMAIL_MAX_ATTEMPTS', 5))
+EMAIL_RETRY_DELAY = int(os.environ.get('EMAIL_RETRY_DELAY', 60))